@@ -0,0 +1,24 @@
+"""Write the OpenAPI schema to disk at image build time.
+
+    python build_openapi.py openapi.json
+
+main.py serves it from OPENAPI_SCHEMA_FILE instead of generating it on the
+first /openapi.json or /docs request.
+"""
+import json
+import os
+import sys
+
+os.environ.setdefault("JWT_SECRET", "openapi-build")
+
+from main import app
+
+
+def main(path: str = "openapi.json"):
+    with open(path, "w") as f:
+        json.dump(app.openapi(), f, separators=(",", ":"))
+    print(f"OpenAPI schema written to {path}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
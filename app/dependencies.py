@@ -3,47 +3,173 @@ from services.user_service import UserService
 from services.apartment_service import ApartmentService
 from services.booking_service import BookingService
 from services.review_service import ReviewService
+from services.roommate_service import RoommateService
+from services.saved_search_service import SavedSearchService
+from services.chat_service import ChatService
+from services.activity_buffer import ActivityBuffer
+from services.booking_lifecycle import BookingLifecycle, INTERVAL_SECONDS as BOOKING_LIFECYCLE_INTERVAL
+from services.similar_apartments import SimilarApartmentsJob, INTERVAL_SECONDS as SIMILAR_APARTMENTS_INTERVAL
+from services.apartment_ranking import ApartmentRanking, INTERVAL_SECONDS as RANKING_INTERVAL
+from services.picture_service import PictureService
+from services.analytics_service import AnalyticsService
+from services.analytics_rollups import AnalyticsRollups, INTERVAL_SECONDS as ROLLUPS_INTERVAL
+from services.apartment_archiver import ApartmentArchiver, INTERVAL_SECONDS as ARCHIVE_INTERVAL
 from repositories.user_repository import UserRepository
 from repositories.apartment_repository import ApartmentRepository
 from repositories.booking_repository import BookingRepository
 from repositories.review_repository import ReviewRepository
+from repositories.notification_repository import NotificationRepository
+from repositories.chat_repository import ChatRepository
+from repositories.analytics_repository import AnalyticsRepository
 from fastapi import Depends, HTTPException, status, Header, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import JWTError, jwt
+import jwt
 from datetime import datetime, timedelta
 from typing import Optional
 from models.user import User
+from utils.dataloader import DataLoader
+from utils.lease import MongoLease
+from utils.idempotency import IdempotencyStore
+from middleware.auth import verify_token, revocation_list, SECRET_KEY, ALGORITHM
 import os
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-# JWT Configuration
-SECRET_KEY = os.getenv("JWT_SECRET")
-ALGORITHM = "HS256"
+# JWT Configuration (SECRET_KEY and ALGORITHM come from middleware.auth)
 ACCESS_TOKEN_EXPIRE_DAYS = 7
 
 # Security scheme for SwaggerUI
 security = HTTPBearer()
 
-# MongoDB client
+# MongoDB client, repositories and services are created per worker process
+# in the app lifespan (init_dependencies), never at import time, so nothing
+# bound to a connection pool or event loop is shared across forked workers
 MONGODB_URL = os.getenv("MONGODB_URL")
-client = AsyncIOMotorClient(MONGODB_URL)
+client: Optional[AsyncIOMotorClient] = None
 
-# Repository instances
-user_repository = UserRepository(client)
-apartment_repository = ApartmentRepository(client)
-booking_repository = BookingRepository(client)
-review_repository = ReviewRepository(client)
+user_repository: Optional[UserRepository] = None
+apartment_repository: Optional[ApartmentRepository] = None
+booking_repository: Optional[BookingRepository] = None
+review_repository: Optional[ReviewRepository] = None
+notification_repository: Optional[NotificationRepository] = None
+chat_repository: Optional[ChatRepository] = None
+analytics_repository: Optional[AnalyticsRepository] = None
 
-# Service instances
-user_service = UserService(user_repository)
-apartment_service = ApartmentService(apartment_repository)
-booking_service = BookingService(booking_repository)
-review_service = ReviewService(review_repository)
+user_service: Optional[UserService] = None
+apartment_service: Optional[ApartmentService] = None
+booking_service: Optional[BookingService] = None
+review_service: Optional[ReviewService] = None
+roommate_service: Optional[RoommateService] = None
+saved_search_service: Optional[SavedSearchService] = None
+chat_service: Optional[ChatService] = None
+activity_buffer: Optional[ActivityBuffer] = None
+booking_lifecycle: Optional[BookingLifecycle] = None
+similar_apartments: Optional[SimilarApartmentsJob] = None
+apartment_ranking: Optional[ApartmentRanking] = None
+picture_service: Optional[PictureService] = None
+analytics_service: Optional[AnalyticsService] = None
+analytics_rollups: Optional[AnalyticsRollups] = None
+idempotency_store: Optional[IdempotencyStore] = None
+apartment_archiver: Optional[ApartmentArchiver] = None
+
+
+def create_client() -> AsyncIOMotorClient:
+    return AsyncIOMotorClient(MONGODB_URL)
+
+
+def init_dependencies():
+    global client, user_repository, apartment_repository, booking_repository, review_repository
+    global notification_repository, chat_repository, analytics_repository
+    global user_service, apartment_service, booking_service, review_service, roommate_service, booking_lifecycle
+    global saved_search_service, chat_service, similar_apartments, apartment_ranking, picture_service
+    global analytics_service, analytics_rollups, activity_buffer, idempotency_store, apartment_archiver
+
+    client = create_client()
+
+    # Repository instances
+    user_repository = UserRepository(client)
+    apartment_repository = ApartmentRepository(client)
+    booking_repository = BookingRepository(client)
+    review_repository = ReviewRepository(client)
+    notification_repository = NotificationRepository(client)
+    chat_repository = ChatRepository(client)
+    analytics_repository = AnalyticsRepository(client)
+
+    # Service instances
+    roommate_service = RoommateService(user_repository)
+    activity_buffer = ActivityBuffer(user_repository)
+    user_service = UserService(user_repository, roommate_service=roommate_service, activity_buffer=activity_buffer)
+    saved_search_service = SavedSearchService(notification_repository)
+    # Refreshed on writes by the services, recomputed in full by the lease holder
+    apartment_ranking = ApartmentRanking(
+        apartment_repository,
+        review_repository,
+        MongoLease(client, "ranking", ttl_seconds=max(2 * RANKING_INTERVAL, 60))
+    )
+    picture_service = PictureService()
+    apartment_service = ApartmentService(
+        apartment_repository,
+        saved_search_service=saved_search_service,
+        ranking=apartment_ranking,
+        picture_service=picture_service
+    )
+    booking_service = BookingService(booking_repository)
+    review_service = ReviewService(review_repository, ranking=apartment_ranking)
+    chat_service = ChatService(chat_repository, user_repository)
+    analytics_service = AnalyticsService(analytics_repository)
+    idempotency_store = IdempotencyStore(client)
+
+    # Background jobs, started and stopped by the lifespan
+    booking_lifecycle = BookingLifecycle(
+        booking_repository,
+        MongoLease(client, "booking-lifecycle", ttl_seconds=max(2 * BOOKING_LIFECYCLE_INTERVAL, 60))
+    )
+    analytics_rollups = AnalyticsRollups(
+        analytics_repository,
+        MongoLease(client, "rollups", ttl_seconds=max(2 * ROLLUPS_INTERVAL, 60))
+    )
+    apartment_archiver = ApartmentArchiver(
+        apartment_repository,
+        MongoLease(client, "apartment-archive", ttl_seconds=max(2 * ARCHIVE_INTERVAL, 60))
+    )
+    # Only the lease holder keeps the similarity index in memory
+    similar_apartments = SimilarApartmentsJob(
+        apartment_repository,
+        MongoLease(client, "similar-apartments", ttl_seconds=max(3 * SIMILAR_APARTMENTS_INTERVAL, 60))
+    )
+
+
+async def create_indexes():
+    await user_repository.create_indexes()
+    await apartment_repository.create_indexes()
+    await booking_repository.create_indexes()
+    await review_repository.create_indexes()
+    await notification_repository.create_indexes()
+    await chat_repository.create_indexes()
+    await analytics_repository.create_indexes()
+    await idempotency_store.create_indexes()
+    await revocation_list.create_indexes()
+
+
+def close_dependencies():
+    global client
+    if client is not None:
+        client.close()
+        client = None
+
+class Loaders:
+    """Request-scoped DataLoaders, one per collection."""
+    def __init__(self):
+        self.users = DataLoader(user_repository.get_many)
+        self.apartments = DataLoader(apartment_repository.get_many)
 
 # Dependency functions
+def get_loaders() -> Loaders:
+    # FastAPI calls this once per request, so the memo never outlives it
+    return Loaders()
+
 def get_user_service() -> UserService:
     return user_service
 
@@ -56,6 +182,42 @@ def get_booking_service() -> BookingService:
 def get_review_service() -> ReviewService:
     return review_service
 
+def get_roommate_service() -> RoommateService:
+    return roommate_service
+
+def get_saved_search_service() -> SavedSearchService:
+    return saved_search_service
+
+def get_chat_service() -> ChatService:
+    return chat_service
+
+def get_activity_buffer() -> ActivityBuffer:
+    return activity_buffer
+
+def get_booking_lifecycle() -> BookingLifecycle:
+    return booking_lifecycle
+
+def get_similar_apartments() -> SimilarApartmentsJob:
+    return similar_apartments
+
+def get_apartment_ranking() -> ApartmentRanking:
+    return apartment_ranking
+
+def get_picture_service() -> PictureService:
+    return picture_service
+
+def get_analytics_service() -> AnalyticsService:
+    return analytics_service
+
+def get_analytics_rollups() -> AnalyticsRollups:
+    return analytics_rollups
+
+def get_idempotency_store() -> IdempotencyStore:
+    return idempotency_store
+
+def get_apartment_archiver() -> ApartmentArchiver:
+    return apartment_archiver
+
 
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Security(security)) -> Optional[User]:
@@ -68,19 +230,36 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Security(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        userId: str = payload.get("userId", None)
-        if userId is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    user = await user_service.get_by_id(userId)
+    user = await get_user_from_token(credentials.credentials)
     if user is None:
         raise credentials_exception
     return user
 
+async def get_current_user_id(credentials: HTTPAuthorizationCredentials = Security(security)) -> str:
+    """The userId of a valid token, read from the verified-token cache without loading the user."""
+    try:
+        user_id = verify_token(credentials.credentials).get("userId")
+    except jwt.InvalidTokenError:
+        user_id = None
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user_id
+
+async def get_user_from_token(token: str) -> Optional[User]:
+    """The user of a valid token, None otherwise; also authenticates WebSockets."""
+    try:
+        payload = verify_token(token)
+    except jwt.InvalidTokenError:
+        return None
+    userId: str = payload.get("userId", None)
+    if userId is None:
+        return None
+    return await user_service.get_by_id(userId)
+
 async def require_admin(current_user: User = Depends(get_current_user)):
     if current_user is None or not current_user.admin:
         raise HTTPException(
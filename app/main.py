@@ -1,18 +1,93 @@
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from routers.user_router import router as user_router
 from routers.apartment_router import router as apartment_router
 from routers.booking_router import router as booking_router
 from routers.review_router import router as review_router
-from dependencies import security
+from routers.roommate_router import router as roommate_router
+from routers.notification_router import router as notification_router
+from routers.chat_router import router as chat_router
+from routers.admin_router import router as admin_router
+from routers.analytics_router import router as analytics_router
+from services.picture_service import MEDIA_DIR, PICTURES_URL
+from utils.static_files import ImmutableStaticFiles
+from middleware.rate_limit import RateLimitMiddleware, InMemoryTokenBucketStore, MongoTokenBucketStore
+from middleware.load_shedding import LoadSheddingMiddleware, load_shedder
+from middleware.auth import revocation_list
+import dependencies
+from utils.logging import logger
+
+# Rate limit buckets are per process unless shared through MongoDB
+if os.getenv("RATE_LIMIT_BACKEND", "memory") == "mongo":
+    rate_limit_store = MongoTokenBucketStore()
+else:
+    rate_limit_store = InMemoryTokenBucketStore()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs in every worker process after it has started
+    dependencies.init_dependencies()
+    load_shedder.start()
+    # Connect to MongoDB (and ensure indexes) in the background while the rest of startup runs,
+    # so the first request does not pay for server selection and the handshake
+    warm_up = asyncio.create_task(warm_up_client())
+    if isinstance(rate_limit_store, MongoTokenBucketStore):
+        await rate_limit_store.connect(dependencies.client)
+    revocation_list.start(dependencies.client)
+    dependencies.booking_lifecycle.start()
+    dependencies.roommate_service.start()
+    dependencies.saved_search_service.start()
+    dependencies.chat_service.start()
+    dependencies.activity_buffer.start()
+    dependencies.similar_apartments.start()
+    dependencies.apartment_ranking.start()
+    dependencies.picture_service.start()
+    dependencies.analytics_rollups.start()
+    dependencies.apartment_archiver.start()
+    yield
+    warm_up.cancel()
+    await dependencies.saved_search_service.stop()
+    await dependencies.chat_service.stop()
+    await dependencies.activity_buffer.stop()
+    await dependencies.roommate_service.stop()
+    await dependencies.booking_lifecycle.stop()
+    await dependencies.similar_apartments.stop()
+    await dependencies.apartment_ranking.stop()
+    dependencies.picture_service.stop()
+    await dependencies.analytics_rollups.stop()
+    await dependencies.apartment_archiver.stop()
+    await load_shedder.stop()
+    await revocation_list.stop()
+    dependencies.close_dependencies()
+
+
+async def warm_up_client():
+    try:
+        await dependencies.client.admin.command("ping")
+        await dependencies.create_indexes()
+    except Exception as e:
+        logger.error(f"MongoDB warm-up failed: {str(e)}")
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Student Housing API",
     description="API for student housing application",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Rate limiting, added before CORS so that 429 responses still carry CORS headers
+app.add_middleware(RateLimitMiddleware, store=rate_limit_store)
+
+# Load shedding, outside rate limiting so that shed requests cost no bucket lookup
+app.add_middleware(LoadSheddingMiddleware, shedder=load_shedder)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -22,6 +97,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Serve the schema generated at build time (build_openapi.py) when available,
+# generating it on the first request costs a few hundred milliseconds
+OPENAPI_SCHEMA_FILE = os.getenv("OPENAPI_SCHEMA_FILE")
+
+
+def openapi():
+    if OPENAPI_SCHEMA_FILE and os.path.exists(OPENAPI_SCHEMA_FILE):
+        if app.openapi_schema is None:
+            with open(OPENAPI_SCHEMA_FILE) as f:
+                app.openapi_schema = json.load(f)
+        return app.openapi_schema
+    return FastAPI.openapi(app)
+
+
+app.openapi = openapi
+
 # Add security scheme to OpenAPI
 app.swagger_ui_init_oauth = {
     "usePkceWithAuthorizationCodeGrant": True
@@ -29,10 +120,20 @@ app.swagger_ui_init_oauth = {
 
 
 # Include routers
+# Before user_router, whose /api/v1/{user_id} would take /api/v1/notifications and /api/v1/chats
+app.include_router(notification_router)
+app.include_router(chat_router)
 app.include_router(user_router)
 app.include_router(apartment_router)
 app.include_router(booking_router)
 app.include_router(review_router)
+app.include_router(roommate_router)
+app.include_router(admin_router)
+app.include_router(analytics_router)
+
+# Uploaded pictures and their thumbnails, named by content hash
+app.mount(PICTURES_URL, ImmutableStaticFiles(directory=os.path.join(MEDIA_DIR, "pictures"), check_dir=False),
+          name="pictures")
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,11 +1,15 @@
 from fastapi import Request, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import jwt
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
 from typing import Optional
 from pydantic import BaseModel
 import os
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from utils.logging import logger
 
 # Load environment variables
@@ -17,6 +21,189 @@ if not SECRET_KEY:
     raise ValueError("JWT_SECRET environment variable is not set")
 ALGORITHM = "HS256"
 
+# How often each worker loads revocations made by the others
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_INTERVAL", "5"))
+# Longest token lifetime, a user's revocation is kept until every token issued before it expired
+TOKEN_MAX_AGE_SECONDS = float(os.getenv("TOKEN_MAX_AGE", str(30 * 86400)))
+# Revocations written this long before the last one seen are still loaded, for clock skew between machines
+SYNC_OVERLAP_SECONDS = 60
+
+class RevocationList:
+    """Revoked tokens (by hash) and users whose tokens issued before a moment are revoked.
+
+    Revocations are written to ``RevokedTokens`` (TTL index on ``expiresAt``)
+    and every worker loads the new ones each ``sync_interval`` seconds, so
+    the check on every verification, cached or not, stays in memory.
+    """
+    def __init__(self, sync_interval: float = REVOCATION_SYNC_SECONDS):
+        self.sync_interval = sync_interval
+        self.collection = None
+        self._tokens: dict = {}  # token hash -> exp (epoch seconds), dropped once expired
+        self._users: dict = {}  # userId -> tokens issued at or before this epoch second are revoked
+        self._last_revoked_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+        self.last_synced_at: Optional[datetime] = None
+
+    def start(self, client):
+        # Called from the lifespan once the worker's client exists
+        self.collection = client.get_database("diploma")["RevokedTokens"]
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def create_indexes(self):
+        await self.collection.create_index("expiresAt", expireAfterSeconds=0)
+        await self.collection.create_index("revokedAt")
+
+    async def revoke_token(self, token: str, exp: Optional[float] = None):
+        key = _token_key(token)
+        expires = exp if exp is not None else time.time() + TOKEN_MAX_AGE_SECONDS
+        self._tokens[key] = expires
+        await self.collection.update_one(
+            {"_id": f"token:{key.hex()}"},
+            {"$set": {
+                "token": key.hex(),
+                "revokedAt": datetime.utcnow(),
+                "expiresAt": datetime.utcfromtimestamp(expires)
+            }},
+            upsert=True
+        )
+
+    async def revoke_user(self, user_id: str):
+        now = datetime.utcnow()
+        self._users[user_id] = _epoch(now)
+        await self.collection.update_one(
+            {"_id": f"user:{user_id}"},
+            {"$set": {
+                "userId": user_id,
+                "revokedAt": now,
+                "expiresAt": now + timedelta(seconds=TOKEN_MAX_AGE_SECONDS)
+            }},
+            upsert=True
+        )
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"Revocation sync failed: {str(e)}")
+            await asyncio.sleep(self.sync_interval)
+
+    async def sync(self):
+        query = {}
+        if self._last_revoked_at is not None:
+            query["revokedAt"] = {"$gte": self._last_revoked_at - timedelta(seconds=SYNC_OVERLAP_SECONDS)}
+        async for document in self.collection.find(query):
+            revoked_at = document["revokedAt"]
+            if "userId" in document:
+                self._users[document["userId"]] = max(self._users.get(document["userId"], 0), _epoch(revoked_at))
+            else:
+                self._tokens[bytes.fromhex(document["token"])] = _epoch(document["expiresAt"])
+            if self._last_revoked_at is None or revoked_at > self._last_revoked_at:
+                self._last_revoked_at = revoked_at
+        now = time.time()
+        for key in [key for key, expires in self._tokens.items() if expires < now]:
+            del self._tokens[key]
+        for user_id in [user_id for user_id, revoked_at in self._users.items() if revoked_at + TOKEN_MAX_AGE_SECONDS < now]:
+            del self._users[user_id]
+        self.last_synced_at = datetime.utcnow()
+
+    def is_revoked(self, key: bytes, payload: dict) -> bool:
+        if self._tokens and key in self._tokens:
+            return True
+        if self._users:
+            revoked_at = self._users.get(payload.get("userId"))
+            if revoked_at is not None and payload.get("iat", 0) <= revoked_at:
+                return True
+        return False
+
+    def stats(self) -> dict:
+        return {
+            "tokens": len(self._tokens),
+            "users": len(self._users),
+            "last_synced_at": self.last_synced_at.isoformat() if self.last_synced_at else None,
+        }
+
+class TokenCache:
+    """LRU of verified token payloads keyed by the SHA-256 of the token.
+
+    An entry is used until ``expiry_margin`` seconds before the token's
+    ``exp``, tokens without ``exp`` are kept for at most ``max_ttl`` seconds.
+    """
+    def __init__(self, max_size: int = 10_000, expiry_margin: float = 30, max_ttl: float = 3600):
+        self.max_size = max_size
+        self.expiry_margin = expiry_margin
+        self.max_ttl = max_ttl
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: bytes) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        payload, valid_until = entry
+        if time.time() >= valid_until:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return payload
+
+    def put(self, key: bytes, payload: dict):
+        exp = payload.get("exp")
+        valid_until = exp - self.expiry_margin if isinstance(exp, (int, float)) else time.time() + self.max_ttl
+        self._entries[key] = (payload, valid_until)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+token_cache = TokenCache()
+revocation_list = RevocationList()
+
+def _token_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+def _epoch(moment: datetime) -> float:
+    # Naive UTC datetimes, as stored by pymongo
+    return moment.replace(tzinfo=timezone.utc).timestamp()
+
+def verify_token(token: str) -> dict:
+    """Verify an HS256 token and return its claims, the single verification path of the app.
+
+    Successfully verified tokens are cached, the revocation list is checked
+    before a cached payload is returned.  Raises ``jwt.InvalidTokenError``
+    (or its subclass ``jwt.ExpiredSignatureError``) for invalid tokens.
+    """
+    key = _token_key(token)
+    payload = token_cache.get(key)
+    if payload is None:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        token_cache.put(key, payload)
+    if revocation_list.is_revoked(key, payload):
+        raise jwt.InvalidTokenError("Token has been revoked")
+    return payload
+
 class TokenData(BaseModel):
     userId: str
     email: str
@@ -41,17 +228,7 @@ class JWTBearer(HTTPBearer):
             
             try:
                 # Декодируем токен с проверкой подписи и срока действия
-                payload = jwt.decode(
-                    credentials.credentials,
-                    SECRET_KEY,
-                    algorithms=[ALGORITHM],
-                    options={
-                        "verify_signature": True,
-                        "verify_exp": True,
-                        "verify_iat": True,
-                        "require": ["exp", "iat", "userId", "email", "name"]
-                    }
-                )
+                payload = verify_token(credentials.credentials)
                 
                 # Проверяем наличие всех необходимых полей
                 userId: str = payload.get("userId")
@@ -0,0 +1,213 @@
+import asyncio
+import math
+import os
+import re
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, List, Optional
+
+from utils.logging import logger
+
+
+class Priority(str, Enum):
+    CRITICAL = "critical"  # never shed
+    NORMAL = "normal"  # shed only well past the limit
+    LOW = "low"  # shed first
+
+
+@dataclass
+class RoutePriority:
+    method: str  # "*" for any method
+    path: str  # route template, a trailing /* matches the prefix
+    priority: Priority
+
+    def __post_init__(self):
+        prefix = self.path.endswith("/*")
+        template = self.path[:-2] if prefix else self.path
+        self.pattern = re.compile(
+            "^" + re.sub(r"\{[^/]+\}", "[^/]+", template) + ("(/.*)?$" if prefix else "$")
+        )
+
+
+# First match wins, anything else is NORMAL
+ROUTE_PRIORITIES: List[RoutePriority] = [
+    RoutePriority("GET", "/api/v1/apartments/search", Priority.LOW),
+    RoutePriority("GET", "/api/v1/apartments/nearby", Priority.LOW),
+    RoutePriority("GET", "/api/v1/apartments/promoted", Priority.LOW),
+    RoutePriority("GET", "/api/v1/apartments/{apartment_id}/similar", Priority.LOW),
+    RoutePriority("GET", "/api/v1/roommates/matches", Priority.LOW),
+    RoutePriority("GET", "/api/v1/", Priority.LOW),
+    RoutePriority("GET", "/api/v1/landlords", Priority.LOW),
+    RoutePriority("GET", "/api/v1/university/{university}", Priority.LOW),
+    RoutePriority("*", "/api/v1/admin/analytics/*", Priority.LOW),
+    RoutePriority("*", "/api/v1/admin/*", Priority.CRITICAL),
+    RoutePriority("*", "/api/v1/profile", Priority.CRITICAL),
+    RoutePriority("POST", "/api/v1/{user_id}/last-login", Priority.CRITICAL),
+    RoutePriority("POST", "/api/v1/logout", Priority.CRITICAL),
+    RoutePriority("*", "/api/v1/bookings/*", Priority.CRITICAL),
+    RoutePriority("*", "/api/v1/landlord/applications", Priority.CRITICAL),
+]
+
+ENABLED = os.getenv("LOAD_SHED_ENABLED", "true").lower() in ("1", "true", "yes")
+TARGET_MS = float(os.getenv("LOAD_SHED_TARGET_MS", "50"))
+INITIAL_LIMIT = float(os.getenv("LOAD_SHED_INITIAL_LIMIT", "64"))
+MIN_LIMIT = float(os.getenv("LOAD_SHED_MIN_LIMIT", "4"))
+MAX_LIMIT = float(os.getenv("LOAD_SHED_MAX_LIMIT", "1000"))
+# NORMAL requests are shed past this multiple of the limit
+NORMAL_HEADROOM = 2.0
+PROBE_INTERVAL = 0.05
+ADJUST_INTERVAL = 1.0
+DECREASE = 0.7
+
+
+class LoadShedder:
+    """Adaptive admission control for one worker's event loop.
+
+    A probe task sleeps ``PROBE_INTERVAL`` seconds and measures how late it
+    wakes up: the time a request queued on the loop waits before it runs.
+    Every ``ADJUST_INTERVAL`` the in-flight limit is cut by ``DECREASE`` if
+    that lag is above ``target_ms``, and grows by 10% if requests used most
+    of it, so the limit follows what the CPU sustains.  LOW requests are
+    shed as soon as the lag is above target or the limit is reached, NORMAL
+    ones past ``NORMAL_HEADROOM`` times the limit, CRITICAL ones never.
+    """
+
+    def __init__(
+        self,
+        target_ms: float = TARGET_MS,
+        initial_limit: float = INITIAL_LIMIT,
+        min_limit: float = MIN_LIMIT,
+        max_limit: float = MAX_LIMIT,
+        route_priorities: Optional[List[RoutePriority]] = None,
+        enabled: bool = ENABLED
+    ):
+        self.enabled = enabled
+        self.target = target_ms / 1000
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.route_priorities = ROUTE_PRIORITIES if route_priorities is None else route_priorities
+        self.lag = 0.0
+        self.in_flight = 0
+        self._peak = 0
+        self._task: Optional[asyncio.Task] = None
+        self.admitted: Dict[str, int] = {priority.value: 0 for priority in Priority}
+        self.shed: Dict[str, int] = {priority.value: 0 for priority in Priority}
+        self.decreases = 0
+        self.increases = 0
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._probe())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _probe(self):
+        adjusted = time.perf_counter()
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(PROBE_INTERVAL)
+            now = time.perf_counter()
+            sample = max(0.0, now - started - PROBE_INTERVAL)
+            # Rises at once, decays over a few probes
+            self.lag = sample if sample > self.lag else 0.8 * self.lag + 0.2 * sample
+            if now - adjusted >= ADJUST_INTERVAL:
+                adjusted = now
+                self._adjust()
+
+    def _adjust(self):
+        if self.lag > self.target:
+            limit = max(self.min_limit, self.limit * DECREASE)
+            if limit < self.limit:
+                self.decreases += 1
+                logger.info(f"Load shedding limit lowered to {limit:.0f}, loop lag {self.lag * 1000:.0f}ms")
+            self.limit = limit
+        elif self._peak >= 0.8 * self.limit and self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit * 1.1 + 1)
+            self.increases += 1
+        self._peak = self.in_flight
+
+    def priority(self, method: str, path: str) -> Priority:
+        for rule in self.route_priorities:
+            if (rule.method == "*" or rule.method == method) and rule.pattern.match(path):
+                return rule.priority
+        return Priority.NORMAL
+
+    def admit(self, priority: Priority) -> bool:
+        if priority == Priority.LOW:
+            admitted = self.lag <= self.target and self.in_flight < self.limit
+        elif priority == Priority.NORMAL:
+            admitted = self.in_flight < self.limit * NORMAL_HEADROOM
+        else:
+            admitted = True
+        (self.admitted if admitted else self.shed)[priority.value] += 1
+        return admitted
+
+    def enter(self):
+        self.in_flight += 1
+        self._peak = max(self._peak, self.in_flight)
+
+    def leave(self):
+        self.in_flight -= 1
+
+    def retry_after(self) -> int:
+        # Longer the further past the target the loop is
+        return max(1, min(10, math.ceil(self.lag / self.target))) if self.target > 0 else 1
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "lag_ms": round(self.lag * 1000, 1),
+            "target_ms": self.target * 1000,
+            "limit": round(self.limit),
+            "in_flight": self.in_flight,
+            "decreases": self.decreases,
+            "increases": self.increases,
+            "admitted": dict(self.admitted),
+            "shed": dict(self.shed),
+        }
+
+
+load_shedder = LoadShedder()
+
+
+class LoadSheddingMiddleware:
+    """Rejects low-priority requests with 503 and ``Retry-After`` while the worker is overloaded."""
+
+    def __init__(self, app, shedder: Optional[LoadShedder] = None):
+        self.app = app
+        self.shedder = shedder or load_shedder
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.shedder.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        shedder = self.shedder
+        if not shedder.admit(shedder.priority(scope["method"], scope["path"])):
+            body = b'{"detail":"Server overloaded, try again later"}'
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(shedder.retry_after()).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        shedder.enter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            shedder.leave()
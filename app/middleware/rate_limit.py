@@ -0,0 +1,273 @@
+import math
+import os
+import re
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import jwt
+from pymongo import ReturnDocument
+from middleware.auth import verify_token
+from utils.logging import logger
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    rate: float  # tokens added per second
+    burst: int  # bucket capacity
+
+    @property
+    def window(self) -> int:
+        # Seconds an empty bucket needs to refill completely
+        return max(1, math.ceil(self.burst / self.rate))
+
+
+@dataclass
+class RouteLimit:
+    method: str
+    path: str  # exact path or route template, e.g. /api/v1/apartments/{apartment_id}
+    limit: RateLimit
+    concurrency: Optional[int] = None  # max in-flight requests for the route, None for no cap
+
+    def __post_init__(self):
+        self.pattern = re.compile("^" + re.sub(r"\{[^/]+\}", "[^/]+", self.path) + "$")
+        self.name = f"{self.method} {self.path}"
+
+
+@dataclass
+class BucketState:
+    allowed: bool
+    remaining: int
+    reset_after: float  # seconds until the bucket is full again
+    retry_after: float  # seconds until the next request would be allowed
+
+
+def parse_limit(value: str) -> RateLimit:
+    """Parse "rate/burst", e.g. "10/40" for 10 requests per second with bursts of 40."""
+    rate, burst = value.split("/")
+    return RateLimit(rate=float(rate), burst=int(burst))
+
+
+DEFAULT_LIMIT = parse_limit(os.getenv("RATE_LIMIT_DEFAULT", "10/40"))
+
+ROUTE_LIMITS: List[RouteLimit] = [
+    RouteLimit("GET", "/api/v1/apartments/search", RateLimit(rate=2, burst=10), concurrency=8),
+    RouteLimit("GET", "/api/v1/apartments/nearby", RateLimit(rate=2, burst=10), concurrency=8),
+    RouteLimit("POST", "/api/v1/bookings", RateLimit(rate=0.2, burst=5)),
+    RouteLimit("POST", "/api/v1/apartments", RateLimit(rate=0.1, burst=5)),
+    RouteLimit("POST", "/api/v1/reviews", RateLimit(rate=0.1, burst=5)),
+]
+
+
+class TokenBucketStore(ABC):
+    @abstractmethod
+    async def consume(self, key: str, limit: RateLimit, cost: float = 1.0) -> BucketState:
+        pass
+
+
+def _state(tokens: float, limit: RateLimit, allowed: bool, cost: float) -> BucketState:
+    return BucketState(
+        allowed=allowed,
+        remaining=int(tokens),
+        reset_after=(limit.burst - tokens) / limit.rate,
+        retry_after=0.0 if allowed else (cost - tokens) / limit.rate,
+    )
+
+
+class InMemoryTokenBucketStore(TokenBucketStore):
+    """Per-process buckets, the least recently used key is evicted past ``max_keys``."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def consume(self, key: str, limit: RateLimit, cost: float = 1.0) -> BucketState:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = float(limit.burst)
+            if len(self._buckets) >= self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            tokens = min(float(limit.burst), bucket[0] + (now - bucket[1]) * limit.rate)
+            self._buckets.move_to_end(key)
+
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._buckets[key] = (tokens, now)
+        return _state(tokens, limit, allowed, cost)
+
+
+class MongoTokenBucketStore(TokenBucketStore):
+    """Buckets shared by every worker and machine, one document per key.
+
+    The refill and the take happen in a single pipeline update, so concurrent
+    requests for the same key cannot both spend the last token.
+    """
+
+    def __init__(self, ttl_seconds: int = 3600):
+        self.collection = None
+        self.ttl_seconds = ttl_seconds
+
+    async def connect(self, client):
+        # Called from the lifespan once the worker's client exists; until then
+        # consume() fails and the middleware lets requests through
+        self.collection = client.get_database("diploma")["RateLimits"]
+        await self.collection.create_index("updatedAt", expireAfterSeconds=self.ttl_seconds)
+
+    async def consume(self, key: str, limit: RateLimit, cost: float = 1.0) -> BucketState:
+        now = datetime.utcnow()
+        refilled = {
+            "$min": [
+                limit.burst,
+                {
+                    "$add": [
+                        {"$ifNull": ["$tokens", limit.burst]},
+                        {
+                            "$multiply": [
+                                {"$divide": [{"$subtract": [now, {"$ifNull": ["$updatedAt", now]}]}, 1000]},
+                                limit.rate,
+                            ]
+                        },
+                    ]
+                },
+            ]
+        }
+        document = await self.collection.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "updatedAt": now}},
+                {"$set": {"allowed": {"$gte": ["$tokens", cost]}}},
+                {"$set": {"tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", cost]}, "$tokens"]}}},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return _state(document["tokens"], limit, document["allowed"], cost)
+
+
+class RateLimitMiddleware:
+    """Token-bucket rate limiting keyed by the JWT ``userId`` or the client IP.
+
+    Requests matching one of ``route_limits`` use that route's bucket and
+    concurrency cap, every other request shares the ``default_limit`` bucket
+    of its caller.  If the store fails the request is let through.
+    """
+
+    def __init__(
+        self,
+        app,
+        store: Optional[TokenBucketStore] = None,
+        default_limit: RateLimit = DEFAULT_LIMIT,
+        route_limits: Optional[List[RouteLimit]] = None,
+        enabled: Optional[bool] = None,
+        trust_proxy: Optional[bool] = None,
+    ):
+        self.app = app
+        self.store = store or InMemoryTokenBucketStore()
+        self.default_limit = default_limit
+        self.route_limits = ROUTE_LIMITS if route_limits is None else route_limits
+        if enabled is None:
+            enabled = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.enabled = enabled
+        if trust_proxy is None:
+            trust_proxy = os.getenv("RATE_LIMIT_TRUST_PROXY", "false").lower() in ("1", "true", "yes")
+        self.trust_proxy = trust_proxy
+        self._exact: Dict[tuple, RouteLimit] = {
+            (rule.method, rule.path): rule for rule in self.route_limits if "{" not in rule.path
+        }
+        self._templated = [rule for rule in self.route_limits if "{" in rule.path]
+        self._in_flight: Dict[str, int] = {}
+
+    def match(self, method: str, path: str) -> Optional[RouteLimit]:
+        rule = self._exact.get((method, path))
+        if rule is not None:
+            return rule
+        for rule in self._templated:
+            if rule.method == method and rule.pattern.match(path):
+                return rule
+        return None
+
+    def identify(self, scope) -> str:
+        headers = dict(scope["headers"])
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        if authorization.startswith("Bearer "):
+            # Shares the verified-token cache with get_current_user
+            try:
+                user_id = verify_token(authorization[7:]).get("userId")
+                if user_id:
+                    return f"user:{user_id}"
+            except jwt.InvalidTokenError:
+                pass
+
+        # Set by fly.io's proxy, which overwrites any value sent by the client; only
+        # trusted when requests can reach the app through that proxy alone
+        if self.trust_proxy:
+            fly_client_ip = headers.get(b"fly-client-ip")
+            if fly_client_ip:
+                return f"ip:{fly_client_ip.decode('latin-1')}"
+        # Already resolved from the proxy headers by uvicorn (server.py runs it with proxy_headers)
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        rule = self.match(scope["method"], scope["path"])
+        limit = rule.limit if rule else self.default_limit
+        key = f"{rule.name if rule else '*'}:{self.identify(scope)}"
+
+        try:
+            state = await self.store.consume(key, limit)
+        except Exception as e:
+            logger.error(f"Rate limit store failed for {key}: {str(e)}")
+            await self.app(scope, receive, send)
+            return
+
+        headers = [
+            (b"ratelimit-limit", str(limit.burst).encode()),
+            (b"ratelimit-remaining", str(state.remaining).encode()),
+            (b"ratelimit-reset", str(math.ceil(state.reset_after)).encode()),
+            (b"ratelimit-policy", f"{limit.burst};w={limit.window}".encode()),
+        ]
+        if not state.allowed:
+            headers.append((b"retry-after", str(max(1, math.ceil(state.retry_after))).encode()))
+            await self._reject(send, 429, b'{"detail":"Too many requests"}', headers)
+            return
+
+        if rule is not None and rule.concurrency is not None:
+            in_flight = self._in_flight.get(rule.name, 0)
+            if in_flight >= rule.concurrency:
+                await self._reject(send, 503, b'{"detail":"Server busy, try again later"}',
+                                   headers + [(b"retry-after", b"1")])
+                return
+            self._in_flight[rule.name] = in_flight + 1
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            if rule is not None and rule.concurrency is not None:
+                self._in_flight[rule.name] -= 1
+
+    @staticmethod
+    async def _reject(send, status_code: int, body: bytes, headers: list):
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ] + headers,
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,30 @@
+from datetime import date
+from typing import Dict, Optional
+from pydantic import BaseModel
+
+# district is set when the series is per district or filtered by one
+
+class OccupancyPoint(BaseModel):
+    date: date
+    district: Optional[str] = None
+    occupied_nights: int
+    apartments: int
+    occupancy_rate: Optional[float] = None  # occupied nights per active apartment
+
+class BookingsPoint(BaseModel):
+    date: date
+    district: Optional[str] = None
+    created: int
+    by_status: Dict[str, int]
+
+class PricePoint(BaseModel):
+    date: date
+    district: Optional[str] = None
+    apartments: int
+    average_price: Optional[float] = None
+
+class ReviewsPoint(BaseModel):
+    date: date
+    district: Optional[str] = None
+    reviews: int
+    average_rating: Optional[float] = None
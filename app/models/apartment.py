@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict
 from pydantic import BaseModel
 from bson import ObjectId
 
@@ -67,4 +67,30 @@ class Apartment(BaseModel):
         if not data:
             return None
         id = data.pop('_id', None)
-        return cls(**dict(data, apartmentId=str(id))) 
\ No newline at end of file
+        return cls(**dict(data, apartmentId=str(id)))
+
+class ApartmentOwner(BaseModel):
+    userId: str
+    name: Optional[str] = None
+    surname: Optional[str] = None
+    avatar_url: Optional[str] = None
+    is_verified_landlord: bool = False
+
+class ApartmentWithOwner(Apartment):
+    owner: Optional[ApartmentOwner] = None
+
+class SimilarApartment(BaseModel):
+    apartmentId: str
+    apartment_name: Optional[str] = None
+    price_per_month: Optional[int] = None
+    district_name: Optional[str] = None
+    rental_type: Optional[str] = None
+    university_nearby: Optional[str] = None
+    number_of_rooms: Optional[int] = None
+    picture: Optional[str] = None
+    score: float
+
+class ApartmentPicture(BaseModel):
+    sha256: str
+    url: str  # the largest thumbnail, as stored in Apartment.pictures
+    thumbnails: Dict[str, str]  # width -> url
@@ -1,6 +1,6 @@
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel, Field
+from typing import Optional, List
+from pydantic import BaseModel, Field, field_validator
 from enum import Enum
 from bson import ObjectId
 
@@ -25,6 +25,7 @@ class BookingStatus(str, Enum):
     REJECTED = "rejected"
     CANCELLED = "cancelled"
     COMPLETED = "completed"
+    EXPIRED = "expired"
 
 class CreateBooking(BaseModel):
     apartmentId: str
@@ -65,4 +66,57 @@ class Booking(BaseModel):
         if not data:
             return None
         id = data.pop('_id', None)
-        return cls(**dict(data, bookingId=str(id))) 
\ No newline at end of file
+        return cls(**dict(data, bookingId=str(id))) 
+
+class Applicant(BaseModel):
+    userId: str
+    name: Optional[str] = None
+    surname: Optional[str] = None
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    university: Optional[str] = None
+    avatar_url: Optional[str] = None
+
+class BookingApartment(BaseModel):
+    apartmentId: str
+    apartment_name: str
+    district_name: Optional[str] = None
+    price_per_month: Optional[int] = None
+    rental_type: Optional[str] = None
+    picture: Optional[str] = None
+
+class LandlordApplication(Booking):
+    applicant: Optional[Applicant] = None
+    apartment: BookingApartment
+
+class UserBooking(Booking):
+    apartment: Optional[BookingApartment] = None
+
+class LandlordApplicationsPage(BaseModel):
+    items: List[LandlordApplication]
+    next_cursor: Optional[str] = None
+
+class BookingDecision(BaseModel):
+    bookingId: str
+    status: BookingStatus
+
+    @field_validator("status")
+    @classmethod
+    def validate_status(cls, value):
+        if value not in (BookingStatus.ACCEPTED, BookingStatus.REJECTED):
+            raise ValueError("status must be 'accepted' or 'rejected'")
+        return value
+
+class BookingDecisionsRequest(BaseModel):
+    decisions: List[BookingDecision] = Field(..., min_length=1, max_length=500)
+
+class BookingDecisionOutcome(BaseModel):
+    bookingId: str
+    # accepted, rejected, conflict, not_pending, not_found, forbidden or duplicate
+    outcome: str
+    detail: Optional[str] = None
+
+class BookingDecisionsResult(BaseModel):
+    results: List[BookingDecisionOutcome]
+    auto_rejected: List[str]
+    modified: int
@@ -0,0 +1,59 @@
+from datetime import datetime
+from typing import Optional, List, Dict
+from pydantic import BaseModel, Field
+from bson import ObjectId
+
+class Message(BaseModel):
+    messageId: str
+    chatId: str
+    senderId: str
+    text: str
+    created_at: datetime
+
+    @classmethod
+    def from_mongo(cls, data: dict):
+        if not data:
+            return None
+        id = data.pop('_id', None)
+        return cls(**dict(data, messageId=str(id)))
+
+class Chat(BaseModel):
+    chatId: Optional[str] = None
+    participants: List[str]
+    apartmentId: Optional[str] = None
+    created_at: datetime
+    last_message_at: Optional[datetime] = None
+    last_message: Optional[str] = None
+    unread: Dict[str, int] = {}
+
+    class Config:
+        validate_by_name = True
+        arbitrary_types_allowed = True
+        json_encoders = {
+            ObjectId: str
+        }
+
+    @classmethod
+    def from_mongo(cls, data: dict):
+        if not data:
+            return None
+        id = data.pop('_id', None)
+        return cls(**dict(data, chatId=str(id)))
+
+class ChatCreate(BaseModel):
+    landlord_id: str
+    message: str = Field(..., min_length=1, max_length=4000)
+    apartment_id: Optional[str] = None
+
+class ChatSummary(BaseModel):
+    chatId: str
+    participants: List[str]
+    apartmentId: Optional[str] = None
+    last_message_at: Optional[datetime] = None
+    last_message: Optional[str] = None
+    unread: int = 0
+
+class ChatHistoryPage(BaseModel):
+    chat_id: str
+    messages: List[Message]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,61 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel
+from bson import ObjectId
+
+class SavedSearchFilters(BaseModel):
+    """Listing filters of GET /apartments/search, with the same names and meaning."""
+    min_price: Optional[int] = None
+    max_price: Optional[int] = None
+    location: Optional[str] = None
+    university: Optional[str] = None
+    room_type: Optional[str] = None
+
+class SavedSearchCreate(BaseModel):
+    filters: SavedSearchFilters
+
+class SavedSearch(BaseModel):
+    searchId: Optional[str] = None
+    userId: str
+    filters: SavedSearchFilters
+    created_at: datetime
+
+    class Config:
+        validate_by_name = True
+        arbitrary_types_allowed = True
+        json_encoders = {
+            ObjectId: str
+        }
+
+    @classmethod
+    def from_mongo(cls, data: dict):
+        if not data:
+            return None
+        id = data.pop('_id', None)
+        return cls(**dict(data, searchId=str(id)))
+
+class Notification(BaseModel):
+    notificationId: Optional[str] = None
+    userId: str
+    type: str = "new_apartment"
+    searchId: str
+    apartmentId: str
+    apartment_name: str
+    district_name: str
+    price_per_month: int
+    created_at: datetime
+    is_read: bool = False
+
+    class Config:
+        validate_by_name = True
+        arbitrary_types_allowed = True
+        json_encoders = {
+            ObjectId: str
+        }
+
+    @classmethod
+    def from_mongo(cls, data: dict):
+        if not data:
+            return None
+        id = data.pop('_id', None)
+        return cls(**dict(data, notificationId=str(id)))
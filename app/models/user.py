@@ -70,4 +70,18 @@ class User(BaseModel):
         if not data:
             return None
         id = data.pop('_id', None)
-        return cls(**dict(data, userId=str(id))) 
\ No newline at end of file
+        return cls(**dict(data, userId=str(id)))
+
+class RoommateMatch(BaseModel):
+    userId: str
+    name: Optional[str] = None
+    surname: Optional[str] = None
+    gender: Optional[str] = None
+    university: Optional[str] = None
+    city: Optional[str] = None
+    bio: Optional[str] = None
+    avatar_url: Optional[str] = None
+    language_preferences: Optional[List[str]] = None
+    roommate_preferences: Optional[str] = None
+    budget_range: Optional[Dict[str, int]] = None
+    score: float  # 0..1
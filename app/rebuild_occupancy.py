@@ -0,0 +1,27 @@
+"""Recompute Apartments.occupancy from the bookings.
+
+    python rebuild_occupancy.py
+
+The occupancy lists are kept up to date by BookingRepository on every
+booking write; run this once after deploying the date filter on apartment
+search, or to repair the lists after bookings were edited by hand.
+"""
+import asyncio
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from dependencies import MONGODB_URL
+from repositories.booking_repository import BookingRepository
+
+
+async def main():
+    client = AsyncIOMotorClient(MONGODB_URL)
+    try:
+        count = await BookingRepository(client).rebuild_occupancy()
+        print(f"Occupancy rebuilt, {count} apartments have bookings")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,46 @@
+"""Recompute the daily analytics rollups from bookings, apartments and reviews.
+
+    python rebuild_rollups.py --days 365
+    python rebuild_rollups.py --start 2025-01-01 --end 2025-06-30
+
+The rollups job keeps recent days up to date; run this after deploying
+it to fill the history, or after bookings or reviews were deleted or
+edited by hand.  It waits for the ``rollups`` lease, so it never runs
+alongside the job.
+"""
+import argparse
+import asyncio
+from datetime import date, datetime, timedelta
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from dependencies import MONGODB_URL
+from repositories.analytics_repository import AnalyticsRepository
+from services.analytics_rollups import AnalyticsRollups
+from utils.lease import MongoLease
+
+
+async def main(args):
+    client = AsyncIOMotorClient(MONGODB_URL)
+    end = args.end or datetime.utcnow().date()
+    start = args.start or end - timedelta(days=args.days - 1)
+    lease = MongoLease(client, "rollups", ttl_seconds=600)
+    try:
+        repository = AnalyticsRepository(client)
+        await repository.create_indexes()
+        while not await lease.acquire():
+            print("Waiting for the rollups job to finish")
+            await asyncio.sleep(10)
+        result = await AnalyticsRollups(repository, lease, enabled=False).backfill(start, end)
+        print(f"Rollups rebuilt for {result['days']} days, {start} to {end}")
+    finally:
+        await lease.release()
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--start", type=date.fromisoformat)
+    parser.add_argument("--end", type=date.fromisoformat)
+    asyncio.run(main(parser.parse_args()))
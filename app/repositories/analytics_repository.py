@@ -0,0 +1,133 @@
+from datetime import datetime, date, time, timedelta
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from motor.motor_asyncio import AsyncIOMotorClient
+from bson import ObjectId
+from pymongo import ReplaceOne, UpdateOne
+
+# Half-open [start, end) datetime ranges, one per run of consecutive days
+Spans = List[Tuple[datetime, datetime]]
+
+
+def day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min)
+
+
+def spans(days: Iterable[date]) -> Spans:
+    result = []
+    for day in sorted(set(days)):
+        start = day_start(day)
+        if result and result[-1][1] == start:
+            result[-1] = (result[-1][0], start + timedelta(days=1))
+        else:
+            result.append((start, start + timedelta(days=1)))
+    return result
+
+
+class AnalyticsRepository:
+    """Daily rollups (``DailyRollups``, one document per metric, day and district) and their sources."""
+
+    def __init__(self, client: AsyncIOMotorClient):
+        self.db = client.get_database("diploma")
+        self.collection = self.db["DailyRollups"]
+        self.state = self.db["RollupState"]
+        # Dates of the stays last counted, so that a booking moved or cancelled frees its old nights
+        self.counted_stays = self.db["RollupStays"]
+        self.apartments = self.db["Apartments"]
+        self.archive = self.db["ApartmentsArchive"]
+        self.bookings = self.db["Bookings"]
+        self.reviews = self.db["Reviews"]
+
+    async def create_indexes(self):
+        await self.collection.create_index([("metric", 1), ("date", 1), ("district", 1)], unique=True)
+        # Changes since the last run and the days they belong to
+        await self.bookings.create_index("updatedAt")
+        await self.bookings.create_index("createdAt")
+        await self.reviews.create_index("updatedAt")
+        await self.reviews.create_index("createdAt")
+
+    async def get_watermark(self) -> Optional[datetime]:
+        state = await self.state.find_one({"_id": "rollups"})
+        return state["watermark"] if state else None
+
+    async def set_watermark(self, watermark: datetime):
+        await self.state.update_one({"_id": "rollups"}, {"$set": {"watermark": watermark}}, upsert=True)
+
+    def iter_changed(self, source: str, since: datetime, projection: dict) -> AsyncIterator[dict]:
+        return self.db[source].find({"updatedAt": {"$gte": since}}, projection).batch_size(5000)
+
+    def iter_created(self, source: str, ranges: Spans, projection: dict) -> AsyncIterator[dict]:
+        query = {"$or": [{"createdAt": {"$gte": start, "$lt": end}} for start, end in ranges]}
+        return self.db[source].find(query, projection).batch_size(5000)
+
+    def iter_stays(self, statuses: List[str], ranges: Spans) -> AsyncIterator[dict]:
+        """Bookings in ``statuses`` whose stay overlaps one of ``ranges``."""
+        query = {
+            "status": {"$in": statuses},
+            "$or": [{"check_in_date": {"$lt": end}, "check_out_date": {"$gt": start}} for start, end in ranges]
+        }
+        projection = {"apartmentId": 1, "check_in_date": 1, "check_out_date": 1}
+        return self.bookings.find(query, projection).batch_size(5000)
+
+    async def get_counted_stays(self, booking_ids: List[ObjectId]) -> List[dict]:
+        return await self.counted_stays.find({"_id": {"$in": booking_ids}}).to_list(length=None)
+
+    async def save_counted_stays(self, stays: List[dict]):
+        if stays:
+            await self.counted_stays.bulk_write([
+                ReplaceOne(
+                    {"_id": stay["_id"]},
+                    {"check_in_date": stay["check_in_date"], "check_out_date": stay["check_out_date"]},
+                    upsert=True
+                )
+                for stay in stays
+            ], ordered=False)
+
+    async def delete_counted_stays(self, booking_ids: List[ObjectId]):
+        if booking_ids:
+            await self.counted_stays.delete_many({"_id": {"$in": booking_ids}})
+
+    def iter_apartments(self) -> AsyncIterator[dict]:
+        projection = {"district_name": 1, "price_per_month": 1, "is_active": 1, "createdAt": 1}
+        return self.apartments.find({}, projection).batch_size(5000)
+
+    async def get_districts(self, apartment_ids: Iterable[str]) -> Dict[str, Optional[str]]:
+        object_ids = [ObjectId(apartment_id) for apartment_id in set(apartment_ids) if ObjectId.is_valid(apartment_id)]
+        districts = {}
+        async for document in self.apartments.find({"_id": {"$in": object_ids}}, {"district_name": 1}):
+            districts[str(document["_id"])] = document.get("district_name")
+        archived = [object_id for object_id in object_ids if str(object_id) not in districts]
+        if archived:
+            async for document in self.archive.find({"_id": {"$in": archived}}, {"district_name": 1}):
+                districts[str(document["_id"])] = document.get("district_name")
+        return districts
+
+    async def save_rollups(self, values: Dict[Tuple[str, date, Optional[str]], float], computed_at: datetime):
+        if values:
+            await self.collection.bulk_write([
+                UpdateOne(
+                    {"metric": metric, "date": day_start(day), "district": district},
+                    {"$set": {"value": value, "computedAt": computed_at}},
+                    upsert=True
+                )
+                for (metric, day, district), value in values.items()
+            ], ordered=False)
+
+    async def delete_stale(self, metrics: List[str], ranges: Spans, computed_before: datetime):
+        """Removes rollups of the recomputed days that the recompute did not write, i.e. that became zero."""
+        if ranges:
+            await self.collection.delete_many({
+                "metric": {"$in": metrics},
+                "$or": [{"date": {"$gte": start, "$lt": end}} for start, end in ranges],
+                "computedAt": {"$lt": computed_before}
+            })
+
+    async def get_rollups(self, metrics: List[str], start: date, end: date, district: Optional[str] = None) -> List[dict]:
+        try:
+            query = {"metric": {"$in": metrics}, "date": {"$gte": day_start(start), "$lte": day_start(end)}}
+            if district is not None:
+                query["district"] = district
+            return await self.collection.find(query, {"_id": 0, "metric": 1, "date": 1, "district": 1, "value": 1}) \
+                .to_list(length=None)
+        except Exception as e:
+            print(e)
+            return []
@@ -1,15 +1,66 @@
-from typing import Optional, List
+from typing import Optional, List, Dict, AsyncIterator
 from datetime import datetime
-from models.apartment import Apartment
+from models.apartment import Apartment, SimilarApartment
 from repositories.base import BaseRepository
 from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
 from fastapi.encoders import jsonable_encoder
+from pymongo import ReplaceOne, DeleteOne, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from utils.merge_patch import MergePatch
+
+# Fields the similar apartments job reads, features and the summary shown in the rail
+SIMILARITY_PROJECTION = {
+    "price_per_month": 1, "area": 1, "number_of_rooms": 1, "rental_type": 1, "latitude": 1, "longitude": 1,
+    "university_nearby": 1, "is_active": 1, "apartment_name": 1, "district_name": 1, "pictures": {"$slice": 1}
+}
+
+# Fields ranking_score reads
+RANKING_PROJECTION = {
+    "is_promoted": 1, "pictures": 1, "description": 1, "createdAt": 1,
+    "reviewCount": 1, "ratingAverage": 1, "rankingScore": 1
+}
+# Listing order, _id breaks ties so pages are stable
+RANKING_SORT = [("rankingScore", -1), ("_id", -1)]
+# Listings shown by search, nearby and promoted; the partial indexes cover only these
+ACTIVE = {"is_active": True}
+ACTIVE_INDEXES = [
+    RANKING_SORT,
+    [("is_promoted", 1)] + RANKING_SORT,
+    [("district_name", 1)] + RANKING_SORT,
+    [("university_nearby", 1)] + RANKING_SORT,
+]
+
+# Error code of an update through a field that is not a document
+PATH_NOT_VIABLE = 28
+
+def _index_keys(keys) -> list:
+    return [(field, direction if isinstance(direction, str) else int(direction)) for field, direction in keys]
 
 class ApartmentRepository(BaseRepository[Apartment]):
     def __init__(self, client: AsyncIOMotorClient):
         self.db = client.get_database("diploma")
         self.collection = self.db["Apartments"]
+        self.archive = self.db["ApartmentsArchive"]
+        self.similar = self.db["SimilarApartments"]
+        self.similarity_queue = self.db["SimilarityQueue"]
+
+    async def create_indexes(self):
+        await self.collection.create_index("ownerId")
+        await self.collection.create_index("occupancy.bookingId")
+        # Replaced by the partial indexes below
+        active_keys = [_index_keys(keys) for keys in ACTIVE_INDEXES]
+        for name, info in (await self.collection.index_information()).items():
+            if _index_keys(info["key"]) in active_keys and "partialFilterExpression" not in info:
+                await self.collection.drop_index(name)
+        # Equality filters first, then the sort, so ranked pages are read in index order
+        for keys in ACTIVE_INDEXES:
+            await self.collection.create_index(keys, partialFilterExpression=ACTIVE)
+        # Listings for the archiver, inactive ones and active ones by age
+        await self.collection.create_index([("is_active", 1), ("updatedAt", 1)])
+        await self.archive.create_index("ownerId")
+        await self.similar.create_index("updatedAt")
+        await self.similarity_queue.create_index("queuedAt")
 
     async def create(self, entity: Apartment) -> Apartment:
         try:
@@ -26,11 +77,30 @@ class ApartmentRepository(BaseRepository[Apartment]):
     async def get_by_id(self, entity_id: str) -> Optional[Apartment]:
         try:
             result = await self.collection.find_one({"_id": ObjectId(entity_id)})
+            if result is None:
+                result = await self.archive.find_one({"_id": ObjectId(entity_id)})
             return Apartment.from_mongo(result)
         except Exception as e:
             print(e)
             return None
 
+    async def get_many(self, entity_ids: List[str]) -> Dict[str, Apartment]:
+        try:
+            object_ids = [ObjectId(entity_id) for entity_id in entity_ids if ObjectId.is_valid(entity_id)]
+            apartments = {}
+            async for document in self.collection.find({"_id": {"$in": object_ids}}):
+                apartment = Apartment.from_mongo(document)
+                apartments[apartment.apartmentId] = apartment
+            archived = [object_id for object_id in object_ids if str(object_id) not in apartments]
+            if archived:
+                async for document in self.archive.find({"_id": {"$in": archived}}):
+                    apartment = Apartment.from_mongo(document)
+                    apartments[apartment.apartmentId] = apartment
+            return apartments
+        except Exception as e:
+            print(e)
+            return {}
+
     async def get_all(self, skip: int = 0, limit: int = 100) -> List[Apartment]:
         try:
             cursor = self.collection.find().skip(skip).limit(limit)
@@ -56,20 +126,59 @@ class ApartmentRepository(BaseRepository[Apartment]):
             print(e)
             return None
 
+    async def patch(self, entity_id: str, patch: MergePatch, owner_id: Optional[str] = None) -> Optional[Apartment]:
+        """Applies ``patch``, only to an apartment of ``owner_id`` when given; None when nothing matched.
+
+        Database errors are raised, so that they are not taken for a missing apartment.
+        """
+        if not ObjectId.is_valid(entity_id):
+            return None
+        query = {"_id": ObjectId(entity_id)}
+        if owner_id is not None:
+            query["ownerId"] = owner_id
+        now = datetime.utcnow()
+        update = patch.update(updated_at=now, updatedAt=now)
+        try:
+            result = await self.collection.find_one_and_update(query, update, return_document=True)
+        except OperationFailure as e:
+            if e.code != PATH_NOT_VIABLE:
+                raise
+            # A sub-document stored as null takes no dotted fields, the patched
+            # object becomes the whole sub-document
+            for parent in sorted(patch.parents):
+                await self.collection.update_one(dict(query, **{parent: None}), {"$set": {parent: {}}})
+            result = await self.collection.find_one_and_update(query, update, return_document=True)
+        return Apartment.from_mongo(result)
+
+    async def add_pictures(self, entity_id: str, urls: List[str]) -> Optional[Apartment]:
+        try:
+            now = datetime.utcnow()
+            result = await self.collection.find_one_and_update(
+                {"_id": ObjectId(entity_id)},
+                {"$addToSet": {"pictures": {"$each": urls}}, "$set": {"updated_at": now, "updatedAt": now}},
+                return_document=True
+            )
+            return Apartment.from_mongo(result)
+        except Exception as e:
+            print(e)
+            return None
+
     async def delete(self, entity_id: str) -> bool:
         try:
             result = await self.collection.delete_one({"_id": ObjectId(entity_id)})
-            return result.deleted_count > 0
+            archived = await self.archive.delete_one({"_id": ObjectId(entity_id)})
+            return result.deleted_count + archived.deleted_count > 0
         except Exception as e:
             print(e)
             return False
 
     async def get_by_owner(self, owner_id: str) -> List[Apartment]:
+        """Listings of an owner, archived ones included so that they can be reactivated."""
         try:
-            cursor = self.collection.find({"ownerId": owner_id})
             apartments = []
-            async for document in cursor:
-                apartments.append(Apartment.from_mongo(document))
+            for collection in (self.collection, self.archive):
+                async for document in collection.find({"ownerId": owner_id}):
+                    apartments.append(Apartment.from_mongo(document))
             return apartments
         except Exception as e:
             print(e)
@@ -82,11 +191,14 @@ class ApartmentRepository(BaseRepository[Apartment]):
         location: Optional[str] = None,
         university: Optional[str] = None,
         room_type: Optional[str] = None,
+        check_in: Optional[datetime] = None,
+        check_out: Optional[datetime] = None,
+        after: Optional[str] = None,
         skip: int = 0,
         limit: int = 100
     ) -> List[Apartment]:
         try:
-            query = {}
+            query = dict(ACTIVE)
             if min_price is not None:
                 query["price_per_month"] = {"$gte": min_price}
             if max_price is not None:
@@ -97,16 +209,40 @@ class ApartmentRepository(BaseRepository[Apartment]):
                 query["university_nearby"] = university
             if room_type:
                 query["rental_type"] = room_type
+            if check_in and check_out:
+                # Free when no occupied interval overlaps [check_in, check_out],
+                # same rule as BookingRepository.check_availability
+                query["occupancy"] = {
+                    "$not": {"$elemMatch": {"start": {"$lte": check_out}, "end": {"$gte": check_in}}}
+                }
 
-            cursor = self.collection.find(query).skip(skip).limit(limit)
-            apartments = []
-            async for document in cursor:
-                apartments.append(Apartment.from_mongo(document))
-            return apartments
+            return await self._ranked(query, after, skip, limit)
         except Exception as e:
             print(e)
             return []
 
+    async def _ranked(self, query: dict, after: Optional[str], skip: int, limit: int) -> List[Apartment]:
+        """A page of ``query`` in ranking order, after the apartment ``after`` when given."""
+        if after:
+            anchor = await self.collection.find_one({"_id": ObjectId(after)}, {"rankingScore": 1})
+            if anchor is None:
+                return []
+            score = anchor.get("rankingScore")
+            # Apartments not scored yet sort last
+            following = [{"rankingScore": None, "_id": {"$lt": anchor["_id"]}}]
+            if score is not None:
+                following = [
+                    {"rankingScore": {"$lt": score}},
+                    {"rankingScore": score, "_id": {"$lt": anchor["_id"]}},
+                    {"rankingScore": None},
+                ]
+            query = {"$and": [query, {"$or": following}]}
+        cursor = self.collection.find(query).sort(RANKING_SORT).skip(skip).limit(limit)
+        apartments = []
+        async for document in cursor:
+            apartments.append(Apartment.from_mongo(document))
+        return apartments
+
     async def get_nearby(
         self,
         latitude: float,
@@ -122,6 +258,7 @@ class ApartmentRepository(BaseRepository[Apartment]):
                         "near": {"type": "Point", "coordinates": [longitude, latitude]},
                         "distanceField": "distance",
                         "maxDistance": radius_km * 1000,
+                        "query": ACTIVE,
                         "spherical": True
                     }
                 },
@@ -138,13 +275,146 @@ class ApartmentRepository(BaseRepository[Apartment]):
             print(e)
             return []
 
-    async def get_promoted(self, skip: int = 0, limit: int = 100) -> List[Apartment]:
+    async def get_promoted(self, after: Optional[str] = None, skip: int = 0, limit: int = 100) -> List[Apartment]:
         try:
-            cursor = self.collection.find({"is_promoted": True}).skip(skip).limit(limit)
-            apartments = []
-            async for document in cursor:
-                apartments.append(Apartment.from_mongo(document))
-            return apartments
+            return await self._ranked(dict(ACTIVE, is_promoted=True), after, skip, limit)
         except Exception as e:
             print(e)
-            return []
\ No newline at end of file
+            return []
+
+    @staticmethod
+    def _archivable(now: datetime, updated_before: datetime) -> dict:
+        # Listings with a pending or accepted stay ahead stay, landlords still decide and see them
+        return {
+            "$or": [{"is_active": False}, {"is_active": True, "updatedAt": {"$lt": updated_before}}],
+            "occupancy": {"$not": {"$elemMatch": {"end": {"$gte": now}}}},
+        }
+
+    async def archive_batch(self, now: datetime, updated_before: datetime, limit: int) -> List[str]:
+        """Moves up to ``limit`` inactive or expired listings to ``ApartmentsArchive``, returns their ids.
+
+        Copied first and removed only if they still qualify, so a crash
+        leaves a listing in both collections (the next run finishes the
+        move) and a listing reactivated meanwhile stays hot.
+        """
+        query = self._archivable(now, updated_before)
+        documents = await self.collection.find(query).limit(limit).to_list(length=limit)
+        if not documents:
+            return []
+        ids = [document["_id"] for document in documents]
+        await self.archive.bulk_write([
+            ReplaceOne({"_id": document["_id"]}, dict(document, is_active=False, archivedAt=now), upsert=True)
+            for document in documents
+        ], ordered=False)
+        await self.collection.delete_many({"$and": [{"_id": {"$in": ids}}, query]})
+        kept = {document["_id"] async for document in self.collection.find({"_id": {"$in": ids}}, {"_id": 1})}
+        if kept:
+            await self.archive.delete_many({"_id": {"$in": list(kept)}})
+        return [str(object_id) for object_id in ids if object_id not in kept]
+
+    async def restore(self, entity_id: str, owner_id: Optional[str] = None) -> bool:
+        """Moves an archived listing (of ``owner_id`` when given) back, True when it is hot again."""
+        try:
+            query = {"_id": ObjectId(entity_id)}
+            if owner_id is not None:
+                query["ownerId"] = owner_id
+            document = await self.archive.find_one(query)
+            if document is None:
+                return False
+            document.pop("archivedAt", None)
+            try:
+                await self.collection.insert_one(document)
+            except DuplicateKeyError:
+                pass  # restored concurrently, or a move interrupted before the delete
+            await self.archive.delete_one({"_id": document["_id"]})
+            return True
+        except Exception as e:
+            print(e)
+            return False
+
+    async def is_archived(self, entity_id: str) -> bool:
+        try:
+            return await self.archive.count_documents({"_id": ObjectId(entity_id)}, limit=1) > 0
+        except Exception as e:
+            print(e)
+            return False
+
+    async def get_similar(self, apartment_id: str) -> Optional[List[SimilarApartment]]:
+        """The precomputed rail of an apartment, None when it has not been computed."""
+        try:
+            result = await self.similar.find_one({"_id": apartment_id})
+            if result is None:
+                return None
+            return [SimilarApartment(**neighbour) for neighbour in result["neighbours"]]
+        except Exception as e:
+            print(e)
+            return None
+
+    async def save_similar(self, rails: Dict[str, List[dict]], updated_at: datetime):
+        if rails:
+            await self.similar.bulk_write([
+                ReplaceOne({"_id": apartment_id}, {"neighbours": neighbours, "updatedAt": updated_at}, upsert=True)
+                for apartment_id, neighbours in rails.items()
+            ], ordered=False)
+
+    async def delete_similar(self, apartment_ids: List[str], updated_before: Optional[datetime] = None):
+        if updated_before is not None:
+            await self.similar.delete_many({"updatedAt": {"$lt": updated_before}})
+        if apartment_ids:
+            await self.similar.delete_many({"_id": {"$in": apartment_ids}})
+
+    async def iter_similarity_features(self, apartment_ids: Optional[List[str]] = None) -> AsyncIterator[dict]:
+        query = {}
+        if apartment_ids is not None:
+            query["_id"] = {"$in": [ObjectId(apartment_id) for apartment_id in apartment_ids
+                                    if ObjectId.is_valid(apartment_id)]}
+        async for document in self.collection.find(query, SIMILARITY_PROJECTION).batch_size(5000):
+            yield document
+
+    async def queue_similarity_updates(self, apartment_ids: List[str]):
+        if apartment_ids:
+            now = datetime.utcnow()
+            await self.similarity_queue.bulk_write([
+                UpdateOne({"_id": apartment_id}, {"$set": {"queuedAt": now}}, upsert=True)
+                for apartment_id in apartment_ids
+            ], ordered=False)
+
+    async def queue_similarity_update(self, apartment_id: str):
+        """Marks an apartment as created, changed or deleted for the similar apartments job."""
+        try:
+            await self.similarity_queue.update_one(
+                {"_id": apartment_id}, {"$set": {"queuedAt": datetime.utcnow()}}, upsert=True
+            )
+        except Exception as e:
+            print(e)
+
+    async def get_similarity_updates(self, limit: int = 1000) -> List[dict]:
+        return await self.similarity_queue.find().sort("queuedAt", 1).limit(limit).to_list(length=limit)
+
+    async def ack_similarity_updates(self, entries: List[dict] = (), queued_before: Optional[datetime] = None):
+        """Removes handled entries, unless the apartment was queued again meanwhile."""
+        if queued_before is not None:
+            await self.similarity_queue.delete_many({"queuedAt": {"$lt": queued_before}})
+        if entries:
+            await self.similarity_queue.bulk_write([
+                DeleteOne({"_id": entry["_id"], "queuedAt": entry["queuedAt"]}) for entry in entries
+            ], ordered=False)
+
+    async def get_ranking_features(self, apartment_id: str) -> Optional[dict]:
+        try:
+            return await self.collection.find_one({"_id": ObjectId(apartment_id)}, RANKING_PROJECTION)
+        except Exception as e:
+            print(e)
+            return None
+
+    async def iter_ranking_features(self) -> AsyncIterator[dict]:
+        async for document in self.collection.find({}, RANKING_PROJECTION).batch_size(5000):
+            yield document
+
+    async def save_rankings(self, rankings: Dict[str, dict]):
+        """Sets ``rankingScore`` (and review stats) per apartment id."""
+        if rankings:
+            await self.collection.bulk_write([
+                UpdateOne({"_id": ObjectId(apartment_id)}, {"$set": fields})
+                for apartment_id, fields in rankings.items()
+            ], ordered=False)
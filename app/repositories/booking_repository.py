@@ -1,15 +1,28 @@
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
-from models.booking import Booking, BookingStatus
+from models.booking import Booking, BookingStatus, BookingApartment, LandlordApplication, UserBooking
 from repositories.base import BaseRepository
 from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
+from pymongo import UpdateOne
+from utils.merge_patch import MergePatch
+
+# Statuses that hold the dates, see check_availability and Apartments.occupancy
+BLOCKING_STATUSES = [BookingStatus.PENDING.value, BookingStatus.ACCEPTED.value]
+OCCUPANCY_FIELDS = {"status", "check_in_date", "check_out_date"}
 
 class BookingRepository(BaseRepository[Booking]):
     def __init__(self, client: AsyncIOMotorClient):
         self.db = client.get_database("diploma")
         self.collection = self.db["Bookings"]
 
+    async def create_indexes(self):
+        await self.collection.create_index("apartmentId")
+        await self.collection.create_index([("userId", 1), ("_id", -1)])
+        # Lifecycle scans (accepted past check-out, pending past check-in)
+        await self.collection.create_index([("status", 1), ("check_out_date", 1)])
+        await self.collection.create_index([("status", 1), ("check_in_date", 1)])
+
     async def create(self, entity: Booking) -> Booking:
         try:
             entity_dict = entity.dict()
@@ -17,7 +30,9 @@ class BookingRepository(BaseRepository[Booking]):
             entity_dict["updatedAt"] = datetime.utcnow()
             result = await self.collection.insert_one(entity_dict)
             entity_dict["bookingId"] = str(result.inserted_id)
-            return Booking(**entity_dict)
+            booking = Booking(**entity_dict)
+            await self.sync_occupancy(booking)
+            return booking
         except Exception as e:
             print(e)
             return None
@@ -34,6 +49,18 @@ class BookingRepository(BaseRepository[Booking]):
             print(e)
             return None
 
+    async def get_many(self, entity_ids: List[str]) -> Dict[str, Booking]:
+        try:
+            object_ids = [ObjectId(entity_id) for entity_id in entity_ids if ObjectId.is_valid(entity_id)]
+            bookings = {}
+            async for document in self.collection.find({"_id": {"$in": object_ids}}):
+                document["bookingId"] = str(document.pop("_id"))
+                bookings[document["bookingId"]] = Booking(**document)
+            return bookings
+        except Exception as e:
+            print(e)
+            return {}
+
     async def get_all(self, skip: int = 0, limit: int = 100) -> List[Booking]:
         try:
             cursor = self.collection.find().skip(skip).limit(limit)
@@ -59,7 +86,32 @@ class BookingRepository(BaseRepository[Booking]):
             if result:
                 result["bookingId"] = str(result["_id"])
                 del result["_id"]
-                return Booking(**result)
+                booking = Booking(**result)
+                # Dates or status may have changed
+                await self.remove_occupancy([booking.bookingId])
+                await self.sync_occupancy(booking)
+                return booking
+            return None
+        except Exception as e:
+            print(e)
+            return None
+
+    async def patch(self, entity_id: str, patch: MergePatch) -> Optional[Booking]:
+        try:
+            now = datetime.utcnow()
+            result = await self.collection.find_one_and_update(
+                {"_id": ObjectId(entity_id)},
+                patch.update(updatedAt=now),
+                return_document=True
+            )
+            if result:
+                result["bookingId"] = str(result["_id"])
+                del result["_id"]
+                booking = Booking(**result)
+                if patch.fields & OCCUPANCY_FIELDS:
+                    await self.remove_occupancy([booking.bookingId])
+                    await self.sync_occupancy(booking)
+                return booking
             return None
         except Exception as e:
             print(e)
@@ -68,24 +120,61 @@ class BookingRepository(BaseRepository[Booking]):
     async def delete(self, entity_id: str) -> bool:
         try:
             result = await self.collection.delete_one({"_id": ObjectId(entity_id)})
+            await self.remove_occupancy([entity_id])
             return result.deleted_count > 0
         except Exception as e:
             print(e)
             return False
 
-    async def get_by_user(self, userId: str) -> List[Booking]:
+    async def get_by_user(
+        self,
+        userId: str,
+        skip: int = 0,
+        limit: int = 100,
+        expand_apartment: bool = False
+    ) -> List[UserBooking]:
         try:
-            cursor = self.collection.find({"userId": userId})
+            cursor = self.collection.find({"userId": userId}).sort("_id", -1).skip(skip).limit(limit)
             bookings = []
             async for document in cursor:
                 document["bookingId"] = str(document["_id"])
                 del document["_id"]
-                bookings.append(Booking(**document))
+                bookings.append(UserBooking(**document))
+            if expand_apartment and bookings:
+                apartments = await self.get_apartment_summaries({booking.apartmentId for booking in bookings})
+                for booking in bookings:
+                    booking.apartment = apartments.get(booking.apartmentId)
             return bookings
         except Exception as e:
             print(e)
             return []
 
+    async def get_apartment_summaries(self, apartment_ids) -> Dict[str, BookingApartment]:
+        # One $in query for the whole page instead of a request per booking
+        object_ids = [ObjectId(apartment_id) for apartment_id in apartment_ids if ObjectId.is_valid(apartment_id)]
+        projection = {"apartment_name": 1, "district_name": 1, "price_per_month": 1, "rental_type": 1,
+                      "pictures": {"$slice": 1}}
+        documents = await self.db["Apartments"].find({"_id": {"$in": object_ids}}, projection).to_list(length=None)
+        # Past stays may be in listings archived since
+        found = {document["_id"] for document in documents}
+        archived = [object_id for object_id in object_ids if object_id not in found]
+        if archived:
+            documents += await self.db["ApartmentsArchive"].find({"_id": {"$in": archived}}, projection) \
+                .to_list(length=None)
+        summaries = {}
+        for document in documents:
+            apartment_id = str(document["_id"])
+            pictures = document.get("pictures") or []
+            summaries[apartment_id] = BookingApartment(
+                apartmentId=apartment_id,
+                apartment_name=document.get("apartment_name", ""),
+                district_name=document.get("district_name"),
+                price_per_month=document.get("price_per_month"),
+                rental_type=document.get("rental_type"),
+                picture=pictures[0] if pictures else None
+            )
+        return summaries
+
     async def get_by_apartment(self, apartment_id: str) -> List[Booking]:
         try:
             cursor = self.collection.find({"apartmentId": apartment_id})
@@ -136,7 +225,9 @@ class BookingRepository(BaseRepository[Booking]):
             if result:
                 result["bookingId"] = str(result["_id"])
                 del result["_id"]
-                return Booking(**result)
+                booking = Booking(**result)
+                await self.sync_occupancy(booking)
+                return booking
             return None
         except Exception as e:
             print(e)
@@ -152,7 +243,7 @@ class BookingRepository(BaseRepository[Booking]):
             # Check if there are any overlapping bookings
             overlapping_booking = await self.collection.find_one({
                 "apartmentId": apartment_id,  # <-- исправлено
-                "status": {"$in": ["pending", "accepted"]},
+                "status": {"$in": BLOCKING_STATUSES},
                 "$or": [
                     {
                         "check_in_date": {"$lte": check_out},
@@ -163,4 +254,250 @@ class BookingRepository(BaseRepository[Booking]):
             return overlapping_booking is None
         except Exception as e:
             print(e)
-            return False 
\ No newline at end of file
+            return False
+
+    async def get_landlord_applications(
+        self,
+        owner_id: str,
+        status: Optional[BookingStatus] = None,
+        cursor: Optional[str] = None,
+        limit: int = 20
+    ) -> List[LandlordApplication]:
+        try:
+            booking_filter = {}
+            if status:
+                booking_filter["booking.status"] = status
+            if cursor:
+                booking_filter["booking._id"] = {"$lt": ObjectId(cursor)}
+
+            pipeline = [
+                {"$match": {"ownerId": owner_id}},
+                {
+                    "$project": {
+                        "_id": 0,
+                        "apartment": {
+                            "apartmentId": {"$toString": "$_id"},
+                            "apartment_name": "$apartment_name",
+                            "district_name": "$district_name",
+                            "price_per_month": "$price_per_month",
+                            "rental_type": "$rental_type",
+                            "picture": {"$arrayElemAt": ["$pictures", 0]}
+                        }
+                    }
+                },
+                # Uses the apartmentId index; the $unwind and $match below are
+                # folded into the lookup by the server
+                {
+                    "$lookup": {
+                        "from": "Bookings",
+                        "localField": "apartment.apartmentId",
+                        "foreignField": "apartmentId",
+                        "as": "booking"
+                    }
+                },
+                {"$unwind": "$booking"},
+                {"$match": booking_filter},
+                {"$sort": {"booking._id": -1}},
+                {"$limit": limit},
+                # Applicants are joined for the current page only
+                {
+                    "$lookup": {
+                        "from": "User",
+                        "let": {
+                            "userId": {
+                                "$convert": {"input": "$booking.userId", "to": "objectId", "onError": None, "onNull": None}
+                            }
+                        },
+                        "pipeline": [
+                            {"$match": {"$expr": {"$eq": ["$_id", "$$userId"]}}},
+                            {
+                                "$project": {
+                                    "_id": 0,
+                                    "userId": {"$toString": "$_id"},
+                                    "name": 1,
+                                    "surname": 1,
+                                    "email": 1,
+                                    "phone": 1,
+                                    "university": 1,
+                                    "avatar_url": 1
+                                }
+                            }
+                        ],
+                        "as": "applicant"
+                    }
+                },
+                {"$addFields": {"applicant": {"$arrayElemAt": ["$applicant", 0]}}}
+            ]
+
+            applications = []
+            async for document in self.db["Apartments"].aggregate(pipeline):
+                booking = document["booking"]
+                booking["bookingId"] = str(booking.pop("_id"))
+                applications.append(LandlordApplication(
+                    **booking,
+                    applicant=document.get("applicant"),
+                    apartment=document["apartment"]
+                ))
+            return applications
+        except Exception as e:
+            print(e)
+            return []
+
+    async def get_owned_apartment_ids(self, apartment_ids, owner_id: str) -> set:
+        try:
+            object_ids = [ObjectId(apartment_id) for apartment_id in apartment_ids if ObjectId.is_valid(apartment_id)]
+            cursor = self.db["Apartments"].find({"_id": {"$in": object_ids}, "ownerId": owner_id}, {"_id": 1})
+            return {str(document["_id"]) async for document in cursor}
+        except Exception as e:
+            print(e)
+            return set()
+
+    async def find_overlapping(self, bookings: List[Booking], statuses: List[BookingStatus]) -> List[Booking]:
+        """Bookings with one of ``statuses`` overlapping any of ``bookings``, in one query."""
+        try:
+            if not bookings:
+                return []
+            cursor = self.collection.find({
+                "status": {"$in": [status.value for status in statuses]},
+                "$or": [
+                    {
+                        "apartmentId": booking.apartmentId,
+                        "check_in_date": {"$lte": booking.check_out_date},
+                        "check_out_date": {"$gte": booking.check_in_date}
+                    }
+                    for booking in bookings
+                ]
+            })
+            overlapping = []
+            async for document in cursor:
+                document["bookingId"] = str(document.pop("_id"))
+                overlapping.append(Booking(**document))
+            return overlapping
+        except Exception as e:
+            print(e)
+            return []
+
+    async def apply_decisions(self, decisions: Dict[str, BookingStatus]) -> int:
+        """Sets the status of pending bookings with one bulk_write, returns the number modified.
+
+        Bookings that stopped being pending since they were read are left untouched.
+        """
+        if not decisions:
+            return 0
+        try:
+            now = datetime.utcnow()
+            result = await self.collection.bulk_write([
+                UpdateOne(
+                    {"_id": ObjectId(booking_id), "status": BookingStatus.PENDING.value},
+                    {"$set": {"status": status.value, "updatedAt": now}}
+                )
+                for booking_id, status in decisions.items()
+            ], ordered=False)
+            await self._release_occupancy([
+                ObjectId(booking_id) for booking_id, status in decisions.items() if status.value not in BLOCKING_STATUSES
+            ])
+            return result.modified_count
+        except Exception as e:
+            print(e)
+            return 0
+
+    async def complete_finished(self, now: datetime, limit: int) -> int:
+        """Marks up to ``limit`` accepted bookings whose check-out has passed as completed."""
+        return await self._transition_batch(
+            {"status": BookingStatus.ACCEPTED.value, "check_out_date": {"$lt": now}},
+            BookingStatus.COMPLETED,
+            limit
+        )
+
+    async def expire_pending(self, now: datetime, created_before: datetime, limit: int) -> int:
+        """Expires up to ``limit`` pending bookings whose check-in has passed or that are older than ``created_before``."""
+        return await self._transition_batch(
+            {
+                "status": BookingStatus.PENDING.value,
+                "$or": [{"check_in_date": {"$lt": now}}, {"createdAt": {"$lt": created_before}}]
+            },
+            BookingStatus.EXPIRED,
+            limit
+        )
+
+    async def _transition_batch(self, query: dict, status: BookingStatus, limit: int) -> int:
+        # update_many has no limit, so a bounded batch of ids is selected first;
+        # repeating the query in the update skips bookings changed in between
+        ids = [document["_id"] async for document in self.collection.find(query, {"_id": 1}).limit(limit)]
+        if not ids:
+            return 0
+        result = await self.collection.update_many(
+            {"_id": {"$in": ids}, **query},
+            {"$set": {"status": status.value, "updatedAt": datetime.utcnow()}}
+        )
+        await self._release_occupancy(ids)
+        return result.modified_count
+
+    async def _release_occupancy(self, ids: List[ObjectId]):
+        # The status filters of a batch update skip bookings changed in between,
+        # so only the ids that now hold no dates are re-read and released
+        if not ids:
+            return
+        released = self.collection.find(
+            {"_id": {"$in": ids}, "status": {"$nin": BLOCKING_STATUSES}},
+            {"_id": 1}
+        )
+        await self.remove_occupancy([str(document["_id"]) async for document in released])
+
+    async def sync_occupancy(self, booking: Booking):
+        """Adds the booking's dates to its apartment's occupancy list if its status holds them, removes them otherwise.
+
+        ``Apartments.occupancy`` is a list of ``{bookingId, start, end}``
+        sorted by ``start`` that lets apartment search filter by free dates.
+        """
+        if booking.status.value not in BLOCKING_STATUSES:
+            await self.remove_occupancy([booking.bookingId])
+            return
+        if not ObjectId.is_valid(booking.apartmentId):
+            return
+        await self.db["Apartments"].update_one(
+            {"_id": ObjectId(booking.apartmentId), "occupancy.bookingId": {"$ne": booking.bookingId}},
+            {
+                "$push": {
+                    "occupancy": {
+                        "$each": [{
+                            "bookingId": booking.bookingId,
+                            "start": booking.check_in_date,
+                            "end": booking.check_out_date
+                        }],
+                        "$sort": {"start": 1}
+                    }
+                }
+            }
+        )
+
+    async def remove_occupancy(self, booking_ids: List[str]):
+        if not booking_ids:
+            return
+        await self.db["Apartments"].update_many(
+            {"occupancy.bookingId": {"$in": booking_ids}},
+            {"$pull": {"occupancy": {"bookingId": {"$in": booking_ids}}}}
+        )
+
+    async def rebuild_occupancy(self) -> int:
+        """Recomputes every apartment's occupancy from the bookings, returns the number of apartments written."""
+        intervals = {}
+        cursor = self.collection.find(
+            {"status": {"$in": BLOCKING_STATUSES}},
+            {"apartmentId": 1, "check_in_date": 1, "check_out_date": 1}
+        )
+        async for document in cursor:
+            intervals.setdefault(document["apartmentId"], []).append({
+                "bookingId": str(document["_id"]),
+                "start": document["check_in_date"],
+                "end": document["check_out_date"]
+            })
+        occupied = [ObjectId(apartment_id) for apartment_id in intervals if ObjectId.is_valid(apartment_id)]
+        await self.db["Apartments"].update_many({"_id": {"$nin": occupied}}, {"$set": {"occupancy": []}})
+        operations = [
+            UpdateOne({"_id": ObjectId(apartment_id)}, {"$set": {"occupancy": sorted(items, key=lambda item: item["start"])}})
+            for apartment_id, items in intervals.items() if ObjectId.is_valid(apartment_id)
+        ]
+        for start in range(0, len(operations), 1000):
+            await self.db["Apartments"].bulk_write(operations[start:start + 1000], ordered=False)
+        return len(operations)
@@ -0,0 +1,130 @@
+from typing import Optional, List, Dict, Tuple
+from datetime import datetime
+from collections import Counter
+from models.chat import Chat, Message
+from motor.motor_asyncio import AsyncIOMotorClient
+from bson import ObjectId
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+DUPLICATE_KEY = 11000
+
+class ChatRepository:
+    def __init__(self, client: AsyncIOMotorClient):
+        self.db = client.get_database("diploma")
+        self.collection = self.db["Chats"]
+        self.messages = self.db["Messages"]
+
+    async def create_indexes(self):
+        # One chat per pair of users and apartment
+        await self.collection.create_index("key", unique=True)
+        await self.collection.create_index([("participants", 1), ("last_message_at", -1)])
+        await self.messages.create_index([("chatId", 1), ("_id", -1)])
+
+    async def get_or_create(self, participants: List[str], apartment_id: Optional[str] = None) -> Optional[Chat]:
+        key = ":".join(sorted(participants) + [apartment_id or ""])
+        try:
+            result = await self.collection.find_one_and_update(
+                {"key": key},
+                {"$setOnInsert": {
+                    "key": key,
+                    "participants": participants,
+                    "apartmentId": apartment_id,
+                    "created_at": datetime.utcnow(),
+                    "unread": {user_id: 0 for user_id in participants}
+                }},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Created concurrently by the other participant
+            result = await self.collection.find_one({"key": key})
+        except Exception as e:
+            print(e)
+            return None
+        if result is None:
+            return None
+        result.pop("key", None)
+        return Chat.from_mongo(result)
+
+    async def get_by_id(self, chat_id: str) -> Optional[Chat]:
+        try:
+            result = await self.collection.find_one({"_id": ObjectId(chat_id)}, {"key": 0})
+            return Chat.from_mongo(result)
+        except Exception as e:
+            print(e)
+            return None
+
+    async def get_by_user(self, user_id: str, skip: int = 0, limit: int = 50) -> List[Chat]:
+        try:
+            cursor = self.collection.find({"participants": user_id}, {"key": 0}) \
+                .sort("last_message_at", -1).skip(skip).limit(limit)
+            chats = []
+            async for document in cursor:
+                chats.append(Chat.from_mongo(document))
+            return chats
+        except Exception as e:
+            print(e)
+            return []
+
+    async def get_messages(self, chat_id: str, cursor: Optional[str] = None, limit: int = 50) -> List[Message]:
+        try:
+            query = {"chatId": chat_id}
+            if cursor:
+                query["_id"] = {"$lt": ObjectId(cursor)}
+            messages = []
+            async for document in self.messages.find(query).sort("_id", -1).limit(limit):
+                messages.append(Message.from_mongo(document))
+            return messages
+        except Exception as e:
+            print(e)
+            return []
+
+    async def save_messages(self, messages: List[Message], recipients: List[Tuple[str, ...]]):
+        """Inserts a batch of messages and updates their chats' unread counts and previews.
+
+        ``recipients[i]`` are the users whose unread count ``messages[i]``
+        increments, the sender is skipped.  The message ids are generated by the sender, so a retried batch only
+        inserts what is missing.  Raises when the messages were not stored.
+        """
+        documents = [
+            {"_id": ObjectId(m.messageId), "chatId": m.chatId, "senderId": m.senderId, "text": m.text,
+             "created_at": m.created_at}
+            for m in messages
+        ]
+        try:
+            await self.messages.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            if any(error["code"] != DUPLICATE_KEY for error in e.details.get("writeErrors", [])):
+                raise
+
+        unread: Dict[str, Counter] = {}
+        last: Dict[str, Message] = {}
+        for message, user_ids in zip(messages, recipients):
+            counts = unread.setdefault(message.chatId, Counter())
+            for user_id in user_ids:
+                if user_id != message.senderId:
+                    counts[f"unread.{user_id}"] += 1
+            last[message.chatId] = message
+        updates = []
+        for chat_id, message in last.items():
+            update = {"$set": {"last_message_at": message.created_at, "last_message": message.text[:200]}}
+            if unread[chat_id]:
+                update["$inc"] = dict(unread[chat_id])
+            updates.append(UpdateOne({"_id": ObjectId(chat_id)}, update))
+        try:
+            await self.collection.bulk_write(updates, ordered=False)
+        except Exception as e:
+            # The messages are stored, only the counters are behind until the next read
+            print(e)
+
+    async def mark_read(self, chat_id: str, user_id: str) -> bool:
+        try:
+            result = await self.collection.update_one(
+                {"_id": ObjectId(chat_id), "participants": user_id},
+                {"$set": {f"unread.{user_id}": 0}}
+            )
+            return result.matched_count > 0
+        except Exception as e:
+            print(e)
+            return False
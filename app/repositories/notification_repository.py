@@ -0,0 +1,91 @@
+from typing import Optional, List, Dict, AsyncIterator
+from datetime import datetime
+from models.notification import SavedSearch, Notification
+from motor.motor_asyncio import AsyncIOMotorClient
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+class NotificationRepository:
+    def __init__(self, client: AsyncIOMotorClient):
+        self.db = client.get_database("diploma")
+        self.saved_searches = self.db["SavedSearches"]
+        self.collection = self.db["Notifications"]
+
+    async def create_indexes(self):
+        await self.saved_searches.create_index("userId")
+        await self.saved_searches.create_index("createdAt")
+        await self.collection.create_index([("userId", 1), ("_id", -1)])
+        # An apartment updated several times notifies a saved search once
+        await self.collection.create_index([("searchId", 1), ("apartmentId", 1)], unique=True)
+
+    async def create_saved_search(self, search: SavedSearch) -> Optional[SavedSearch]:
+        try:
+            search_dict = search.model_dump(exclude={"searchId"})
+            search_dict["createdAt"] = datetime.utcnow()
+            result = await self.saved_searches.insert_one(search_dict)
+            search_dict["searchId"] = str(result.inserted_id)
+            return SavedSearch(**search_dict)
+        except Exception as e:
+            print(e)
+            return None
+
+    async def get_saved_searches(self, user_id: str) -> List[SavedSearch]:
+        try:
+            searches = []
+            async for document in self.saved_searches.find({"userId": user_id}):
+                searches.append(SavedSearch.from_mongo(document))
+            return searches
+        except Exception as e:
+            print(e)
+            return []
+
+    async def get_saved_searches_many(self, search_ids: List[str]) -> Dict[str, SavedSearch]:
+        try:
+            object_ids = [ObjectId(search_id) for search_id in search_ids if ObjectId.is_valid(search_id)]
+            searches = {}
+            async for document in self.saved_searches.find({"_id": {"$in": object_ids}}):
+                search = SavedSearch.from_mongo(document)
+                searches[search.searchId] = search
+            return searches
+        except Exception as e:
+            print(e)
+            return {}
+
+    async def iter_saved_searches(self, created_since: Optional[datetime] = None) -> AsyncIterator[dict]:
+        query = {"createdAt": {"$gte": created_since}} if created_since else {}
+        cursor = self.saved_searches.find(query, {"filters": 1}).batch_size(5000)
+        async for document in cursor:
+            yield document
+
+    async def delete_saved_search(self, search_id: str, user_id: str) -> bool:
+        try:
+            result = await self.saved_searches.delete_one({"_id": ObjectId(search_id), "userId": user_id})
+            return result.deleted_count > 0
+        except Exception as e:
+            print(e)
+            return False
+
+    async def add_notifications(self, notifications: List[Notification]) -> int:
+        if not notifications:
+            return 0
+        documents = [notification.model_dump(exclude={"notificationId"}) for notification in notifications]
+        try:
+            result = await self.collection.insert_many(documents, ordered=False)
+            return len(result.inserted_ids)
+        except BulkWriteError as e:
+            # Duplicates of notifications already sent, the rest are inserted
+            return e.details.get("nInserted", 0)
+        except Exception as e:
+            print(e)
+            return 0
+
+    async def get_notifications(self, user_id: str, skip: int = 0, limit: int = 50) -> List[Notification]:
+        try:
+            cursor = self.collection.find({"userId": user_id}).sort("_id", -1).skip(skip).limit(limit)
+            notifications = []
+            async for document in cursor:
+                notifications.append(Notification.from_mongo(document))
+            return notifications
+        except Exception as e:
+            print(e)
+            return []
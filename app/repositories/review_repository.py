@@ -1,15 +1,20 @@
-from typing import Optional, List
+from typing import Optional, List, Dict, Tuple
 from models.review import Review, ReviewType
 from repositories.base import BaseRepository
 from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
 from datetime import datetime
+from utils.merge_patch import MergePatch
 
 class ReviewRepository(BaseRepository[Review]):
     def __init__(self, client: AsyncIOMotorClient):
         self.db = client.get_database("diploma")
         self.collection = self.db["Reviews"]
 
+    async def create_indexes(self):
+        # Rating stats of one apartment after its reviews change
+        await self.collection.create_index([("targetId", 1), ("review_type", 1)])
+
     async def create(self, entity: Review) -> Review:
         try:
             entity_dict = entity.dict()
@@ -65,6 +70,19 @@ class ReviewRepository(BaseRepository[Review]):
             print(e)
             return None
 
+    async def patch(self, entity_id: str, patch: MergePatch) -> Optional[Review]:
+        try:
+            now = datetime.utcnow()
+            result = await self.collection.find_one_and_update(
+                {"_id": ObjectId(entity_id)},
+                patch.update(updatedAt=now),
+                return_document=True
+            )
+            return Review.from_mongo(result)
+        except Exception as e:
+            print(e)
+            return None
+
     async def delete(self, entity_id: str) -> bool:
         try:
             result = await self.collection.delete_one({"_id": ObjectId(entity_id)})
@@ -142,6 +160,20 @@ class ReviewRepository(BaseRepository[Review]):
             print(e)
             return 0.0
 
+    async def get_rating_stats(self, target_ids: Optional[List[str]] = None) -> Dict[str, Tuple[int, float]]:
+        """Review count and average rating per reviewed apartment, of ``target_ids`` or all of them."""
+        match = {"review_type": ReviewType.APARTMENT.value}
+        if target_ids is not None:
+            match["targetId"] = {"$in": target_ids}
+        pipeline = [
+            {"$match": match},
+            {"$group": {"_id": "$targetId", "count": {"$sum": 1}, "average": {"$avg": "$rating"}}}
+        ]
+        stats = {}
+        async for document in self.collection.aggregate(pipeline):
+            stats[document["_id"]] = (document["count"], document["average"] or 0.0)
+        return stats
+
     async def verify_review(self, review_id: str) -> Optional[Review]:
         try:
             result = await self.collection.find_one_and_update(
@@ -1,9 +1,10 @@
-from typing import Optional, List
+from typing import Optional, List, Dict, AsyncIterator
 from datetime import datetime
 from models.user import User
 from repositories.base import BaseRepository
 from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
+from pymongo import UpdateOne
 from utils.logging import logger
 
 class UserRepository(BaseRepository[User]):
@@ -11,6 +12,10 @@ class UserRepository(BaseRepository[User]):
         self.db = client.get_database("diploma")
         self.collection = self.db["User"]
 
+    async def create_indexes(self):
+        # Profiles changed since the last roommate sync
+        await self.collection.create_index("updatedAt")
+
     async def create(self, entity: User) -> User:
         entity_dict = entity.dict(by_alias=True)
         entity_dict["createdAt"] = datetime.utcnow()
@@ -27,6 +32,18 @@ class UserRepository(BaseRepository[User]):
             logger.error(f"Error getting user by ID {entity_id}: {str(e)}")
             return None
 
+    async def get_many(self, entity_ids: List[str]) -> Dict[str, User]:
+        try:
+            object_ids = [ObjectId(entity_id) for entity_id in entity_ids if ObjectId.is_valid(entity_id)]
+            users = {}
+            async for document in self.collection.find({"_id": {"$in": object_ids}}):
+                user = User.from_mongo(document)
+                users[user.userId] = user
+            return users
+        except Exception as e:
+            logger.error(f"Error getting users by IDs: {str(e)}")
+            return {}
+
     async def is_admin(self, user_id: str) -> bool:
         user = await self.collection.find_one({"_id": ObjectId(user_id)})
         if user and user.get("admin") is True:
@@ -77,6 +94,16 @@ class UserRepository(BaseRepository[User]):
             logger.error(f"Error updating last login for user {user_id}: {str(e)}")
             return None
 
+    async def set_activity(self, activity: Dict[str, Dict[str, datetime]]):
+        """Sets activity timestamps per user id, never to an older value. Raises when the write failed."""
+        updates = [
+            UpdateOne({"_id": ObjectId(user_id)}, {"$max": fields})
+            for user_id, fields in activity.items()
+            if ObjectId.is_valid(user_id)
+        ]
+        if updates:
+            await self.collection.bulk_write(updates, ordered=False)
+
     async def get_landlords(self, skip: int = 0, limit: int = 100) -> List[User]:
         cursor = self.collection.find({"is_landlord": True}).skip(skip).limit(limit)
         users = []
@@ -106,4 +133,19 @@ class UserRepository(BaseRepository[User]):
         users = []
         async for document in cursor:
             users.append(User.from_mongo(document))
-        return users 
\ No newline at end of file
+        return users
+
+    async def iter_roommate_profiles(self, updated_since: Optional[datetime] = None) -> AsyncIterator[dict]:
+        """Raw documents with only the fields used for roommate matching."""
+        query = {"updatedAt": {"$gte": updated_since}} if updated_since else {}
+        cursor = self.collection.find(query, {
+            "university": 1,
+            "city": 1,
+            "gender": 1,
+            "language_preferences": 1,
+            "roommate_preferences": 1,
+            "budget_range": 1,
+            "is_landlord": 1
+        }).batch_size(5000)
+        async for document in cursor:
+            yield document
@@ -0,0 +1,100 @@
+from fastapi import APIRouter, Depends, HTTPException
+from services.apartment_service import ApartmentService
+from services.review_service import ReviewService
+from services.user_service import UserService
+from services.booking_lifecycle import BookingLifecycle
+from services.roommate_service import RoommateService
+from services.saved_search_service import SavedSearchService
+from services.chat_service import ChatService
+from services.activity_buffer import ActivityBuffer
+from services.similar_apartments import SimilarApartmentsJob
+from services.apartment_ranking import ApartmentRanking
+from services.picture_service import PictureService
+from services.analytics_rollups import AnalyticsRollups
+from services.apartment_archiver import ApartmentArchiver
+from middleware.auth import token_cache, revocation_list
+from middleware.load_shedding import load_shedder
+from utils.idempotency import IdempotencyStore
+from dependencies import (
+    get_apartment_service, get_review_service, get_user_service, get_booking_lifecycle, get_roommate_service,
+    get_saved_search_service, get_chat_service, get_similar_apartments, get_apartment_ranking,
+    get_picture_service, get_analytics_rollups, get_activity_buffer, get_idempotency_store, get_apartment_archiver,
+    require_admin
+)
+
+router = APIRouter(prefix="/api/v1/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+@router.get("/metrics")
+async def get_metrics(
+    apartment_service: ApartmentService = Depends(get_apartment_service),
+    review_service: ReviewService = Depends(get_review_service),
+    user_service: UserService = Depends(get_user_service),
+    booking_lifecycle: BookingLifecycle = Depends(get_booking_lifecycle),
+    roommate_service: RoommateService = Depends(get_roommate_service),
+    saved_search_service: SavedSearchService = Depends(get_saved_search_service),
+    chat_service: ChatService = Depends(get_chat_service),
+    similar_apartments: SimilarApartmentsJob = Depends(get_similar_apartments),
+    apartment_ranking: ApartmentRanking = Depends(get_apartment_ranking),
+    picture_service: PictureService = Depends(get_picture_service),
+    analytics_rollups: AnalyticsRollups = Depends(get_analytics_rollups),
+    activity_buffer: ActivityBuffer = Depends(get_activity_buffer),
+    idempotency_store: IdempotencyStore = Depends(get_idempotency_store),
+    apartment_archiver: ApartmentArchiver = Depends(get_apartment_archiver)
+):
+    return {
+        "singleflight": {
+            "apartments": apartment_service.singleflight.stats(),
+            "reviews": review_service.singleflight.stats(),
+            "users": user_service.singleflight.stats(),
+        },
+        "token_cache": token_cache.stats(),
+        "revocations": revocation_list.stats(),
+        "load_shedding": load_shedder.stats(),
+        "booking_lifecycle": booking_lifecycle.stats(),
+        "roommates": roommate_service.stats(),
+        "saved_searches": saved_search_service.stats(),
+        "chat": chat_service.stats(),
+        "activity": activity_buffer.stats(),
+        "similar_apartments": similar_apartments.stats(),
+        "ranking": apartment_ranking.stats(),
+        "pictures": picture_service.stats(),
+        "rollups": analytics_rollups.stats(),
+        "idempotency": idempotency_store.stats(),
+        "archive": apartment_archiver.stats(),
+    }
+
+@router.post("/jobs/booking-lifecycle/run")
+async def run_booking_lifecycle(booking_lifecycle: BookingLifecycle = Depends(get_booking_lifecycle)):
+    if not await booking_lifecycle.lease.acquire():
+        raise HTTPException(status_code=409, detail="Booking lifecycle is running in another worker")
+    return await booking_lifecycle.run_once()
+
+@router.post("/jobs/rollups/run")
+async def run_rollups(analytics_rollups: AnalyticsRollups = Depends(get_analytics_rollups)):
+    if not await analytics_rollups.lease.acquire():
+        raise HTTPException(status_code=409, detail="Rollups are computed in another worker")
+    return await analytics_rollups.run_once()
+
+@router.post("/jobs/archive/run")
+async def run_archive(apartment_archiver: ApartmentArchiver = Depends(get_apartment_archiver)):
+    if not await apartment_archiver.lease.acquire():
+        raise HTTPException(status_code=409, detail="Apartments are archived by another worker")
+    return await apartment_archiver.run_once()
+
+@router.post("/jobs/similar-apartments/rebuild")
+async def rebuild_similar_apartments(similar_apartments: SimilarApartmentsJob = Depends(get_similar_apartments)):
+    if not await similar_apartments.lease.acquire():
+        raise HTTPException(status_code=409, detail="Similar apartments are computed in another worker")
+    return await similar_apartments.run_once(rebuild=True)
+
+@router.post("/jobs/ranking/run")
+async def run_ranking(apartment_ranking: ApartmentRanking = Depends(get_apartment_ranking)):
+    if not await apartment_ranking.lease.acquire():
+        raise HTTPException(status_code=409, detail="Ranking is recomputed in another worker")
+    return await apartment_ranking.run_once()
+
+@router.post("/users/{user_id}/revoke-tokens")
+async def revoke_user_tokens(user_id: str):
+    # Tokens issued from now on are accepted again
+    await revocation_list.revoke_user(user_id)
+    return {"message": "Tokens revoked successfully"}
@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List, Optional
+from datetime import date
+from models.analytics import BookingsPoint, OccupancyPoint, PricePoint, ReviewsPoint
+from services.analytics_service import AnalyticsService
+from dependencies import get_analytics_service, require_admin
+
+router = APIRouter(prefix="/api/v1/admin/analytics", tags=["admin"], dependencies=[Depends(require_admin)])
+
+START = Query(None, description="First day, default: 30 days before end")
+END = Query(None, description="Last day, default: today (UTC)")
+DISTRICT = Query(None, description="Only this district")
+BY_DISTRICT = Query(False, description="One point per day and district instead of per day")
+
+@router.get("/occupancy", response_model=List[OccupancyPoint])
+async def get_occupancy(
+    start: Optional[date] = START,
+    end: Optional[date] = END,
+    district: Optional[str] = DISTRICT,
+    by_district: bool = BY_DISTRICT,
+    analytics_service: AnalyticsService = Depends(get_analytics_service)
+):
+    return await analytics_service.get_occupancy(start, end, district, by_district)
+
+@router.get("/bookings", response_model=List[BookingsPoint])
+async def get_bookings(
+    start: Optional[date] = START,
+    end: Optional[date] = END,
+    district: Optional[str] = DISTRICT,
+    by_district: bool = BY_DISTRICT,
+    analytics_service: AnalyticsService = Depends(get_analytics_service)
+):
+    return await analytics_service.get_bookings(start, end, district, by_district)
+
+@router.get("/prices", response_model=List[PricePoint])
+async def get_prices(
+    start: Optional[date] = START,
+    end: Optional[date] = END,
+    district: Optional[str] = DISTRICT,
+    by_district: bool = Query(True, description="One point per day and district instead of per day"),
+    analytics_service: AnalyticsService = Depends(get_analytics_service)
+):
+    return await analytics_service.get_prices(start, end, district, by_district)
+
+@router.get("/reviews", response_model=List[ReviewsPoint])
+async def get_reviews(
+    start: Optional[date] = START,
+    end: Optional[date] = END,
+    district: Optional[str] = DISTRICT,
+    by_district: bool = BY_DISTRICT,
+    analytics_service: AnalyticsService = Depends(get_analytics_service)
+):
+    return await analytics_service.get_reviews(start, end, district, by_district)
@@ -1,34 +1,50 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
-from typing import List, Optional
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, Response
+from typing import Any, Dict, List, Optional
 from datetime import datetime
-from models.apartment import Apartment
+from models.apartment import Apartment, ApartmentWithOwner, ApartmentPicture, SimilarApartment
 from services.apartment_service import ApartmentService
-from dependencies import get_apartment_service, get_current_user
+from dependencies import get_apartment_service, get_current_user, get_loaders, Loaders, get_idempotency_store
 from models.user import User
+from utils.idempotency import IdempotencyStore, IDEMPOTENCY_KEY
+from utils.merge_patch import MERGE_PATCH
 from logging import log
 
 router = APIRouter(prefix="/api/v1", tags=["apartments"])
 
-@router.get("/apartments/search", response_model=List[Apartment])
+EXPAND_OWNER = Query(None, pattern="^owner$", description="'owner' embeds an owner summary")
+AFTER = Query(None, description="Id of the last apartment of the previous page, results are in ranking order")
+
+@router.get("/apartments/search", response_model=List[ApartmentWithOwner])
 async def search_apartments(
     min_price: Optional[int] = Query(None),
     max_price: Optional[int] = Query(None),
     location: Optional[str] = Query(None),
     university: Optional[str] = Query(None),
     room_type: Optional[str] = Query(None),
+    check_in: Optional[datetime] = Query(None, description="Only apartments free from check_in to check_out"),
+    check_out: Optional[datetime] = Query(None),
+    after: Optional[str] = AFTER,
     skip: int = Query(0),
     limit: int = Query(100),
-    apartment_service: ApartmentService = Depends(get_apartment_service)
+    expand: Optional[str] = EXPAND_OWNER,
+    apartment_service: ApartmentService = Depends(get_apartment_service),
+    loaders: Loaders = Depends(get_loaders)
 ):
-    return await apartment_service.search_apartments(
+    apartments = await apartment_service.search_apartments(
         min_price=min_price,
         max_price=max_price,
         location=location,
         university=university,
         room_type=room_type,
+        check_in=check_in,
+        check_out=check_out,
+        after=after,
         skip=skip,
         limit=limit
     )
+    if expand == "owner":
+        return await apartment_service.with_owners(apartments, loaders.users)
+    return apartments
 
 @router.get("/apartments/nearby", response_model=List[Apartment])
 async def get_nearby_apartments(
@@ -47,13 +63,19 @@ async def get_nearby_apartments(
         limit=limit
     )
 
-@router.get("/apartments/promoted", response_model=List[Apartment])
+@router.get("/apartments/promoted", response_model=List[ApartmentWithOwner])
 async def get_promoted_apartments(
+    after: Optional[str] = AFTER,
     skip: int = Query(0),
     limit: int = Query(100),
-    apartment_service: ApartmentService = Depends(get_apartment_service)
+    expand: Optional[str] = EXPAND_OWNER,
+    apartment_service: ApartmentService = Depends(get_apartment_service),
+    loaders: Loaders = Depends(get_loaders)
 ):
-    return await apartment_service.get_promoted_apartments(skip=skip, limit=limit)
+    apartments = await apartment_service.get_promoted_apartments(after=after, skip=skip, limit=limit)
+    if expand == "owner":
+        return await apartment_service.with_owners(apartments, loaders.users)
+    return apartments
 
 @router.get("/apartments/owner/{owner_id}", response_model=List[Apartment])
 async def get_owner_apartments(
@@ -65,11 +87,17 @@ async def get_owner_apartments(
 @router.post("/apartments", response_model=Apartment)
 async def create_apartment(
     apartment: Apartment,
+    response: Response,
+    idempotency_key: Optional[str] = IDEMPOTENCY_KEY,
     current_user: User = Depends(get_current_user),
-    apartment_service: ApartmentService = Depends(get_apartment_service)
+    apartment_service: ApartmentService = Depends(get_apartment_service),
+    idempotency: IdempotencyStore = Depends(get_idempotency_store)
 ):
     apartment.ownerId = current_user.userId  # Заменяем ownerId из токена
-    return await apartment_service.create_apartment(apartment)
+    return await idempotency.run(
+        idempotency_key, current_user.userId, "POST /apartments", apartment,
+        lambda: apartment_service.create_apartment(apartment), response
+    )
 
 @router.get("/apartments/{apartment_id}", response_model=Apartment)
 async def get_apartment(
@@ -78,14 +106,39 @@ async def get_apartment(
 ):
     return await apartment_service.get_apartment(apartment_id)
 
+@router.get("/apartments/{apartment_id}/similar", response_model=List[SimilarApartment])
+async def get_similar_apartments(
+    apartment_id: str,
+    limit: int = Query(10, ge=1, le=20),
+    apartment_service: ApartmentService = Depends(get_apartment_service)
+):
+    return await apartment_service.get_similar_apartments(apartment_id, limit=limit)
+
 @router.patch("/apartments/{apartment_id}", response_model=Apartment)
 async def update_apartment(
     apartment_id: str,
-    apartment_data: Apartment,
+    patch: Dict[str, Any] = MERGE_PATCH,
+    current_user: User = Depends(get_current_user),
+    apartment_service: ApartmentService = Depends(get_apartment_service)
+):
+    return await apartment_service.update_apartment(apartment_id, patch, current_user.userId)
+
+@router.post(
+    "/apartments/{apartment_id}/pictures",
+    response_model=List[ApartmentPicture],
+    # The body is streamed by the service, so it is only described here
+    openapi_extra={"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+        "type": "object",
+        "properties": {"files": {"type": "array", "items": {"type": "string", "format": "binary"}}}
+    }}}}}
+)
+async def upload_apartment_pictures(
+    apartment_id: str,
+    request: Request,
     current_user: User = Depends(get_current_user),
     apartment_service: ApartmentService = Depends(get_apartment_service)
 ):
-    return await apartment_service.update_apartment(apartment_id, apartment_data, current_user.userId)
+    return await apartment_service.add_pictures(apartment_id, current_user, request)
 
 @router.delete("/apartments/{apartment_id}")
 async def delete_apartment(
@@ -1,26 +1,55 @@
-from fastapi import APIRouter, Depends, Query
-from typing import List
+from fastapi import APIRouter, Depends, Query, Response
+from typing import Any, Dict, List, Optional
 from datetime import datetime
-from models.booking import Booking, BookingStatus, CreateBooking
+from models.booking import (
+    Booking, BookingStatus, CreateBooking, LandlordApplicationsPage, UserBooking,
+    BookingDecisionsRequest, BookingDecisionsResult
+)
 from services.booking_service import BookingService
 from dependencies import get_booking_service
-from dependencies import get_current_user
+from dependencies import get_current_user, get_idempotency_store
 from models.user import User
+from utils.idempotency import IdempotencyStore, IDEMPOTENCY_KEY
+from utils.merge_patch import MERGE_PATCH
 
 router = APIRouter(prefix="/api/v1", tags=["bookings"])
 
 @router.post("/bookings", response_model=Booking)
 async def create_booking(
         booking: CreateBooking,
+        response: Response,
+        idempotency_key: Optional[str] = IDEMPOTENCY_KEY,
         booking_service: BookingService = Depends(get_booking_service),
         current_user: User = Depends(get_current_user),
+        idempotency: IdempotencyStore = Depends(get_idempotency_store),
 ):
     booking_data = booking.model_dump()
     booking_data["userId"] = current_user.userId
     booking_data["created_at"] = datetime.utcnow()
     booking_data["updated_at"] = datetime.utcnow()
     
-    return await booking_service.create_booking(Booking(**booking_data))
+    return await idempotency.run(
+        idempotency_key, current_user.userId, "POST /bookings", booking,
+        lambda: booking_service.create_booking(Booking(**booking_data)), response
+    )
+
+@router.post("/bookings/decisions", response_model=BookingDecisionsResult)
+async def decide_bookings(
+    request: BookingDecisionsRequest,
+    booking_service: BookingService = Depends(get_booking_service),
+    current_user: User = Depends(get_current_user),
+):
+    return await booking_service.decide_bookings(request.decisions, current_user)
+
+@router.get("/landlord/applications", response_model=LandlordApplicationsPage)
+async def get_landlord_applications(
+    status: Optional[BookingStatus] = Query(None),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(20, ge=1, le=100),
+    booking_service: BookingService = Depends(get_booking_service),
+    current_user: User = Depends(get_current_user),
+):
+    return await booking_service.get_landlord_applications(current_user.userId, status, cursor, limit)
 
 @router.get("/bookings/{booking_id}", response_model=Booking)
 async def get_booking(
@@ -32,10 +61,10 @@ async def get_booking(
 @router.patch("/bookings/{booking_id}", response_model=Booking)
 async def update_booking(
     booking_id: str,
-    booking_data: Booking,
+    patch: Dict[str, Any] = MERGE_PATCH,
     booking_service: BookingService = Depends(get_booking_service)
 ):
-    return await booking_service.update_booking(booking_id, booking_data)
+    return await booking_service.update_booking(booking_id, patch)
 
 @router.delete("/bookings/{booking_id}")
 async def delete_booking(
@@ -44,12 +73,15 @@ async def delete_booking(
 ):
     return await booking_service.delete_booking(booking_id)
 
-@router.get("/bookings/user/{user_id}", response_model=List[Booking])
+@router.get("/bookings/user/{user_id}", response_model=List[UserBooking])
 async def get_user_bookings(
     user_id: str,
+    expand: Optional[str] = Query(None, pattern="^apartment$", description="'apartment' embeds an apartment summary"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=100),
     booking_service: BookingService = Depends(get_booking_service)
 ):
-    return await booking_service.get_user_bookings(user_id)
+    return await booking_service.get_user_bookings(user_id, skip, limit, expand == "apartment")
 
 @router.get("/bookings/apartment/{apartment_id}", response_model=List[Booking])
 async def get_apartment_bookings(
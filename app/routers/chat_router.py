@@ -0,0 +1,69 @@
+from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect, status
+from typing import List, Optional
+from models.chat import ChatCreate, ChatHistoryPage, ChatSummary
+from models.user import User
+from services.chat_service import ChatService
+from dependencies import get_chat_service, get_current_user, get_user_from_token
+
+router = APIRouter(prefix="/api/v1", tags=["chats"])
+
+@router.websocket("/chats/ws")
+async def chat_socket(
+    websocket: WebSocket,
+    token: Optional[str] = Query(None, description="JWT, for clients that cannot set the Authorization header"),
+    chat_service: ChatService = Depends(get_chat_service),
+):
+    authorization = websocket.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    user = await get_user_from_token(token) if token else None
+    if user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    chat_service.connect(user.userId, websocket)
+    try:
+        while True:
+            await chat_service.handle_frame(user, websocket, await websocket.receive_text())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        chat_service.disconnect(user.userId, websocket)
+
+@router.post("/chats")
+async def create_chat(
+    chat_data: ChatCreate,
+    chat_service: ChatService = Depends(get_chat_service),
+    current_user: User = Depends(get_current_user),
+):
+    chat = await chat_service.create_chat(chat_data, current_user)
+    return {"chat_id": chat.chatId, "message": "Chat created successfully."}
+
+@router.get("/chats", response_model=List[ChatSummary])
+async def get_chats(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100),
+    chat_service: ChatService = Depends(get_chat_service),
+    current_user: User = Depends(get_current_user),
+):
+    return await chat_service.get_chats(current_user, skip, limit)
+
+@router.get("/chats/{chat_id}", response_model=ChatHistoryPage)
+async def get_chat_history(
+    chat_id: str,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(50, ge=1, le=100),
+    chat_service: ChatService = Depends(get_chat_service),
+    current_user: User = Depends(get_current_user),
+):
+    return await chat_service.get_history(current_user, chat_id, cursor, limit)
+
+@router.post("/chats/{chat_id}/read")
+async def mark_chat_read(
+    chat_id: str,
+    chat_service: ChatService = Depends(get_chat_service),
+    current_user: User = Depends(get_current_user),
+):
+    await chat_service.mark_read(current_user, chat_id)
+    return {"message": "Chat marked as read."}
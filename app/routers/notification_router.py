@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List
+from models.notification import Notification, SavedSearch, SavedSearchCreate
+from models.user import User
+from services.saved_search_service import SavedSearchService
+from dependencies import get_saved_search_service, get_current_user
+
+router = APIRouter(prefix="/api/v1", tags=["notifications"])
+
+@router.post("/notifications/subscribe")
+async def subscribe(
+    subscription: SavedSearchCreate,
+    saved_search_service: SavedSearchService = Depends(get_saved_search_service),
+    current_user: User = Depends(get_current_user),
+):
+    search = await saved_search_service.create_search(subscription.filters, current_user)
+    return {"message": "Subscription created successfully.", "subscription_id": search.searchId}
+
+@router.get("/notifications/subscriptions", response_model=List[SavedSearch])
+async def get_subscriptions(
+    saved_search_service: SavedSearchService = Depends(get_saved_search_service),
+    current_user: User = Depends(get_current_user),
+):
+    return await saved_search_service.get_searches(current_user)
+
+@router.delete("/notifications/subscriptions/{subscription_id}")
+async def delete_subscription(
+    subscription_id: str,
+    saved_search_service: SavedSearchService = Depends(get_saved_search_service),
+    current_user: User = Depends(get_current_user),
+):
+    await saved_search_service.delete_search(subscription_id, current_user)
+    return {"message": "Subscription deleted successfully."}
+
+@router.get("/notifications", response_model=List[Notification])
+async def get_notifications(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100),
+    saved_search_service: SavedSearchService = Depends(get_saved_search_service),
+    current_user: User = Depends(get_current_user),
+):
+    return await saved_search_service.get_notifications(current_user, skip, limit)
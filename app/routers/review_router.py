@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, Query
-from typing import List
+from typing import Any, Dict, List
 from models.review import Review, ReviewType
 from services.review_service import ReviewService
 from dependencies import get_review_service
+from utils.merge_patch import MERGE_PATCH
 
 router = APIRouter(prefix="/api/v1", tags=["reviews"])
 
@@ -13,6 +14,15 @@ async def create_review(
 ):
     return await review_service.create_review(review)
 
+# Declared before /reviews/{review_id} so "average-rating" is not taken for an id
+@router.get("/reviews/average-rating")
+async def get_average_rating(
+    target_id: str = Query(...),
+    review_type: ReviewType = Query(...),
+    review_service: ReviewService = Depends(get_review_service)
+):
+    return await review_service.get_average_rating(target_id, review_type)
+
 @router.get("/reviews/{review_id}", response_model=Review)
 async def get_review(
     review_id: str,
@@ -23,10 +33,10 @@ async def get_review(
 @router.patch("/reviews/{review_id}", response_model=Review)
 async def update_review(
     review_id: str,
-    review_data: Review,
+    patch: Dict[str, Any] = MERGE_PATCH,
     review_service: ReviewService = Depends(get_review_service)
 ):
-    return await review_service.update_review(review_id, review_data)
+    return await review_service.update_review(review_id, patch)
 
 @router.delete("/reviews/{review_id}")
 async def delete_review(
@@ -63,14 +73,6 @@ async def get_reviewer_reviews(
         limit=limit
     )
 
-@router.get("/reviews/average-rating")
-async def get_average_rating(
-    target_id: str = Query(...),
-    review_type: ReviewType = Query(...),
-    review_service: ReviewService = Depends(get_review_service)
-):
-    return await review_service.get_average_rating(target_id, review_type)
-
 @router.post("/reviews/{review_id}/verify", response_model=Review)
 async def verify_review(
     review_id: str,
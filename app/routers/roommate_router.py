@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List
+from models.user import User, RoommateMatch
+from services.roommate_service import RoommateService
+from dependencies import get_roommate_service, get_current_user
+
+router = APIRouter(prefix="/api/v1", tags=["roommates"])
+
+@router.get("/roommates/matches", response_model=List[RoommateMatch])
+async def get_roommate_matches(
+    limit: int = Query(20, ge=1, le=100),
+    roommate_service: RoommateService = Depends(get_roommate_service),
+    current_user: User = Depends(get_current_user),
+):
+    return await roommate_service.get_matches(current_user, limit)
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Security
+from fastapi.security import HTTPAuthorizationCredentials
 from typing import List, Optional
+import jwt
 from models.user import User
 from services.user_service import UserService
-from dependencies import get_user_service, get_current_user
+from middleware.auth import verify_token, revocation_list
+from dependencies import get_user_service, get_current_user, get_current_user_id, security
 
 router = APIRouter(prefix="/api/v1", tags=["users"])
 
@@ -43,6 +46,16 @@ async def update_user_profile(
         raise HTTPException(status_code=404, detail="User not found")
     return {"message": "Profile updated successfully."}
 
+@router.post("/logout", response_model=dict)
+async def logout(credentials: HTTPAuthorizationCredentials = Security(security)):
+    """Revoke the token of the request in every worker"""
+    try:
+        payload = verify_token(credentials.credentials)
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
+    await revocation_list.revoke_token(credentials.credentials, payload.get("exp"))
+    return {"message": "Logged out successfully."}
+
 @router.get("/{user_id}", response_model=User)
 async def get_user(
     user_id: str,
@@ -112,9 +125,13 @@ async def get_users_by_university(
 @router.post("/{user_id}/last-login")
 async def update_last_login(
     user_id: str,
+    current_user_id: str = Depends(get_current_user_id),
     user_service: UserService = Depends(get_user_service)
 ):
-    user = await user_service.update_last_login(user_id)
-    if not user:
+    # Only the token is checked, so unknown ids cannot fill the buffer and the request still never waits for MongoDB
+    if user_id != current_user_id:
+        raise HTTPException(status_code=403, detail="You can only update your own last login")
+    # Buffered and written in the background
+    if not await user_service.update_last_login(user_id):
         raise HTTPException(status_code=404, detail="User not found")
     return {"message": "Last login updated successfully"} 
\ No newline at end of file
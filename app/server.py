@@ -0,0 +1,57 @@
+"""Production entry point.
+
+    python server.py
+
+Runs WEB_CONCURRENCY uvicorn worker processes (default: the CPUs available
+to the container) under uvicorn's supervisor, which restarts a worker when
+it exits.  Each worker exits after MAX_REQUESTS requests to bound memory
+growth, and on SIGTERM/SIGINT stops accepting connections and waits up to
+GRACEFUL_TIMEOUT seconds for in-flight requests before shutting down.
+"""
+import inspect
+import os
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+
+def worker_count() -> int:
+    value = os.getenv("WEB_CONCURRENCY")
+    if value:
+        return max(1, int(value))
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def main():
+    max_requests = int(os.getenv("MAX_REQUESTS", "10000"))
+    options = {}
+    if "limit_max_requests_jitter" in inspect.signature(uvicorn.Config).parameters:
+        # Spread recycling so that workers do not restart at the same moment
+        options["limit_max_requests_jitter"] = int(os.getenv("MAX_REQUESTS_JITTER", str(max_requests // 10)))
+    config = uvicorn.Config(
+        "main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        workers=worker_count(),
+        limit_max_requests=max_requests or None,
+        timeout_graceful_shutdown=int(os.getenv("GRACEFUL_TIMEOUT", "25")),
+        proxy_headers=True,
+        forwarded_allow_ips="*",
+        lifespan="on",
+        **options,
+    )
+    # The supervisor is used even for a single worker, otherwise the server
+    # would simply stop when that worker recycles
+    sock = config.bind_socket()
+    if "target" in inspect.signature(Multiprocess).parameters:
+        # Older uvicorn releases take the worker function explicitly
+        Multiprocess(config, target=uvicorn.Server(config).run, sockets=[sock]).run()
+    else:
+        Multiprocess(config, sockets=[sock]).run()
+
+
+if __name__ == "__main__":
+    main()
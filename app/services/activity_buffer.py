@@ -0,0 +1,118 @@
+import asyncio
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+from repositories.user_repository import UserRepository
+from utils.logging import logger
+
+FLUSH_INTERVAL_SECONDS = float(os.getenv("ACTIVITY_FLUSH_INTERVAL", "5"))
+FLUSH_BATCH_SIZE = int(os.getenv("ACTIVITY_FLUSH_BATCH_SIZE", "1000"))
+MAX_PENDING = int(os.getenv("ACTIVITY_MAX_PENDING", "100000"))
+
+
+class ActivityBuffer:
+    """Write-behind buffer for per-user activity timestamps such as ``last_login``.
+
+    ``record`` only updates a dict, so repeated logins of a user between
+    two flushes cost one write.  A background task writes the buffer with
+    one unordered ``bulk_write`` per ``batch_size`` users or every
+    ``flush_interval`` seconds, using ``$max`` so that workers flushing
+    out of order never move a timestamp back.  The lifespan flushes what is
+    left on shutdown; a crash loses at most one interval of timestamps.
+    """
+
+    def __init__(
+        self,
+        user_repository: UserRepository,
+        flush_interval: float = FLUSH_INTERVAL_SECONDS,
+        batch_size: int = FLUSH_BATCH_SIZE,
+        max_pending: int = MAX_PENDING
+    ):
+        self.user_repository = user_repository
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        # user id -> field -> latest timestamp
+        self._pending: Dict[str, Dict[str, datetime]] = {}
+        self._flush_requested = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.recorded = 0
+        self.written = 0
+        self.flushes = 0
+        self.flush_errors = 0
+        self.dropped = 0
+        self.last_flush_size = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._flusher())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # A failed batch is put back, so stop tries it once more
+        for _ in range(2):
+            while self._pending and await self.flush():
+                pass
+
+    async def _flusher(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            while self._pending and await self.flush():
+                if len(self._pending) < self.batch_size:
+                    break
+
+    def record(self, user_id: str, field: str = "last_login", at: Optional[datetime] = None):
+        fields = self._pending.get(user_id)
+        if fields is None:
+            if len(self._pending) >= self.max_pending:
+                # Mongo is behind, a missed timestamp is cheaper than unbounded memory
+                self.dropped += 1
+                return
+            fields = self._pending[user_id] = {}
+        fields[field] = at or datetime.utcnow()
+        self.recorded += 1
+        if len(self._pending) >= self.batch_size:
+            self._flush_requested.set()
+
+    async def flush(self) -> bool:
+        """Writes up to ``batch_size`` buffered users, returns False when the write failed."""
+        batch = {}
+        for user_id in list(self._pending)[:self.batch_size]:
+            batch[user_id] = self._pending.pop(user_id)
+        if not batch:
+            return True
+        try:
+            await self.user_repository.set_activity(batch)
+        except Exception as e:
+            self.flush_errors += 1
+            logger.error(f"Writing activity of {len(batch)} users failed: {str(e)}")
+            for user_id, fields in batch.items():
+                # Timestamps recorded meanwhile are newer
+                self._pending[user_id] = {**fields, **self._pending.get(user_id, {})}
+            return False
+        self.flushes += 1
+        self.written += len(batch)
+        self.last_flush_size = len(batch)
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "recorded": self.recorded,
+            "written": self.written,
+            "flushes": self.flushes,
+            "last_flush_size": self.last_flush_size,
+            "flush_errors": self.flush_errors,
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,214 @@
+import bisect
+import os
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from models.booking import BookingStatus
+from repositories.analytics_repository import AnalyticsRepository, spans
+from utils.lease import LeasedJob, MongoLease
+from utils.logging import logger
+
+ENABLED = os.getenv("ROLLUPS_ENABLED", "true").lower() != "false"
+INTERVAL_SECONDS = float(os.getenv("ROLLUPS_INTERVAL", "300"))
+BACKFILL_DAYS = int(os.getenv("ROLLUPS_BACKFILL_DAYS", "365"))
+# Changes written while the previous run was reading are picked up again
+OVERLAP = timedelta(seconds=60)
+# Days recomputed per batch by a backfill, bounds the documents held in memory
+BACKFILL_CHUNK_DAYS = 31
+
+# Statuses whose bookings occupy their nights
+OCCUPYING = [BookingStatus.ACCEPTED.value, BookingStatus.COMPLETED.value]
+
+FAMILIES = {
+    "bookings": ["bookings.created"] + [f"bookings.status.{status.value}" for status in BookingStatus],
+    "occupancy": ["occupancy.nights"],
+    "apartments": ["apartments.active", "apartments.price_sum"],
+    "reviews": ["reviews.created", "reviews.rating_sum"],
+}
+
+Values = Dict[Tuple[str, date, Optional[str]], float]
+
+
+def _stay_days(document: dict) -> Iterable[date]:
+    day = document["check_in_date"].date()
+    last = document["check_out_date"].date()
+    while day < last:
+        yield day
+        day += timedelta(days=1)
+
+
+class AnalyticsRollups(LeasedJob):
+    """Background job folding bookings, apartments and reviews into ``DailyRollups``.
+
+    Every ``interval`` seconds the holder of the ``rollups`` lease reads the
+    bookings and reviews updated since the last run, marks the days they
+    count towards as dirty (creation day, and the nights of a stay before
+    and after the change) and recomputes only those days; the apartment snapshot (active listings and
+    their prices per district) is taken for today.  ``backfill`` recomputes
+    a range of days from scratch; it also runs when there are no rollups.
+    Deleted bookings and reviews are only dropped from the rollups by a
+    backfill.
+    """
+
+    name = "Rollups"
+
+    def __init__(
+        self,
+        analytics_repository: AnalyticsRepository,
+        lease: MongoLease,
+        interval: float = INTERVAL_SECONDS,
+        backfill_days: int = BACKFILL_DAYS,
+        enabled: bool = ENABLED
+    ):
+        super().__init__(lease, interval, enabled)
+        self.analytics_repository = analytics_repository
+        self.backfill_days = backfill_days
+        self.days_recomputed = 0
+
+    async def run_once(self) -> dict:
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        watermark = await self.analytics_repository.get_watermark()
+        if watermark is None:
+            return await self.backfill(now.date() - timedelta(days=self.backfill_days), now.date())
+
+        since = watermark - OVERLAP
+        dirty: Dict[str, Set[date]] = defaultdict(set)
+        released = []
+        changed = []
+        async for booking in self.analytics_repository.iter_changed(
+            "Bookings", since, {"createdAt": 1, "status": 1, "check_in_date": 1, "check_out_date": 1}
+        ):
+            if booking.get("createdAt"):
+                dirty["bookings"].add(booking["createdAt"].date())
+            # Whatever the status now, the change may have freed or taken nights
+            if booking.get("check_in_date") and booking.get("check_out_date"):
+                dirty["occupancy"].update(_stay_days(booking))
+            if booking.get("status") not in OCCUPYING:
+                released.append(booking["_id"])
+            changed.append(booking["_id"])
+        # The nights counted before a change of dates
+        for stay in await self.analytics_repository.get_counted_stays(changed):
+            dirty["occupancy"].update(_stay_days(stay))
+        async for review in self.analytics_repository.iter_changed("Reviews", since, {"createdAt": 1}):
+            if review.get("createdAt"):
+                dirty["reviews"].add(review["createdAt"].date())
+        dirty["apartments"].add(now.date())
+
+        await self.recompute(dirty, now)
+        await self.analytics_repository.delete_counted_stays(released)
+        await self.analytics_repository.set_watermark(now)
+        days = sum(len(days) for days in dirty.values())
+        self._finish(now, started, days)
+        return {"backfill": False, "days": {family: len(days) for family, days in dirty.items()}}
+
+    async def backfill(self, first: date, last: date) -> dict:
+        """Recomputes every rollup from ``first`` to ``last``, a chunk of days at a time."""
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        day = first
+        while day <= last:
+            chunk = [day + timedelta(days=n) for n in range(min(BACKFILL_CHUNK_DAYS, (last - day).days + 1))]
+            await self.recompute({family: set(chunk) for family in FAMILIES}, now)
+            day = chunk[-1] + timedelta(days=1)
+            # Renew the lease during long backfills
+            if not await self.lease.acquire():
+                raise RuntimeError("Rollups lease lost")
+        await self.analytics_repository.set_watermark(now)
+        days = (last - first).days + 1
+        self._finish(now, started, days * len(FAMILIES))
+        logger.info(f"Rollups backfilled for {days} days in {self.last_duration_ms}ms")
+        return {"backfill": True, "days": days}
+
+    async def recompute(self, dirty: Dict[str, Set[date]], computed_at: datetime):
+        """Rewrites the rollups of the given days, per family of metrics."""
+        compute = {
+            "bookings": self._bookings,
+            "occupancy": self._occupancy,
+            "apartments": self._apartments,
+            "reviews": self._reviews,
+        }
+        for family, days in dirty.items():
+            if not days:
+                continue
+            values = await compute[family](days)
+            await self.analytics_repository.save_rollups(values, computed_at)
+            await self.analytics_repository.delete_stale(FAMILIES[family], spans(days), computed_at)
+
+    async def _bookings(self, days: Set[date]) -> Values:
+        bookings = [
+            booking async for booking in self.analytics_repository.iter_created(
+                "Bookings", spans(days), {"apartmentId": 1, "status": 1, "createdAt": 1}
+            )
+        ]
+        districts = await self.analytics_repository.get_districts(b.get("apartmentId") for b in bookings)
+        values: Values = defaultdict(int)
+        for booking in bookings:
+            day = booking["createdAt"].date()
+            district = districts.get(booking.get("apartmentId"))
+            values[("bookings.created", day, district)] += 1
+            values[(f"bookings.status.{booking.get('status')}", day, district)] += 1
+        return values
+
+    async def _occupancy(self, days: Set[date]) -> Values:
+        stays = [stay async for stay in self.analytics_repository.iter_stays(OCCUPYING, spans(days))]
+        await self.analytics_repository.save_counted_stays(stays)
+        districts = await self.analytics_repository.get_districts(stay.get("apartmentId") for stay in stays)
+        values: Values = defaultdict(int)
+        for stay in stays:
+            district = districts.get(stay.get("apartmentId"))
+            for day in _stay_days(stay):
+                if day in days:
+                    values[("occupancy.nights", day, district)] += 1
+        return values
+
+    async def _apartments(self, days: Set[date]) -> Values:
+        # Listings active now and created by the day; past states of a listing are not stored
+        ordered = sorted(days)
+        counts: Dict[Optional[str], List[int]] = defaultdict(lambda: [0] * (len(ordered) + 1))
+        prices: Dict[Optional[str], List[int]] = defaultdict(lambda: [0] * (len(ordered) + 1))
+        async for apartment in self.analytics_repository.iter_apartments():
+            if not apartment.get("is_active", True):
+                continue
+            created = apartment.get("createdAt")
+            index = bisect.bisect_left(ordered, created.date()) if isinstance(created, datetime) else 0
+            district = apartment.get("district_name")
+            counts[district][index] += 1
+            prices[district][index] += apartment.get("price_per_month") or 0
+        values: Values = {}
+        for district in counts:
+            count = price = 0
+            for index, day in enumerate(ordered):
+                count += counts[district][index]
+                price += prices[district][index]
+                if count:
+                    values[("apartments.active", day, district)] = count
+                    values[("apartments.price_sum", day, district)] = price
+        return values
+
+    async def _reviews(self, days: Set[date]) -> Values:
+        reviews = [
+            review async for review in self.analytics_repository.iter_created(
+                "Reviews", spans(days), {"targetId": 1, "review_type": 1, "rating": 1, "createdAt": 1}
+            )
+        ]
+        districts = await self.analytics_repository.get_districts(
+            r.get("targetId") for r in reviews if r.get("review_type") == "apartment"
+        )
+        values: Values = defaultdict(int)
+        for review in reviews:
+            day = review["createdAt"].date()
+            # Reviews of users have no district
+            district = districts.get(review.get("targetId")) if review.get("review_type") == "apartment" else None
+            values[("reviews.created", day, district)] += 1
+            values[("reviews.rating_sum", day, district)] += review.get("rating") or 0
+        return values
+
+    def _finish(self, now: datetime, started: float, days: int):
+        self.days_recomputed += days
+        self._record(now, started)
+
+    def stats(self) -> dict:
+        return dict(super().stats(), days_recomputed=self.days_recomputed)
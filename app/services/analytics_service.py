@@ -0,0 +1,98 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from models.analytics import BookingsPoint, OccupancyPoint, PricePoint, ReviewsPoint
+from repositories.analytics_repository import AnalyticsRepository
+from services.analytics_rollups import FAMILIES
+
+MAX_DAYS = 366
+DEFAULT_DAYS = 30
+
+
+class AnalyticsService:
+    """Admin dashboards, read from the rollups of AnalyticsRollups in O(days x districts)."""
+
+    def __init__(self, analytics_repository: AnalyticsRepository):
+        self.analytics_repository = analytics_repository
+
+    async def _series(
+        self,
+        metrics: List[str],
+        start: Optional[date],
+        end: Optional[date],
+        district: Optional[str],
+        by_district: bool
+    ) -> Dict[Tuple[date, Optional[str]], Dict[str, float]]:
+        end = end or datetime.utcnow().date()
+        start = start or end - timedelta(days=DEFAULT_DAYS - 1)
+        if start > end:
+            raise HTTPException(status_code=400, detail="start must not be after end")
+        if (end - start).days + 1 > MAX_DAYS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_DAYS} days per request")
+
+        rows = await self.analytics_repository.get_rollups(metrics, start, end, district)
+        series: Dict[Tuple[date, Optional[str]], Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        for row in rows:
+            key = row["district"] if by_district else district
+            series[(row["date"].date(), key)][row["metric"]] += row["value"]
+        return dict(sorted(series.items(), key=lambda item: (item[0][0], item[0][1] or "")))
+
+    async def get_occupancy(self, start=None, end=None, district=None, by_district=False) -> List[OccupancyPoint]:
+        series = await self._series(
+            FAMILIES["occupancy"] + ["apartments.active"], start, end, district, by_district
+        )
+        return [
+            OccupancyPoint(
+                date=day,
+                district=key,
+                occupied_nights=int(values["occupancy.nights"]),
+                apartments=int(values["apartments.active"]),
+                occupancy_rate=round(values["occupancy.nights"] / values["apartments.active"], 4)
+                if values["apartments.active"] else None
+            )
+            for (day, key), values in series.items()
+        ]
+
+    async def get_bookings(self, start=None, end=None, district=None, by_district=False) -> List[BookingsPoint]:
+        series = await self._series(FAMILIES["bookings"], start, end, district, by_district)
+        prefix = "bookings.status."
+        return [
+            BookingsPoint(
+                date=day,
+                district=key,
+                created=int(values["bookings.created"]),
+                by_status={
+                    metric[len(prefix):]: int(value) for metric, value in values.items() if metric.startswith(prefix)
+                }
+            )
+            for (day, key), values in series.items()
+        ]
+
+    async def get_prices(self, start=None, end=None, district=None, by_district=True) -> List[PricePoint]:
+        series = await self._series(FAMILIES["apartments"], start, end, district, by_district)
+        return [
+            PricePoint(
+                date=day,
+                district=key,
+                apartments=int(values["apartments.active"]),
+                average_price=round(values["apartments.price_sum"] / values["apartments.active"], 2)
+                if values["apartments.active"] else None
+            )
+            for (day, key), values in series.items()
+        ]
+
+    async def get_reviews(self, start=None, end=None, district=None, by_district=False) -> List[ReviewsPoint]:
+        series = await self._series(FAMILIES["reviews"], start, end, district, by_district)
+        return [
+            ReviewsPoint(
+                date=day,
+                district=key,
+                reviews=int(values["reviews.created"]),
+                average_rating=round(values["reviews.rating_sum"] / values["reviews.created"], 3)
+                if values["reviews.created"] else None
+            )
+            for (day, key), values in series.items()
+        ]
@@ -0,0 +1,70 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+from repositories.apartment_repository import ApartmentRepository
+from utils.lease import LeasedJob, MongoLease
+from utils.logging import logger
+
+ENABLED = os.getenv("ARCHIVE_ENABLED", "true").lower() != "false"
+INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL", "3600"))
+BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+# Active listings not updated for this long are expired
+EXPIRE_DAYS = float(os.getenv("ARCHIVE_EXPIRE_DAYS", "365"))
+
+
+class ApartmentArchiver(LeasedJob):
+    """Background job moving inactive and expired listings to ``ApartmentsArchive``.
+
+    Every ``interval`` seconds the holder of the ``apartment-archive`` lease
+    moves, in batches of ``batch_size``, the listings with ``is_active``
+    false and the active ones not updated for ``expire_days``, unless a
+    pending or accepted stay is ahead of them.  ``Apartments`` then holds
+    only what search can show, so its indexes stay small as inventory
+    accumulates.  Reads by id fall back to the archive, and an owner's
+    patch with ``is_active: true`` moves a listing back.
+    """
+
+    name = "Archive"
+
+    def __init__(
+        self,
+        apartment_repository: ApartmentRepository,
+        lease: MongoLease,
+        interval: float = INTERVAL_SECONDS,
+        batch_size: int = BATCH_SIZE,
+        expire_days: float = EXPIRE_DAYS,
+        enabled: bool = ENABLED
+    ):
+        super().__init__(lease, interval, enabled)
+        self.apartment_repository = apartment_repository
+        self.batch_size = batch_size
+        self.expire_days = expire_days
+        self.archived = 0
+
+    async def run_once(self) -> dict:
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        updated_before = now - timedelta(days=self.expire_days)
+        archived = 0
+        while True:
+            moved = await self.apartment_repository.archive_batch(now, updated_before, self.batch_size)
+            # Archived listings leave the similar apartments rails
+            await self.apartment_repository.queue_similarity_updates(moved)
+            archived += len(moved)
+            # Renew the lease during long backlogs, stop if another worker took it
+            if len(moved) < self.batch_size or not await self.lease.acquire():
+                break
+        self.archived += archived
+        self._record(now, started)
+        if archived:
+            logger.info(f"Archived {archived} apartments in {self.last_duration_ms}ms")
+        return {"archived": archived}
+
+    def stats(self) -> dict:
+        return dict(
+            super().stats(),
+            batch_size=self.batch_size,
+            expire_days=self.expire_days,
+            archived=self.archived
+        )
@@ -0,0 +1,160 @@
+import math
+import os
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from repositories.apartment_repository import ApartmentRepository
+from repositories.review_repository import ReviewRepository
+from utils.lease import LeasedJob, MongoLease
+from utils.logging import logger
+
+ENABLED = os.getenv("RANKING_ENABLED", "true").lower() != "false"
+INTERVAL_SECONDS = float(os.getenv("RANKING_INTERVAL", "3600"))
+BATCH_SIZE = int(os.getenv("RANKING_BATCH_SIZE", "1000"))
+
+WEIGHTS = {
+    "promoted": 0.35,
+    "rating": 0.25,
+    "reviews": 0.15,
+    "recency": 0.10,
+    "completeness": 0.15,
+}
+# Ratings are shrunk towards this mean by this many virtual reviews, so one 5-star review does not win
+PRIOR_RATING = 3.5
+PRIOR_REVIEWS = 5
+# Review counts above this add nothing
+SATURATION_REVIEWS = 50
+RECENCY_HALF_LIFE_DAYS = 30.0
+FULL_PICTURES = 5
+FULL_DESCRIPTION = 300
+
+
+def ranking_score(document: dict, now: datetime) -> float:
+    """Listing order of an apartment in [0, 1], higher first.
+
+    ``document`` holds the Apartments fields ``is_promoted``, ``pictures``,
+    ``description``, ``createdAt``, ``reviewCount`` and ``ratingAverage``.
+    """
+    count = document.get("reviewCount") or 0
+    average = document.get("ratingAverage") or 0.0
+    rating = (PRIOR_RATING * PRIOR_REVIEWS + average * count) / (PRIOR_REVIEWS + count)
+    created = document.get("createdAt")
+    age_days = max((now - created).total_seconds() / 86400, 0.0) if isinstance(created, datetime) else math.inf
+    completeness = (
+        0.6 * min(len(document.get("pictures") or []) / FULL_PICTURES, 1.0)
+        + 0.4 * min(len(document.get("description") or "") / FULL_DESCRIPTION, 1.0)
+    )
+    score = (
+        WEIGHTS["promoted"] * bool(document.get("is_promoted"))
+        + WEIGHTS["rating"] * (rating - 1) / 4
+        + WEIGHTS["reviews"] * min(math.log1p(count) / math.log1p(SATURATION_REVIEWS), 1.0)
+        + WEIGHTS["recency"] * 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+        + WEIGHTS["completeness"] * completeness
+    )
+    return round(score, 6)
+
+
+class ApartmentRanking(LeasedJob):
+    """Keeps the indexed ``rankingScore`` of apartments, the order of search and promoted listings.
+
+    ApartmentService refreshes an apartment's score when it is created or
+    updated, ReviewService when one of its reviews changes (together with
+    the stored ``reviewCount`` and ``ratingAverage``).  Recency decays with
+    time, so every ``interval`` seconds the holder of the ``ranking`` lease
+    recomputes all scores and writes the ones that changed.
+    """
+
+    name = "Ranking"
+
+    def __init__(
+        self,
+        apartment_repository: ApartmentRepository,
+        review_repository: ReviewRepository,
+        lease: MongoLease,
+        interval: float = INTERVAL_SECONDS,
+        batch_size: int = BATCH_SIZE,
+        enabled: bool = ENABLED
+    ):
+        super().__init__(lease, interval, enabled)
+        self.apartment_repository = apartment_repository
+        self.review_repository = review_repository
+        self.batch_size = batch_size
+        self.refreshed = 0
+        self.updated = 0
+
+    async def refresh(self, apartment_id: str, document: Optional[dict] = None):
+        """Recomputes one apartment's score, from ``document`` when the caller has it."""
+        try:
+            if document is None:
+                document = await self.apartment_repository.get_ranking_features(apartment_id)
+                if document is None:
+                    return
+            await self.apartment_repository.save_rankings(
+                {apartment_id: {"rankingScore": ranking_score(document, datetime.utcnow())}}
+            )
+            self.refreshed += 1
+        except Exception as e:
+            # The periodic recompute fixes a missed refresh
+            logger.error(f"Ranking refresh of {apartment_id} failed: {str(e)}")
+
+    async def refresh_reviews(self, apartment_id: str):
+        """Recomputes an apartment's review stats and score after one of its reviews changed."""
+        try:
+            document = await self.apartment_repository.get_ranking_features(apartment_id)
+            if document is None:
+                return
+            stats = await self.review_repository.get_rating_stats([apartment_id])
+            fields = _review_fields(stats.get(apartment_id))
+            document.update(fields)
+            fields["rankingScore"] = ranking_score(document, datetime.utcnow())
+            await self.apartment_repository.save_rankings({apartment_id: fields})
+            self.refreshed += 1
+        except Exception as e:
+            logger.error(f"Ranking refresh of {apartment_id} failed: {str(e)}")
+
+    async def run_once(self) -> dict:
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        # One $group over the reviews instead of one per apartment
+        stats = await self.review_repository.get_rating_stats()
+        scanned = 0
+        updated = 0
+        changes: Dict[str, dict] = {}
+        async for document in self.apartment_repository.iter_ranking_features():
+            scanned += 1
+            apartment_id = str(document["_id"])
+            fields = _review_fields(stats.get(apartment_id))
+            document_fields = {name: document.get(name) for name in fields}
+            document.update(fields)
+            fields["rankingScore"] = ranking_score(document, now)
+            document_fields["rankingScore"] = document.get("rankingScore")
+            # Most scores only move with recency, unchanged ones are not written
+            if fields != document_fields:
+                changes[apartment_id] = fields
+            if len(changes) >= self.batch_size:
+                updated += await self._save(changes)
+        updated += await self._save(changes)
+        self.updated += updated
+        self._record(now, started)
+        logger.info(f"Ranking recomputed for {scanned} apartments, {updated} changed in {self.last_duration_ms}ms")
+        return {"scanned": scanned, "updated": updated}
+
+    async def _save(self, changes: Dict[str, dict]) -> int:
+        if not changes:
+            return 0
+        await self.apartment_repository.save_rankings(changes)
+        count = len(changes)
+        changes.clear()
+        # Renew the lease during long runs
+        if not await self.lease.acquire():
+            raise RuntimeError("Ranking lease lost")
+        return count
+
+    def stats(self) -> dict:
+        return dict(super().stats(), refreshed=self.refreshed, updated=self.updated)
+
+
+def _review_fields(stats: Optional[Tuple[int, float]]) -> dict:
+    count, average = stats or (0, 0.0)
+    return {"reviewCount": count, "ratingAverage": round(average, 4)}
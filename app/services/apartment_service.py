@@ -1,33 +1,104 @@
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from models.user import User
 from datetime import datetime
-from models.apartment import Apartment
-from repositories.apartment_repository import ApartmentRepository
-from fastapi import HTTPException
+from models.apartment import Apartment, ApartmentOwner, ApartmentWithOwner, ApartmentPicture, SimilarApartment
+from repositories.apartment_repository import ApartmentRepository, RANKING_PROJECTION, SIMILARITY_PROJECTION
+from fastapi import HTTPException, Request
+from bson import ObjectId
 from utils.misc import require_owner_or_admin
+from utils.singleflight import SingleFlight, coalesce
+from utils.dataloader import DataLoader
+from utils.merge_patch import merge_patch
+from services.saved_search_service import SavedSearchService
+from services.apartment_ranking import ApartmentRanking
+from services.picture_service import PictureService
+
+# Set by the server, ignored in patches
+READ_ONLY_FIELDS = {"apartmentId", "ownerId", "created_at", "updated_at"}
+
+def _check_after(after: Optional[str]):
+    if after is not None and not ObjectId.is_valid(after):
+        raise HTTPException(status_code=400, detail="after must be an apartment id")
 
 class ApartmentService:
-    def __init__(self, apartment_repository: ApartmentRepository):
+    def __init__(
+        self,
+        apartment_repository: ApartmentRepository,
+        singleflight: Optional[SingleFlight] = None,
+        saved_search_service: Optional[SavedSearchService] = None,
+        ranking: Optional[ApartmentRanking] = None,
+        picture_service: Optional[PictureService] = None
+    ):
         self.apartment_repository = apartment_repository
+        self.singleflight = singleflight or SingleFlight()
+        self.saved_search_service = saved_search_service
+        self.ranking = ranking
+        self.picture_service = picture_service
+
+    def _notify(self, apartment: Optional[Apartment]) -> Optional[Apartment]:
+        # Only queued here, saved searches are matched in the background
+        if self.saved_search_service is not None:
+            self.saved_search_service.notify_apartment(apartment)
+        return apartment
+
+    async def _queue_similarity_update(self, apartment: Optional[Apartment]) -> Optional[Apartment]:
+        if apartment is not None:
+            await self.apartment_repository.queue_similarity_update(apartment.apartmentId)
+        return apartment
+
+    async def _refresh_ranking(self, apartment: Optional[Apartment], created: bool = False) -> Optional[Apartment]:
+        if apartment is not None and self.ranking is not None:
+            # A new apartment has no reviews, so its score needs no read
+            document = dict(apartment.model_dump(), createdAt=datetime.utcnow()) if created else None
+            await self.ranking.refresh(apartment.apartmentId, document)
+        return apartment
 
     async def create_apartment(self, apartment: Apartment) -> Apartment:
-        return await self.apartment_repository.create(apartment)
+        apartment = await self._refresh_ranking(await self.apartment_repository.create(apartment), created=True)
+        return self._notify(await self._queue_similarity_update(apartment))
 
+    @coalesce
     async def get_apartment(self, apartment_id: str) -> Apartment:
         apartment = await self.apartment_repository.get_by_id(apartment_id)
         if not apartment:
             raise HTTPException(status_code=404, detail="Apartment not found")
         return apartment
 
-    async def update_apartment(self, apartment_id: str, apartment_data: Apartment, user_id: str) -> Apartment:
-        existing_apartment = await self.apartment_repository.get_by_id(apartment_id)
-        if not existing_apartment:
-            raise HTTPException(status_code=404, detail="Apartment not found")
+    async def update_apartment(self, apartment_id: str, patch: Dict[str, Any], user_id: str) -> Apartment:
+        changes = merge_patch(Apartment, patch, READ_ONLY_FIELDS)
+        # The owner is part of the filter, one round trip updates or matches nothing
+        apartment = await self.apartment_repository.patch(apartment_id, changes, owner_id=user_id)
+        restored = False
+        if apartment is None and changes.set.get("is_active") is True:
+            # Reactivating an archived listing moves it back first
+            restored = await self.apartment_repository.restore(apartment_id, owner_id=user_id)
+            if restored:
+                apartment = await self.apartment_repository.patch(apartment_id, changes, owner_id=user_id)
+        if apartment is None:
+            existing_apartment = await self.apartment_repository.get_by_id(apartment_id)
+            if not existing_apartment:
+                raise HTTPException(status_code=404, detail="Apartment not found")
+            if existing_apartment.ownerId != user_id:
+                raise HTTPException(status_code=403, detail="You are not the owner of this apartment")
+            raise HTTPException(status_code=409, detail="Apartment is archived, set is_active to true to reactivate it")
 
-        if existing_apartment.ownerId != user_id:
-            raise HTTPException(status_code=403, detail="You are not the owner of this apartment")
+        if restored or changes.fields & RANKING_PROJECTION.keys():
+            await self._refresh_ranking(apartment)
+        if restored or changes.fields & SIMILARITY_PROJECTION.keys():
+            await self._queue_similarity_update(apartment)
+        return self._notify(apartment)
 
-        return await self.apartment_repository.update(apartment_id, apartment_data)
+    async def add_pictures(self, apartment_id: str, user: User, request: Request) -> List[ApartmentPicture]:
+        await require_owner_or_admin(apartment_id, user, self.apartment_repository)
+        if not await self.apartment_repository.get_by_id(apartment_id):
+            raise HTTPException(status_code=404, detail="Apartment not found")
+
+        pictures = await self.picture_service.store(await self.picture_service.receive(request))
+        apartment = await self.apartment_repository.add_pictures(apartment_id, [p.url for p in pictures])
+        if not apartment:
+            raise HTTPException(status_code=404, detail="Apartment not found")
+        await self._queue_similarity_update(await self._refresh_ranking(apartment))
+        return pictures
 
     async def delete_apartment(self, apartment_id: str, user: User) -> bool:
         user_id = user.userId
@@ -39,11 +110,25 @@ class ApartmentService:
         success = await self.apartment_repository.delete(apartment_id)
         if not success:
             raise HTTPException(status_code=404, detail="Apartment not found")
+        await self.apartment_repository.queue_similarity_update(apartment_id)
         return True
 
+    @coalesce
+    async def get_similar_apartments(self, apartment_id: str, limit: int = 10) -> List[SimilarApartment]:
+        # Precomputed by the similar apartments job, so one read by _id
+        similar = await self.apartment_repository.get_similar(apartment_id)
+        if similar is None:
+            # Not computed yet, or no such apartment
+            if not await self.apartment_repository.get_by_id(apartment_id):
+                raise HTTPException(status_code=404, detail="Apartment not found")
+            return []
+        return similar[:limit]
+
+    @coalesce
     async def get_owner_apartments(self, owner_id: str) -> List[Apartment]:
         return await self.apartment_repository.get_by_owner(owner_id)
 
+    @coalesce
     async def search_apartments(
         self,
         min_price: Optional[int] = None,
@@ -51,19 +136,31 @@ class ApartmentService:
         location: Optional[str] = None,
         university: Optional[str] = None,
         room_type: Optional[str] = None,
+        check_in: Optional[datetime] = None,
+        check_out: Optional[datetime] = None,
+        after: Optional[str] = None,
         skip: int = 0,
         limit: int = 100
     ) -> List[Apartment]:
+        _check_after(after)
+        if (check_in is None) != (check_out is None):
+            raise HTTPException(status_code=400, detail="check_in and check_out must be given together")
+        if check_in and check_out <= check_in:
+            raise HTTPException(status_code=400, detail="check_out must be after check_in")
         return await self.apartment_repository.search(
             min_price=min_price,
             max_price=max_price,
             location=location,
             university=university,
             room_type=room_type,
+            check_in=check_in,
+            check_out=check_out,
+            after=after,
             skip=skip,
             limit=limit
         )
 
+    @coalesce
     async def get_nearby_apartments(
         self,
         latitude: float,
@@ -80,5 +177,29 @@ class ApartmentService:
             limit=limit
         )
 
-    async def get_promoted_apartments(self, skip: int = 0, limit: int = 100) -> List[Apartment]:
-        return await self.apartment_repository.get_promoted(skip=skip, limit=limit) 
\ No newline at end of file
+    @coalesce
+    async def get_promoted_apartments(
+        self,
+        after: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[Apartment]:
+        _check_after(after)
+        return await self.apartment_repository.get_promoted(after=after, skip=skip, limit=limit)
+
+    async def with_owners(self, apartments: List[Apartment], users: DataLoader) -> List[ApartmentWithOwner]:
+        # The loads are gathered, so the owners of a page are fetched with one query
+        owners = await users.load_many(apartment.ownerId for apartment in apartments)
+        return [
+            ApartmentWithOwner.model_construct(
+                **dict(apartment),
+                owner=ApartmentOwner(
+                    userId=owner.userId,
+                    name=owner.name,
+                    surname=owner.surname,
+                    avatar_url=owner.avatar_url,
+                    is_verified_landlord=bool(owner.is_verified_landlord)
+                ) if owner else None
+            )
+            for apartment, owner in zip(apartments, owners)
+        ]
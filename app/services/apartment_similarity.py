@@ -0,0 +1,256 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+NUMERIC_COLUMNS = 5
+# Apartments this far apart count as one unit of distance, the same as one standard deviation of price
+LOCATION_SCALE_KM = 3.0
+
+
+def _summary(document: dict) -> dict:
+    pictures = document.get("pictures") or []
+    return {
+        "apartmentId": str(document["_id"]),
+        "apartment_name": document.get("apartment_name"),
+        "price_per_month": document.get("price_per_month"),
+        "district_name": document.get("district_name"),
+        "rental_type": document.get("rental_type"),
+        "university_nearby": document.get("university_nearby"),
+        "number_of_rooms": document.get("number_of_rooms"),
+        "picture": pictures[0] if pictures else None,
+    }
+
+
+class ApartmentSimilarityIndex:
+    """Feature matrix of apartments and the top-k most similar apartments of each.
+
+    Price, area and number of rooms are standardized (price and area on a
+    log scale), location is projected to kilometres and rental type and
+    university are one-hot columns, each scaled so that the squared
+    Euclidean distance of two rows is the weighted sum of the differences
+    (a different rental type or university adds its weight).  Distances
+    of a block of rows to all rows are then one matrix product.  The
+    similarity is ``1 / (1 + distance)``, in (0, 1].
+
+    ``build`` fixes the normalization; ``upsert``/``remove`` then change
+    single rows and ``affected_rows`` tells which rows' neighbours to
+    recompute with ``compute``.
+    """
+
+    WEIGHTS = {
+        "price": 2.0,
+        "area": 1.0,
+        "rooms": 1.0,
+        "location": 2.0,
+        "rental_type": 1.5,
+        "university": 1.0,
+    }
+    BLOCK_ROWS = 256
+
+    def __init__(self, k: int = 20, capacity: int = 1024):
+        self.k = k
+        self._stats = {"price": (0.0, 1.0), "area": (0.0, 1.0), "rooms": (0.0, 1.0)}
+        self._origin = (0.0, 0.0, 1.0)  # latitude, longitude, cos(latitude) of the projection
+        self._reset(capacity)
+
+    def _reset(self, capacity: int):
+        self._rows: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._free: List[int] = []
+        self._summaries: List[Optional[dict]] = []
+        # (feature, value) -> one-hot column
+        self._columns: Dict[Tuple[str, str], int] = {}
+        self.size = 0
+        self.features = np.zeros((capacity, NUMERIC_COLUMNS + 8), dtype=np.float32)
+        self.norms = np.zeros(capacity, dtype=np.float32)
+        # Norms plus inf for inactive apartments and free rows, so they are never a neighbour
+        self.candidate_norms = np.full(capacity, np.inf, dtype=np.float32)
+        self.neighbours = np.full((capacity, self.k), -1, dtype=np.int32)
+        self.neighbour_distances = np.full((capacity, self.k), np.inf, dtype=np.float32)
+        # Distance of the k-th neighbour, an apartment closer than it enters the list
+        self.radius = np.full(capacity, np.inf, dtype=np.float32)
+        self.capacity = capacity
+
+    def _grow(self, capacity: int, columns: int):
+        def grow(name, fill, shape):
+            old = getattr(self, name)
+            array = np.full(shape, fill, dtype=old.dtype)
+            array[tuple(slice(0, size) for size in old.shape)] = old
+            setattr(self, name, array)
+
+        grow("features", 0.0, (capacity, columns))
+        grow("norms", 0.0, (capacity,))
+        grow("candidate_norms", np.inf, (capacity,))
+        grow("neighbours", -1, (capacity, self.k))
+        grow("neighbour_distances", np.inf, (capacity, self.k))
+        grow("radius", np.inf, (capacity,))
+        self.capacity = capacity
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, apartment_id: str) -> bool:
+        return apartment_id in self._rows
+
+    def build(self, documents: List[dict]):
+        """Replaces the whole index and fixes the normalization from ``documents``."""
+        def stats(values):
+            values = np.asarray(values, dtype=np.float64)
+            return float(values.mean()), float(values.std()) or 1.0
+
+        if documents:
+            self._stats = {
+                "price": stats([math.log1p(max(d.get("price_per_month") or 0, 0)) for d in documents]),
+                "area": stats([math.log1p(max(d.get("area") or 0, 0)) for d in documents]),
+                "rooms": stats([d.get("number_of_rooms") or 0 for d in documents]),
+            }
+            latitude = float(np.mean([d.get("latitude") or 0.0 for d in documents]))
+            longitude = float(np.mean([d.get("longitude") or 0.0 for d in documents]))
+            self._origin = (latitude, longitude, math.cos(math.radians(latitude)))
+        self._reset(max(1024, len(documents)))
+        for document in documents:
+            self.upsert(document)
+        self.compute(np.arange(self.size))
+
+    def _numeric(self, document: dict) -> List[float]:
+        def standard(name, value):
+            mean, std = self._stats[name]
+            return (value - mean) / std * math.sqrt(self.WEIGHTS[name])
+
+        # Centred on the build's mean position, float32 distances lose precision far from 0
+        latitude, longitude, cos_latitude = self._origin
+        location = math.sqrt(self.WEIGHTS["location"]) / LOCATION_SCALE_KM
+        return [
+            standard("price", math.log1p(max(document.get("price_per_month") or 0, 0))),
+            standard("area", math.log1p(max(document.get("area") or 0, 0))),
+            standard("rooms", document.get("number_of_rooms") or 0),
+            ((document.get("longitude") or 0.0) - longitude) * 111.32 * cos_latitude * location,
+            ((document.get("latitude") or 0.0) - latitude) * 110.57 * location,
+        ]
+
+    def _column(self, feature: str, value) -> Optional[int]:
+        if not value:
+            return None
+        key = (feature, str(value).strip().lower())
+        column = self._columns.get(key)
+        if column is None:
+            column = self._columns[key] = NUMERIC_COLUMNS + len(self._columns)
+            if column >= self.features.shape[1]:
+                self._grow(self.capacity, self.features.shape[1] * 2)
+        return column
+
+    def upsert(self, document: dict) -> int:
+        """Adds or replaces the row of an Apartments document (``_id`` and the features)."""
+        apartment_id = str(document["_id"])
+        row = self._rows.get(apartment_id)
+        if row is None:
+            if self._free:
+                row = self._free.pop()
+            else:
+                if self.size == self.capacity:
+                    self._grow(self.capacity * 2, self.features.shape[1])
+                row = self.size
+                self.size += 1
+                self._ids.append(None)
+                self._summaries.append(None)
+            self._rows[apartment_id] = row
+            self._ids[row] = apartment_id
+
+        columns = [self._column("rental_type", document.get("rental_type")),
+                   self._column("university", document.get("university_nearby"))]
+        vector = self.features[row]
+        vector[:] = 0
+        vector[:NUMERIC_COLUMNS] = self._numeric(document)
+        for feature, column in zip(("rental_type", "university"), columns):
+            if column is not None:
+                # Two different one-hot values are sqrt(2) * this apart, i.e. the weight squared
+                vector[column] = math.sqrt(self.WEIGHTS[feature] / 2)
+        self.norms[row] = float(np.dot(vector, vector))
+        self.candidate_norms[row] = self.norms[row] if document.get("is_active", True) else np.inf
+        self._summaries[row] = _summary(document)
+        return row
+
+    def remove(self, apartment_id: str) -> Optional[int]:
+        row = self._rows.pop(apartment_id, None)
+        if row is None:
+            return None
+        self._ids[row] = None
+        self._summaries[row] = None
+        self.candidate_norms[row] = np.inf
+        self.neighbours[row] = -1
+        self.neighbour_distances[row] = np.inf
+        self.radius[row] = np.inf
+        self._free.append(row)
+        return row
+
+    def distances(self, rows: np.ndarray, reverse: bool = False) -> np.ndarray:
+        """Squared distances of ``rows`` (m) to every row (n) as an m x n matrix, inf for non-candidates.
+
+        With ``reverse`` the ``rows`` are the candidates, for every row as the query.
+        """
+        n = self.size
+        row_norms, column_norms = self.norms[rows], self.candidate_norms[:n]
+        if reverse:
+            row_norms, column_norms = self.candidate_norms[rows], self.norms[:n]
+        # |a - b|^2 = |a|^2 + |b|^2 - 2 a.b
+        distances = (-2 * self.features[rows]) @ self.features[:n].T
+        distances += row_norms[:, None]
+        distances += column_norms
+        distances[np.arange(len(rows)), rows] = np.inf
+        return distances
+
+    def compute(self, rows):
+        """Recomputes the neighbours of ``rows``, a block at a time."""
+        rows = np.asarray(rows, dtype=np.int64)
+        k = min(self.k, max(self.size - 1, 0))
+        for start in range(0, len(rows), self.BLOCK_ROWS):
+            block = rows[start:start + self.BLOCK_ROWS]
+            self.neighbours[block] = -1
+            self.neighbour_distances[block] = np.inf
+            self.radius[block] = np.inf
+            if k == 0:
+                continue
+            distances = self.distances(block)
+            best = np.argpartition(distances, k - 1, axis=1)[:, :k]
+            best_distances = np.take_along_axis(distances, best, axis=1)
+            order = np.argsort(best_distances, axis=1, kind="stable")
+            best = np.take_along_axis(best, order, axis=1)
+            best_distances = np.take_along_axis(best_distances, order, axis=1)
+            best[np.isinf(best_distances)] = -1
+            self.neighbours[block, :k] = best
+            self.neighbour_distances[block, :k] = best_distances
+            if k == self.k:
+                # Lists with fewer than k candidates keep an infinite radius
+                self.radius[block] = best_distances[:, -1]
+
+    def affected_rows(self, changed: List[int], removed: List[int]) -> np.ndarray:
+        """Rows whose neighbours may differ after ``changed`` rows were upserted and ``removed`` ones removed."""
+        n = self.size
+        touched = np.zeros(n, dtype=bool)
+        if changed or removed:
+            # Lists holding a changed or removed apartment
+            touched |= np.isin(self.neighbours[:n], changed + removed).any(axis=1)
+        for start in range(0, len(changed), self.BLOCK_ROWS):
+            block = np.asarray(changed[start:start + self.BLOCK_ROWS], dtype=np.int64)
+            # Lists a changed apartment now enters (distances are symmetric)
+            touched |= (self.distances(block, reverse=True) < self.radius[:n]).any(axis=0)
+        touched[self._free] = False
+        touched[changed] = True
+        return np.flatnonzero(touched)
+
+    def row(self, apartment_id: str) -> Optional[int]:
+        return self._rows.get(apartment_id)
+
+    def apartment_id(self, row: int) -> Optional[str]:
+        return self._ids[row]
+
+    def similar(self, row: int) -> List[dict]:
+        """Summaries of the neighbours of ``row`` with their score, most similar first."""
+        result = []
+        for neighbour, distance in zip(self.neighbours[row], self.neighbour_distances[row]):
+            if neighbour < 0:
+                break
+            score = 1 / (1 + max(float(distance), 0.0))
+            result.append(dict(self._summaries[neighbour], score=round(score, 4)))
+        return result
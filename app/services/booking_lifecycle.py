@@ -0,0 +1,75 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+from repositories.booking_repository import BookingRepository
+from utils.lease import LeasedJob, MongoLease
+from utils.logging import logger
+
+ENABLED = os.getenv("BOOKING_LIFECYCLE_ENABLED", "true").lower() != "false"
+INTERVAL_SECONDS = float(os.getenv("BOOKING_LIFECYCLE_INTERVAL", "300"))
+BATCH_SIZE = int(os.getenv("BOOKING_LIFECYCLE_BATCH_SIZE", "500"))
+PENDING_TTL_DAYS = float(os.getenv("BOOKING_PENDING_TTL_DAYS", "14"))
+
+
+class BookingLifecycle(LeasedJob):
+    """Background job moving bookings out of the active statuses.
+
+    Every ``interval`` seconds accepted bookings past their check-out become
+    ``completed``, and pending bookings past their check-in or older than
+    ``pending_ttl_days`` become ``expired``, in ``update_many`` batches of
+    ``batch_size``.  Every worker runs the loop but only the holder of the
+    ``booking-lifecycle`` lease does the work.
+    """
+
+    name = "Booking lifecycle"
+
+    def __init__(
+        self,
+        booking_repository: BookingRepository,
+        lease: MongoLease,
+        interval: float = INTERVAL_SECONDS,
+        batch_size: int = BATCH_SIZE,
+        pending_ttl_days: float = PENDING_TTL_DAYS,
+        enabled: bool = ENABLED
+    ):
+        super().__init__(lease, interval, enabled)
+        self.booking_repository = booking_repository
+        self.batch_size = batch_size
+        self.pending_ttl_days = pending_ttl_days
+        self.completed = 0
+        self.expired = 0
+
+    async def run_once(self) -> dict:
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        created_before = now - timedelta(days=self.pending_ttl_days)
+        completed = await self._drain(lambda: self.booking_repository.complete_finished(now, self.batch_size))
+        expired = await self._drain(
+            lambda: self.booking_repository.expire_pending(now, created_before, self.batch_size)
+        )
+        self.completed += completed
+        self.expired += expired
+        self._record(now, started)
+        if completed or expired:
+            logger.info(f"Booking lifecycle: {completed} completed, {expired} expired in {self.last_duration_ms}ms")
+        return {"completed": completed, "expired": expired}
+
+    async def _drain(self, batch) -> int:
+        total = 0
+        while True:
+            modified = await batch()
+            total += modified
+            if modified < self.batch_size:
+                return total
+            # Renew the lease during long backlogs, stop if another worker took it
+            if not await self.lease.acquire():
+                return total
+
+    def stats(self) -> dict:
+        return dict(
+            super().stats(),
+            batch_size=self.batch_size,
+            completed=self.completed,
+            expired=self.expired
+        )
@@ -1,9 +1,17 @@
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from datetime import datetime
-from models.booking import Booking, BookingStatus
+from models.booking import (
+    Booking, BookingStatus, LandlordApplicationsPage, UserBooking,
+    BookingDecision, BookingDecisionOutcome, BookingDecisionsResult
+)
+from models.user import User
 from repositories.booking_repository import BookingRepository
 from fastapi import HTTPException
+from bson import ObjectId
+from utils.merge_patch import merge_patch
 
+# Set by the server, ignored in patches
+READ_ONLY_FIELDS = {"bookingId", "userId", "created_at", "updated_at"}
 
 class BookingService:
     def __init__(self, booking_repository: BookingRepository):
@@ -25,11 +33,11 @@ class BookingService:
             raise HTTPException(status_code=404, detail="Booking not found")
         return booking
 
-    async def update_booking(self, booking_id: str, booking_data: Booking) -> Booking:
-        existing_booking = await self.booking_repository.get_by_id(booking_id)
-        if not existing_booking:
+    async def update_booking(self, booking_id: str, patch: Dict[str, Any]) -> Booking:
+        booking = await self.booking_repository.patch(booking_id, merge_patch(Booking, patch, READ_ONLY_FIELDS))
+        if not booking:
             raise HTTPException(status_code=404, detail="Booking not found")
-        return await self.booking_repository.update(booking_id, booking_data)
+        return booking
 
     async def delete_booking(self, booking_id: str) -> bool:
         success = await self.booking_repository.delete(booking_id)
@@ -37,8 +45,14 @@ class BookingService:
             raise HTTPException(status_code=404, detail="Booking not found")
         return True
 
-    async def get_user_bookings(self, user_id: str) -> List[Booking]:
-        return await self.booking_repository.get_by_user(user_id)
+    async def get_user_bookings(
+        self,
+        user_id: str,
+        skip: int = 0,
+        limit: int = 100,
+        expand_apartment: bool = False
+    ) -> List[UserBooking]:
+        return await self.booking_repository.get_by_user(user_id, skip, limit, expand_apartment)
 
     async def get_apartment_bookings(self, apartment_id: str) -> List[Booking]:
         return await self.booking_repository.get_by_apartment(apartment_id)
@@ -71,4 +85,105 @@ class BookingService:
             apartment_id,
             check_in,
             check_out
-        )
\ No newline at end of file
+        )
+
+    async def get_landlord_applications(
+        self,
+        owner_id: str,
+        status: Optional[BookingStatus] = None,
+        cursor: Optional[str] = None,
+        limit: int = 20
+    ) -> LandlordApplicationsPage:
+        if cursor and not ObjectId.is_valid(cursor):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        items = await self.booking_repository.get_landlord_applications(owner_id, status, cursor, limit)
+        next_cursor = items[-1].bookingId if len(items) == limit else None
+        return LandlordApplicationsPage(items=items, next_cursor=next_cursor)
+
+    async def decide_bookings(self, decisions: List[BookingDecision], user: User) -> BookingDecisionsResult:
+        """Accepts or rejects pending bookings of the user's apartments in one bulk write.
+
+        Every other pending booking overlapping a booking accepted here is
+        rejected in the same write.  A booking overlapping an already accepted
+        one is not accepted (outcome ``conflict``).
+        """
+        outcomes = {}
+        requested = {}
+        for decision in decisions:
+            if decision.bookingId in requested or decision.bookingId in outcomes:
+                continue
+            if not ObjectId.is_valid(decision.bookingId):
+                outcomes[decision.bookingId] = BookingDecisionOutcome(bookingId=decision.bookingId, outcome="not_found")
+            else:
+                requested[decision.bookingId] = decision.status
+
+        bookings = await self.booking_repository.get_many(list(requested))
+        owned = None
+        if not user.admin:
+            owned = await self.booking_repository.get_owned_apartment_ids(
+                {booking.apartmentId for booking in bookings.values()}, user.userId
+            )
+
+        to_accept = []
+        updates = {}
+        for booking_id, status in requested.items():
+            booking = bookings.get(booking_id)
+            if booking is None:
+                outcomes[booking_id] = BookingDecisionOutcome(bookingId=booking_id, outcome="not_found")
+            elif owned is not None and booking.apartmentId not in owned:
+                outcomes[booking_id] = BookingDecisionOutcome(bookingId=booking_id, outcome="forbidden")
+            elif booking.status != BookingStatus.PENDING:
+                outcomes[booking_id] = BookingDecisionOutcome(
+                    bookingId=booking_id, outcome="not_pending", detail=f"Booking is {booking.status.value}"
+                )
+            elif status == BookingStatus.ACCEPTED:
+                to_accept.append(booking)
+            else:
+                updates[booking_id] = BookingStatus.REJECTED
+                outcomes[booking_id] = BookingDecisionOutcome(bookingId=booking_id, outcome="rejected")
+
+        # One query for everything that can conflict with the bookings to accept
+        overlapping = await self.booking_repository.find_overlapping(
+            to_accept, [BookingStatus.PENDING, BookingStatus.ACCEPTED]
+        )
+        accepted = [booking for booking in overlapping if booking.status == BookingStatus.ACCEPTED]
+        for booking in to_accept:
+            blocking = next((other for other in accepted if _overlaps(booking, other)), None)
+            if blocking is not None:
+                # Rejected below if it overlaps a booking accepted in this request
+                outcomes[booking.bookingId] = BookingDecisionOutcome(
+                    bookingId=booking.bookingId, outcome="conflict",
+                    detail=f"Overlaps accepted booking {blocking.bookingId}"
+                )
+                continue
+            accepted.append(booking)
+            updates[booking.bookingId] = BookingStatus.ACCEPTED
+            outcomes[booking.bookingId] = BookingDecisionOutcome(bookingId=booking.bookingId, outcome="accepted")
+
+        newly_accepted = [booking for booking in to_accept if updates.get(booking.bookingId) == BookingStatus.ACCEPTED]
+        auto_rejected = []
+        for booking in overlapping + to_accept:
+            if (booking.status == BookingStatus.PENDING and booking.bookingId not in updates
+                    and any(_overlaps(booking, other) for other in newly_accepted)):
+                updates[booking.bookingId] = BookingStatus.REJECTED
+                auto_rejected.append(booking.bookingId)
+
+        modified = await self.booking_repository.apply_decisions(updates)
+        results = []
+        seen = set()
+        for decision in decisions:
+            if decision.bookingId in seen:
+                results.append(BookingDecisionOutcome(bookingId=decision.bookingId, outcome="duplicate"))
+            else:
+                seen.add(decision.bookingId)
+                results.append(outcomes[decision.bookingId])
+        return BookingDecisionsResult(results=results, auto_rejected=auto_rejected, modified=modified)
+
+
+def _overlaps(booking: Booking, other: Booking) -> bool:
+    return (
+        booking.bookingId != other.bookingId
+        and booking.apartmentId == other.apartmentId
+        and booking.check_in_date <= other.check_out_date
+        and booking.check_out_date >= other.check_in_date
+    )
@@ -0,0 +1,271 @@
+import asyncio
+import json
+import os
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException, WebSocket
+
+from models.chat import Chat, ChatCreate, ChatHistoryPage, ChatSummary, Message
+from models.user import User
+from repositories.chat_repository import ChatRepository
+from repositories.user_repository import UserRepository
+from utils.logging import logger
+
+FLUSH_INTERVAL_SECONDS = float(os.getenv("CHAT_FLUSH_INTERVAL", "0.1"))
+FLUSH_BATCH_SIZE = int(os.getenv("CHAT_FLUSH_BATCH_SIZE", "500"))
+MAX_PENDING = int(os.getenv("CHAT_MAX_PENDING", "50000"))
+MAX_MESSAGE_LENGTH = 4000
+
+
+class ChatService:
+    """Chat between tenants and landlords over WebSockets.
+
+    A message is delivered to the sockets of the chat's participants that
+    are connected to this worker and appended to an in-memory buffer, which
+    a background task writes to ``Messages`` with one ``insert_many`` per
+    ``batch_size`` messages or every ``flush_interval`` seconds, together
+    with the chats' unread counters.  History merges the messages that are
+    not written yet.  A crash loses at most the buffered messages.
+    """
+
+    def __init__(
+        self,
+        chat_repository: ChatRepository,
+        user_repository: UserRepository,
+        flush_interval: float = FLUSH_INTERVAL_SECONDS,
+        batch_size: int = FLUSH_BATCH_SIZE,
+        max_pending: int = MAX_PENDING,
+        participants_cache_size: int = 10_000
+    ):
+        self.chat_repository = chat_repository
+        self.user_repository = user_repository
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.participants_cache_size = participants_cache_size
+        self._connections: Dict[str, Set[WebSocket]] = defaultdict(set)
+        self._participants: "OrderedDict[str, Tuple[str, ...]]" = OrderedDict()
+        # Buffered messages with the participants whose unread counts the flush increments
+        self._pending: List[Tuple[Message, Tuple[str, ...]]] = []
+        self._flushing: List[Tuple[Message, Tuple[str, ...]]] = []
+        self._flush_requested = asyncio.Event()
+        # Held by a flush, so that a read resets the unread count after the increments it covers
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.delivered = 0
+        self.persisted = 0
+        self.flushes = 0
+        self.flush_errors = 0
+        self.rejected = 0
+        self.last_flush_size = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._flusher())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Write what is left, a failed batch is put back so stop tries it once more
+        for _ in range(2):
+            while self._pending and await self.flush():
+                pass
+
+    async def _flusher(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            while self._pending and await self.flush():
+                if len(self._pending) < self.batch_size:
+                    break
+
+    async def flush(self) -> bool:
+        """Writes up to ``batch_size`` buffered messages, returns False when the write failed."""
+        async with self._flush_lock:
+            batch = self._pending[:self.batch_size]
+            if not batch:
+                return True
+            del self._pending[:len(batch)]
+            self._flushing = batch
+            try:
+                await self.chat_repository.save_messages([m for m, _ in batch], [r for _, r in batch])
+            except Exception as e:
+                self.flush_errors += 1
+                logger.error(f"Writing {len(batch)} chat messages failed: {str(e)}")
+                self._pending[:0] = batch
+                return False
+            finally:
+                self._flushing = []
+        self.flushes += 1
+        self.persisted += len(batch)
+        self.last_flush_size = len(batch)
+        return True
+
+    def connect(self, user_id: str, websocket: WebSocket):
+        self._connections[user_id].add(websocket)
+
+    def disconnect(self, user_id: str, websocket: WebSocket):
+        sockets = self._connections.get(user_id)
+        if sockets is not None:
+            sockets.discard(websocket)
+            if not sockets:
+                del self._connections[user_id]
+
+    async def _get_participants(self, chat_id: str, user: User) -> Tuple[str, ...]:
+        participants = self._participants.get(chat_id)
+        if participants is None:
+            if not ObjectId.is_valid(chat_id):
+                raise HTTPException(status_code=404, detail="Chat not found")
+            chat = await self.chat_repository.get_by_id(chat_id)
+            if chat is None:
+                raise HTTPException(status_code=404, detail="Chat not found")
+            participants = self._remember(chat)
+        else:
+            self._participants.move_to_end(chat_id)
+        if user.userId not in participants:
+            raise HTTPException(status_code=403, detail="You are not a participant of this chat")
+        return participants
+
+    def _remember(self, chat: Chat) -> Tuple[str, ...]:
+        # Participants never change, so they are cached without expiry
+        participants = tuple(chat.participants)
+        self._participants[chat.chatId] = participants
+        if len(self._participants) > self.participants_cache_size:
+            self._participants.popitem(last=False)
+        return participants
+
+    async def send_message(self, user: User, chat_id: str, text: str) -> Message:
+        participants = await self._get_participants(chat_id, user)
+        text = (text or "").strip()
+        if not text or len(text) > MAX_MESSAGE_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Message must be 1 to {MAX_MESSAGE_LENGTH} characters")
+        if len(self._pending) >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Chat is overloaded, try again shortly")
+
+        message = Message(
+            messageId=str(ObjectId()),
+            chatId=chat_id,
+            senderId=user.userId,
+            text=text,
+            created_at=datetime.utcnow()
+        )
+        # Kept with the message, the cache may evict the chat before the flush
+        self._pending.append((message, participants))
+        if len(self._pending) >= self.batch_size:
+            self._flush_requested.set()
+        self.sent += 1
+        await self._fan_out(participants, {"type": "message", "message": message.model_dump(mode="json")})
+        return message
+
+    async def _fan_out(self, user_ids, event: dict):
+        payload = json.dumps(event)
+        sockets = [socket for user_id in user_ids for socket in self._connections.get(user_id, ())]
+        results = await asyncio.gather(*(socket.send_text(payload) for socket in sockets), return_exceptions=True)
+        self.delivered += sum(1 for result in results if not isinstance(result, Exception))
+
+    async def handle_frame(self, user: User, websocket: WebSocket, frame: str):
+        """Handles one client frame: ``message`` (chat_id, text), ``read`` (chat_id) or ``ping``."""
+        try:
+            data = json.loads(frame)
+            kind = data.get("type")
+            if kind == "message":
+                message = await self.send_message(user, str(data.get("chat_id")), data.get("text"))
+                if data.get("client_id") is not None:
+                    await websocket.send_json({"type": "ack", "client_id": data["client_id"],
+                                               "messageId": message.messageId})
+            elif kind == "read":
+                await self.mark_read(user, str(data.get("chat_id")))
+            elif kind == "ping":
+                await websocket.send_json({"type": "pong"})
+            else:
+                await websocket.send_json({"type": "error", "detail": f"Unknown frame type {kind!r}"})
+        except HTTPException as e:
+            await websocket.send_json({"type": "error", "status": e.status_code, "detail": e.detail})
+        except (ValueError, AttributeError):
+            await websocket.send_json({"type": "error", "detail": "Frames must be JSON objects"})
+
+    async def create_chat(self, chat_data: ChatCreate, user: User) -> Chat:
+        if chat_data.landlord_id == user.userId:
+            raise HTTPException(status_code=400, detail="You cannot start a chat with yourself")
+        if not ObjectId.is_valid(chat_data.landlord_id) or \
+                await self.user_repository.get_by_id(chat_data.landlord_id) is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        chat = await self.chat_repository.get_or_create([user.userId, chat_data.landlord_id], chat_data.apartment_id)
+        if chat is None:
+            raise HTTPException(status_code=500, detail="Failed to create chat")
+        self._remember(chat)
+        await self.send_message(user, chat.chatId, chat_data.message)
+        return chat
+
+    async def get_chats(self, user: User, skip: int = 0, limit: int = 50) -> List[ChatSummary]:
+        chats = await self.chat_repository.get_by_user(user.userId, skip, limit)
+        return [
+            ChatSummary(
+                chatId=chat.chatId,
+                participants=chat.participants,
+                apartmentId=chat.apartmentId,
+                last_message_at=chat.last_message_at,
+                last_message=chat.last_message,
+                unread=chat.unread.get(user.userId, 0)
+            )
+            for chat in chats
+        ]
+
+    async def get_history(
+        self,
+        user: User,
+        chat_id: str,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> ChatHistoryPage:
+        if cursor and not ObjectId.is_valid(cursor):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        await self._get_participants(chat_id, user)
+        stored = await self.chat_repository.get_messages(chat_id, cursor, limit)
+        # Ids are ObjectIds of the same length, so their hex strings sort like them
+        buffered = [
+            m for m, _ in self._flushing + self._pending
+            if m.chatId == chat_id and (cursor is None or m.messageId < cursor)
+        ]
+        messages = {m.messageId: m for m in stored + buffered}
+        page = sorted(messages.values(), key=lambda m: m.messageId, reverse=True)[:limit]
+        next_cursor = page[-1].messageId if len(page) == limit else None
+        return ChatHistoryPage(chat_id=chat_id, messages=page, next_cursor=next_cursor)
+
+    async def mark_read(self, user: User, chat_id: str) -> bool:
+        await self._get_participants(chat_id, user)
+        # Buffered messages were already delivered to the reader, so their flush must not
+        # count them as unread; a flush in progress is waited for, then the count is reset
+        async with self._flush_lock:
+            self._pending = [
+                (m, tuple(u for u in recipients if u != user.userId)) if m.chatId == chat_id else (m, recipients)
+                for m, recipients in self._pending
+            ]
+            return await self.chat_repository.mark_read(chat_id, user.userId)
+
+    def stats(self) -> dict:
+        return {
+            "connected_users": len(self._connections),
+            "connections": sum(len(sockets) for sockets in self._connections.values()),
+            "pending": len(self._pending),
+            "sent": self.sent,
+            "delivered": self.delivered,
+            "persisted": self.persisted,
+            "flushes": self.flushes,
+            "last_flush_size": self.last_flush_size,
+            "flush_errors": self.flush_errors,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,120 @@
+import asyncio
+import multiprocessing
+import os
+import shutil
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from fastapi import HTTPException, Request
+
+from models.apartment import ApartmentPicture
+from utils.images import InvalidImage, make_thumbnails
+from utils.logging import logger
+from utils.uploads import UploadedFile, discard, receive_files
+
+MEDIA_DIR = os.getenv("MEDIA_DIR", "media")
+PICTURES_URL = os.getenv("PICTURES_URL", "/media/pictures")
+PICTURE_WIDTHS = sorted(int(width) for width in os.getenv("PICTURE_WIDTHS", "320,640,1280").split(","))
+PICTURE_MAX_BYTES = int(os.getenv("PICTURE_MAX_BYTES", str(15 * 1024 * 1024)))
+PICTURE_WORKERS = int(os.getenv("PICTURE_WORKERS", "2"))
+MAX_FILES_PER_UPLOAD = 10
+
+
+class PictureService:
+    """Content-addressed picture storage under ``MEDIA_DIR/pictures/<sha256>/``.
+
+    Uploads are streamed to ``MEDIA_DIR/incoming`` and hashed on the way;
+    a picture whose hash is already stored is not processed again.  New
+    pictures are decoded and resized to ``PICTURE_WIDTHS`` JPEGs in a
+    process pool, so neither the CPU work nor the GIL touches the event
+    loop.  The stored files never change, so they are served as immutable.
+    """
+
+    def __init__(
+        self,
+        media_dir: str = MEDIA_DIR,
+        url: str = PICTURES_URL,
+        widths: List[int] = PICTURE_WIDTHS,
+        max_bytes: int = PICTURE_MAX_BYTES,
+        workers: int = PICTURE_WORKERS
+    ):
+        self.directory = os.path.join(media_dir, "pictures")
+        self.incoming = os.path.join(media_dir, "incoming")
+        self.url = url.rstrip("/")
+        self.widths = widths
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.stored = 0
+        self.deduplicated = 0
+        self.rejected = 0
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        os.makedirs(self.incoming, exist_ok=True)
+        if self._pool is None:
+            # spawn: forking a process with the event loop's and the driver's threads is unsafe
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def stop(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def picture(self, digest: str) -> ApartmentPicture:
+        base = f"{self.url}/{digest}"
+        return ApartmentPicture(
+            sha256=digest,
+            url=f"{base}/{self.widths[-1]}.jpg",
+            thumbnails={str(width): f"{base}/{width}.jpg" for width in self.widths}
+        )
+
+    async def receive(self, request: Request) -> List[UploadedFile]:
+        return await receive_files(request, self.incoming, self.max_bytes, MAX_FILES_PER_UPLOAD)
+
+    async def store(self, files: List[UploadedFile]) -> List[ApartmentPicture]:
+        """Processes and stores uploaded files, removing them from ``incoming`` in any case."""
+        try:
+            return [await self._store(uploaded) for uploaded in files]
+        finally:
+            for uploaded in files:
+                discard(uploaded)
+
+    async def _store(self, uploaded: UploadedFile) -> ApartmentPicture:
+        final = os.path.join(self.directory, uploaded.sha256)
+        if os.path.isdir(final):
+            self.deduplicated += 1
+            return self.picture(uploaded.sha256)
+
+        self.start()
+        staging = os.path.join(self.incoming, f"{uploaded.sha256}-{uuid.uuid4().hex}")
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                self._pool, make_thumbnails, uploaded.path, staging, self.widths
+            )
+        except InvalidImage:
+            self.rejected += 1
+            shutil.rmtree(staging, ignore_errors=True)
+            raise HTTPException(status_code=400, detail=f"{uploaded.filename} is not a JPEG, PNG or WebP picture")
+        except Exception as e:
+            shutil.rmtree(staging, ignore_errors=True)
+            logger.error(f"Picture processing failed: {str(e)}")
+            raise HTTPException(status_code=500, detail="Failed to process picture")
+        try:
+            # Atomic, readers never see a half-written picture
+            os.rename(staging, final)
+            self.stored += 1
+        except OSError:
+            # The same picture was stored concurrently
+            shutil.rmtree(staging, ignore_errors=True)
+            self.deduplicated += 1
+        return self.picture(uploaded.sha256)
+
+    def stats(self) -> dict:
+        return {
+            "stored": self.stored,
+            "deduplicated": self.deduplicated,
+            "rejected": self.rejected,
+            "workers": self.workers,
+        }
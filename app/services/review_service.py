@@ -1,19 +1,40 @@
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from datetime import datetime
 from models.review import Review, ReviewType
 from repositories.review_repository import ReviewRepository
 from services.base import BaseService
 from fastapi import HTTPException
+from utils.singleflight import SingleFlight, coalesce
+from services.apartment_ranking import ApartmentRanking
+from utils.merge_patch import merge_patch
+
+# Set by the server or fixed at creation, ignored in patches
+READ_ONLY_FIELDS = {"reviewId", "reviewerId", "targetId", "review_type", "created_at", "updated_at"}
 
 class ReviewService(BaseService[Review]):
-    def __init__(self, review_repository: ReviewRepository):
+    def __init__(
+        self,
+        review_repository: ReviewRepository,
+        singleflight: Optional[SingleFlight] = None,
+        ranking: Optional[ApartmentRanking] = None
+    ):
         self.review_repository = review_repository
+        self.singleflight = singleflight or SingleFlight()
+        self.ranking = ranking
+
+    async def _refresh_ranking(self, *reviews: Optional[Review]):
+        # Apartment reviews feed the apartment's ranking score
+        if self.ranking is None:
+            return
+        for target_id in {r.targetId for r in reviews if r is not None and r.review_type == ReviewType.APARTMENT}:
+            await self.ranking.refresh_reviews(target_id)
 
     async def create(self, review: Review) -> Review:
         review.created_at = datetime.utcnow()
         review.updated_at = datetime.utcnow()
         return await self.review_repository.create(review)
 
+    @coalesce
     async def get_by_id(self, review_id: str) -> Optional[Review]:
         return await self.review_repository.get_by_id(review_id)
 
@@ -27,6 +48,7 @@ class ReviewService(BaseService[Review]):
     async def delete(self, review_id: str) -> bool:
         return await self.review_repository.delete(review_id)
 
+    @coalesce
     async def get_by_target(
         self,
         target_id: str,
@@ -38,6 +60,7 @@ class ReviewService(BaseService[Review]):
             target_id, review_type, skip, limit
         )
 
+    @coalesce
     async def get_by_reviewer(
         self,
         reviewer_id: str,
@@ -48,6 +71,7 @@ class ReviewService(BaseService[Review]):
             reviewer_id, skip, limit
         )
 
+    @coalesce
     async def get_average_rating(
         self,
         target_id: str,
@@ -66,26 +90,36 @@ class ReviewService(BaseService[Review]):
         return None
 
     async def create_review(self, review: Review) -> Review:
-        return await self.review_repository.create(review)
+        created = await self.review_repository.create(review)
+        await self._refresh_ranking(created)
+        return created
 
+    @coalesce
     async def get_review(self, review_id: str) -> Review:
         review = await self.review_repository.get_by_id(review_id)
         if not review:
             raise HTTPException(status_code=404, detail="Review not found")
         return review
 
-    async def update_review(self, review_id: str, review_data: Review) -> Review:
-        existing_review = await self.review_repository.get_by_id(review_id)
-        if not existing_review:
+    async def update_review(self, review_id: str, patch: Dict[str, Any]) -> Review:
+        changes = merge_patch(Review, patch, READ_ONLY_FIELDS)
+        updated = await self.review_repository.patch(review_id, changes)
+        if not updated:
             raise HTTPException(status_code=404, detail="Review not found")
-        return await self.review_repository.update(review_id, review_data)
+        # The target is read-only, so only a new rating moves its score
+        if "rating" in changes.fields:
+            await self._refresh_ranking(updated)
+        return updated
 
     async def delete_review(self, review_id: str) -> bool:
+        existing_review = await self.review_repository.get_by_id(review_id) if self.ranking is not None else None
         success = await self.review_repository.delete(review_id)
         if not success:
             raise HTTPException(status_code=404, detail="Review not found")
+        await self._refresh_ranking(existing_review)
         return True
 
+    @coalesce
     async def get_target_reviews(
         self,
         target_id: str,
@@ -100,6 +134,7 @@ class ReviewService(BaseService[Review]):
             limit=limit
         )
 
+    @coalesce
     async def get_reviewer_reviews(
         self,
         reviewer_id: str,
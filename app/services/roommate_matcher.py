@@ -0,0 +1,156 @@
+import re
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+TOKEN = re.compile(r"[\w-]+")
+MISSING = -1
+
+
+def token_bits(values) -> int:
+    """Hashes tokens into a 64-bit set, so overlap is a popcount of ANDed masks."""
+    bits = 0
+    for value in values or []:
+        for token in TOKEN.findall(str(value).lower()):
+            bits |= 1 << (zlib.crc32(token.encode()) & 63)
+    return bits
+
+
+class RoommateMatcher:
+    """In-memory feature matrix of roommate profiles, scored with vectorized NumPy operations.
+
+    One row per user, one column array per feature: university, city and
+    gender are interned to integer codes, languages and roommate preferences
+    are 64-bit token sets and the budget is a [min, max] range.  The score
+    of a candidate is the weighted sum of: same university, same city, same
+    gender, Jaccard overlap of languages and of preferences, and overlap of
+    the budget ranges, divided by the sum of the weights (0..1).  Landlords
+    are kept out of the candidates.
+
+    ``upsert``/``remove`` change a single row in place, removed rows are
+    reused, and the arrays double in size when full.
+    """
+
+    WEIGHTS = {
+        "university": 3.0,
+        "city": 1.0,
+        "gender": 2.0,
+        "languages": 2.0,
+        "preferences": 1.5,
+        "budget": 2.0,
+    }
+
+    def __init__(self, capacity: int = 1024):
+        total = sum(self.WEIGHTS.values())
+        self._normalized_weights = {name: np.float32(weight / total) for name, weight in self.WEIGHTS.items()}
+        self._rows: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._free: List[int] = []
+        self._codes: Dict[str, Dict[str, int]] = {"university": {}, "city": {}, "gender": {}}
+        self.size = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int):
+        def grow(name, dtype, fill):
+            array = np.full(capacity, fill, dtype=dtype)
+            old = getattr(self, name, None)
+            if old is not None:
+                array[:len(old)] = old
+            setattr(self, name, array)
+
+        grow("university", np.int32, MISSING)
+        grow("city", np.int32, MISSING)
+        grow("gender", np.int32, MISSING)
+        grow("languages", np.uint64, 0)
+        grow("preferences", np.uint64, 0)
+        # A missing budget is the empty range [inf, -inf], which overlaps nothing
+        grow("budget_min", np.float32, np.inf)
+        grow("budget_max", np.float32, -np.inf)
+        # Added to the scores: 0 for candidates, -inf for landlords and free rows
+        grow("penalty", np.float32, -np.inf)
+        self.capacity = capacity
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _code(self, feature: str, value) -> int:
+        if not value:
+            return MISSING
+        codes = self._codes[feature]
+        return codes.setdefault(str(value).strip().lower(), len(codes))
+
+    def upsert(self, user_id: str, profile: dict):
+        """Adds or replaces the row of ``user_id`` from a User document or ``User.model_dump()``."""
+        row = self._rows.get(user_id)
+        if row is None:
+            if self._free:
+                row = self._free.pop()
+            else:
+                if self.size == self.capacity:
+                    self._allocate(self.capacity * 2)
+                row = self.size
+                self.size += 1
+                self._ids.append(None)
+            self._rows[user_id] = row
+            self._ids[row] = user_id
+
+        budget = profile.get("budget_range") or {}
+        self.university[row] = self._code("university", profile.get("university"))
+        self.city[row] = self._code("city", profile.get("city"))
+        self.gender[row] = self._code("gender", profile.get("gender"))
+        self.languages[row] = token_bits(profile.get("language_preferences"))
+        self.preferences[row] = token_bits([profile.get("roommate_preferences")])
+        low, high = budget.get("min"), budget.get("max")
+        self.budget_min[row] = np.inf if low is None else low
+        self.budget_max[row] = -np.inf if high is None else high
+        self.penalty[row] = -np.inf if profile.get("is_landlord") else 0.0
+
+    def remove(self, user_id: str):
+        row = self._rows.pop(user_id, None)
+        if row is None:
+            return
+        self._ids[row] = None
+        self.penalty[row] = -np.inf
+        self._free.append(row)
+
+    def top_k(self, user_id: str, k: int = 20) -> List[Tuple[str, float]]:
+        """Best ``k`` candidates for ``user_id`` as ``(userId, score)``, best first."""
+        row = self._rows.get(user_id)
+        if row is None or k <= 0:
+            return []
+        n = self.size
+        weights = self._normalized_weights
+        scores = self.penalty[:n].copy()
+
+        for feature in ("university", "city", "gender"):
+            column = getattr(self, feature)
+            if column[row] != MISSING:
+                scores += weights[feature] * (column[:n] == column[row])
+
+        for feature in ("languages", "preferences"):
+            column = getattr(self, feature)
+            value = column[row]
+            if value:
+                # The union includes this row's tokens, so it is never 0
+                shared = np.bitwise_count(column[:n] & value).astype(np.float32)
+                shared /= np.bitwise_count(column[:n] | value)
+                shared *= weights[feature]
+                scores += shared
+
+        low, high = self.budget_min[row], self.budget_max[row]
+        if low <= high:
+            overlap = np.minimum(self.budget_max[:n], high)
+            overlap -= np.maximum(self.budget_min[:n], low)
+            span = np.maximum(self.budget_max[:n], high)
+            span -= np.minimum(self.budget_min[:n], low)
+            np.maximum(overlap, 0, out=overlap)
+            overlap /= np.maximum(span, 1)
+            overlap *= weights["budget"]
+            scores += overlap
+
+        scores[row] = -np.inf
+        k = min(k, n)
+        best = np.argpartition(-scores, k - 1)[:k] if k < n else np.arange(n)
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(self._ids[i], round(float(scores[i]), 4)) for i in best if np.isfinite(scores[i])]
@@ -0,0 +1,120 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from fastapi import HTTPException
+
+from models.user import RoommateMatch, User
+from repositories.user_repository import UserRepository
+from services.roommate_matcher import RoommateMatcher
+from utils.logging import logger
+
+SYNC_INTERVAL_SECONDS = float(os.getenv("ROOMMATE_SYNC_INTERVAL", "60"))
+
+
+class RoommateService:
+    """Keeps this worker's RoommateMatcher in sync with the User collection.
+
+    The matrix is loaded once in the background at startup.  Profile changes
+    made through UserService in this worker are applied immediately, changes
+    made by other workers are picked up every ``sync_interval`` seconds from
+    the users updated since the last sync.
+    """
+
+    def __init__(
+        self,
+        user_repository: UserRepository,
+        matcher: Optional[RoommateMatcher] = None,
+        sync_interval: float = SYNC_INTERVAL_SECONDS
+    ):
+        self.user_repository = user_repository
+        self.matcher = matcher or RoommateMatcher()
+        self.sync_interval = sync_interval
+        self.loaded = asyncio.Event()
+        self.last_sync: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"Roommate matrix sync failed: {str(e)}")
+            await asyncio.sleep(self.sync_interval)
+
+    async def sync(self) -> int:
+        started = datetime.utcnow()
+        # Overlap the windows a little, updatedAt is set by the writer's clock
+        since = self.last_sync - timedelta(seconds=5) if self.last_sync else None
+        count = 0
+        async for document in self.user_repository.iter_roommate_profiles(since):
+            self.matcher.upsert(str(document["_id"]), document)
+            count += 1
+        self.last_sync = started
+        if not self.loaded.is_set():
+            logger.info(f"Roommate matrix loaded with {len(self.matcher)} users")
+            self.loaded.set()
+        return count
+
+    def index_user(self, user: Optional[User]):
+        if user is not None and user.userId:
+            self.matcher.upsert(user.userId, user.model_dump())
+
+    def remove_user(self, user_id: str):
+        self.matcher.remove(user_id)
+
+    async def get_matches(self, user: User, limit: int = 20) -> List[RoommateMatch]:
+        if not self.loaded.is_set():
+            try:
+                await asyncio.wait_for(self.loaded.wait(), timeout=10)
+            except asyncio.TimeoutError:
+                raise HTTPException(status_code=503, detail="Roommate matching is warming up, try again shortly")
+        # The caller's latest profile counts even if the sync has not seen it yet
+        self.index_user(user)
+
+        ranked = self.matcher.top_k(user.userId, limit)
+        users = await self.user_repository.get_many([user_id for user_id, _ in ranked])
+        matches = []
+        for user_id, score in ranked:
+            candidate = users.get(user_id)
+            if candidate is None:
+                # Deleted in another worker
+                self.matcher.remove(user_id)
+                continue
+            matches.append(RoommateMatch(
+                userId=user_id,
+                name=candidate.name,
+                surname=candidate.surname,
+                gender=candidate.gender,
+                university=candidate.university,
+                city=candidate.city,
+                bio=candidate.bio,
+                avatar_url=candidate.avatar_url,
+                language_preferences=candidate.language_preferences,
+                roommate_preferences=candidate.roommate_preferences,
+                budget_range=candidate.budget_range,
+                score=score
+            ))
+        return matches
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self.matcher),
+            "capacity": self.matcher.capacity,
+            "loaded": self.loaded.is_set(),
+            "last_sync": self.last_sync.isoformat() if self.last_sync else None,
+        }
@@ -0,0 +1,104 @@
+from collections import defaultdict
+from typing import Dict, List, Set
+
+from models.apartment import Apartment
+from models.notification import SavedSearchFilters
+
+PRICE_BUCKET = 10000
+# A wider (or open-ended) price range is indexed as "any price" and checked exactly
+MAX_PRICE_BUCKETS = 50
+
+
+def matches(filters: SavedSearchFilters, apartment: Apartment) -> bool:
+    """Same predicate as ApartmentRepository.search for one apartment."""
+    return (
+        (filters.min_price is None or apartment.price_per_month >= filters.min_price)
+        and (filters.max_price is None or apartment.price_per_month <= filters.max_price)
+        and (not filters.location or apartment.district_name == filters.location)
+        and (not filters.university or apartment.university_nearby == filters.university)
+        and (not filters.room_type or apartment.rental_type == filters.room_type)
+    )
+
+
+class SavedSearchIndex:
+    """Inverted index from apartment attributes to the saved searches they can match.
+
+    Every search is posted under its district, university, rental type and
+    the price buckets its range covers, or under "any" for a dimension it
+    does not filter on.  ``match`` intersects the postings of the apartment's
+    values, smallest first, and checks the few remaining searches exactly,
+    so its cost follows the number of plausible searches, not of all of them.
+    """
+
+    DIMENSIONS = ("location", "university", "room_type", "price")
+
+    def __init__(self, price_bucket: int = PRICE_BUCKET):
+        self.price_bucket = price_bucket
+        self._filters: Dict[str, SavedSearchFilters] = {}
+        self._postings: Dict[str, Dict[object, Set[str]]] = {
+            dimension: defaultdict(set) for dimension in self.DIMENSIONS
+        }
+        self._any: Dict[str, Set[str]] = {dimension: set() for dimension in self.DIMENSIONS}
+
+    def __len__(self) -> int:
+        return len(self._filters)
+
+    def _keys(self, filters: SavedSearchFilters) -> Dict[str, list]:
+        """Posting keys per dimension, None for "any value"."""
+        keys = {
+            "location": [filters.location] if filters.location else None,
+            "university": [filters.university] if filters.university else None,
+            "room_type": [filters.room_type] if filters.room_type else None,
+            "price": None,
+        }
+        if filters.max_price is not None:
+            first = max(filters.min_price or 0, 0) // self.price_bucket
+            last = filters.max_price // self.price_bucket
+            if last - first < MAX_PRICE_BUCKETS:
+                keys["price"] = list(range(first, last + 1))
+        return keys
+
+    def add(self, search_id: str, filters: SavedSearchFilters):
+        self.remove(search_id)
+        self._filters[search_id] = filters
+        for dimension, keys in self._keys(filters).items():
+            if keys is None:
+                self._any[dimension].add(search_id)
+            else:
+                for key in keys:
+                    self._postings[dimension][key].add(search_id)
+
+    def remove(self, search_id: str):
+        filters = self._filters.pop(search_id, None)
+        if filters is None:
+            return
+        for dimension, keys in self._keys(filters).items():
+            if keys is None:
+                self._any[dimension].discard(search_id)
+                continue
+            postings = self._postings[dimension]
+            for key in keys:
+                postings[key].discard(search_id)
+                if not postings[key]:
+                    del postings[key]
+
+    def match(self, apartment: Apartment) -> List[str]:
+        values = {
+            "location": apartment.district_name,
+            "university": apartment.university_nearby,
+            "room_type": apartment.rental_type,
+            "price": apartment.price_per_month // self.price_bucket,
+        }
+        # (exact postings, "any" postings) per dimension, the most selective first
+        candidates = sorted(
+            ((self._postings[dimension].get(value, set()), self._any[dimension])
+             for dimension, value in values.items()),
+            key=lambda sets: len(sets[0]) + len(sets[1])
+        )
+        exact, any_value = candidates[0]
+        result = exact | any_value
+        for exact, any_value in candidates[1:]:
+            if not result:
+                break
+            result = (result & exact) | (result & any_value)
+        return [search_id for search_id in result if matches(self._filters[search_id], apartment)]
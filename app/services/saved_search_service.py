@@ -0,0 +1,180 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from fastapi import HTTPException
+
+from models.apartment import Apartment
+from models.notification import Notification, SavedSearch, SavedSearchFilters
+from models.user import User
+from repositories.notification_repository import NotificationRepository
+from services.saved_search_index import SavedSearchIndex
+from utils.logging import logger
+
+SYNC_INTERVAL_SECONDS = float(os.getenv("SAVED_SEARCH_SYNC_INTERVAL", "60"))
+QUEUE_SIZE = int(os.getenv("SAVED_SEARCH_QUEUE_SIZE", "10000"))
+
+
+class SavedSearchService:
+    """Saved searches and the "new apartment" notifications they produce.
+
+    Created and updated apartments are put on an in-process queue and
+    matched by a background task, so listing writes never wait for it.  The
+    index is loaded at startup; searches saved in this worker are indexed
+    immediately and those saved in other workers every ``sync_interval``
+    seconds.  Matched searches are re-read before notifying, which drops
+    searches deleted elsewhere.
+    """
+
+    def __init__(
+        self,
+        notification_repository: NotificationRepository,
+        index: Optional[SavedSearchIndex] = None,
+        sync_interval: float = SYNC_INTERVAL_SECONDS,
+        queue_size: int = QUEUE_SIZE
+    ):
+        self.notification_repository = notification_repository
+        self.index = index or SavedSearchIndex()
+        self.sync_interval = sync_interval
+        self.queue: "asyncio.Queue[Apartment]" = asyncio.Queue(maxsize=queue_size)
+        self.loaded = asyncio.Event()
+        self.last_sync: Optional[datetime] = None
+        self._tasks: List[asyncio.Task] = []
+        self.enqueued = 0
+        self.dropped = 0
+        self.matched = 0
+        self.notified = 0
+        self.last_match_us = 0.0
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._sync_loop()), asyncio.create_task(self._worker())]
+
+    async def stop(self, drain_timeout: float = 5.0):
+        if not self._tasks:
+            return
+        if self.loaded.is_set():
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout=drain_timeout)
+            except asyncio.TimeoutError:
+                logger.error(f"Saved search queue not drained, {self.queue.qsize()} apartments left")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _sync_loop(self):
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"Saved search index sync failed: {str(e)}")
+            await asyncio.sleep(self.sync_interval)
+
+    async def sync(self) -> int:
+        started = datetime.utcnow()
+        # Overlap the windows a little, createdAt is set by the writer's clock
+        since = self.last_sync - timedelta(seconds=5) if self.last_sync else None
+        count = 0
+        async for document in self.notification_repository.iter_saved_searches(since):
+            self.index.add(str(document["_id"]), SavedSearchFilters(**document["filters"]))
+            count += 1
+        self.last_sync = started
+        if not self.loaded.is_set():
+            logger.info(f"Saved search index loaded with {len(self.index)} searches")
+            self.loaded.set()
+        return count
+
+    def notify_apartment(self, apartment: Optional[Apartment]):
+        """Queues a created or updated apartment for matching, never blocks."""
+        if apartment is None or not apartment.is_active:
+            return
+        try:
+            self.queue.put_nowait(apartment)
+            self.enqueued += 1
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.error(f"Saved search queue full, no alerts for apartment {apartment.apartmentId}")
+
+    async def _worker(self):
+        await self.loaded.wait()
+        while True:
+            apartment = await self.queue.get()
+            try:
+                await self._dispatch(apartment)
+            except Exception as e:
+                logger.error(f"Saved search alerts for apartment {apartment.apartmentId} failed: {str(e)}")
+            finally:
+                self.queue.task_done()
+
+    async def _dispatch(self, apartment: Apartment) -> int:
+        started = time.perf_counter()
+        search_ids = self.index.match(apartment)
+        self.last_match_us = round((time.perf_counter() - started) * 1e6, 1)
+        if not search_ids:
+            return 0
+        self.matched += len(search_ids)
+
+        searches = await self.notification_repository.get_saved_searches_many(search_ids)
+        now = datetime.utcnow()
+        notifications = []
+        for search_id in search_ids:
+            search = searches.get(search_id)
+            if search is None:
+                # Deleted in another worker
+                self.index.remove(search_id)
+                continue
+            if search.userId == apartment.ownerId:
+                continue
+            notifications.append(Notification(
+                userId=search.userId,
+                searchId=search_id,
+                apartmentId=apartment.apartmentId,
+                apartment_name=apartment.apartment_name,
+                district_name=apartment.district_name,
+                price_per_month=apartment.price_per_month,
+                created_at=now
+            ))
+        inserted = await self.notification_repository.add_notifications(notifications)
+        self.notified += inserted
+        return inserted
+
+    async def create_search(self, filters: SavedSearchFilters, user: User) -> SavedSearch:
+        if not filters.model_dump(exclude_none=True):
+            raise HTTPException(status_code=400, detail="At least one filter is required")
+        if filters.min_price is not None and filters.max_price is not None and filters.min_price > filters.max_price:
+            raise HTTPException(status_code=400, detail="min_price must not exceed max_price")
+        search = await self.notification_repository.create_saved_search(
+            SavedSearch(userId=user.userId, filters=filters, created_at=datetime.utcnow())
+        )
+        if search is None:
+            raise HTTPException(status_code=500, detail="Failed to save the search")
+        self.index.add(search.searchId, search.filters)
+        return search
+
+    async def get_searches(self, user: User) -> List[SavedSearch]:
+        return await self.notification_repository.get_saved_searches(user.userId)
+
+    async def delete_search(self, search_id: str, user: User) -> bool:
+        if not await self.notification_repository.delete_saved_search(search_id, user.userId):
+            raise HTTPException(status_code=404, detail="Saved search not found")
+        self.index.remove(search_id)
+        return True
+
+    async def get_notifications(self, user: User, skip: int = 0, limit: int = 50) -> List[Notification]:
+        return await self.notification_repository.get_notifications(user.userId, skip, limit)
+
+    def stats(self) -> dict:
+        return {
+            "searches": len(self.index),
+            "loaded": self.loaded.is_set(),
+            "last_sync": self.last_sync.isoformat() if self.last_sync else None,
+            "queue_depth": self.queue.qsize(),
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "matched": self.matched,
+            "notified": self.notified,
+            "last_match_us": self.last_match_us,
+        }
@@ -0,0 +1,134 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from repositories.apartment_repository import ApartmentRepository
+from services.apartment_similarity import ApartmentSimilarityIndex
+from utils.lease import LeasedJob, MongoLease
+from utils.logging import logger
+
+ENABLED = os.getenv("SIMILAR_APARTMENTS_ENABLED", "true").lower() != "false"
+INTERVAL_SECONDS = float(os.getenv("SIMILAR_APARTMENTS_INTERVAL", "10"))
+REBUILD_INTERVAL_SECONDS = float(os.getenv("SIMILAR_APARTMENTS_REBUILD_INTERVAL", "21600"))
+NEIGHBOURS = int(os.getenv("SIMILAR_APARTMENTS_K", "20"))
+WRITE_BATCH_SIZE = 1000
+
+
+class SimilarApartmentsJob(LeasedJob):
+    """Background job keeping the ``SimilarApartments`` rails up to date.
+
+    The holder of the ``similar-apartments`` lease keeps an
+    ApartmentSimilarityIndex of all apartments.  Every ``interval`` seconds
+    it applies the apartments queued by ApartmentService on create, update
+    and delete and rewrites only the rails that can change; every
+    ``rebuild_interval`` seconds, and when it becomes the holder, it
+    rebuilds the index and all rails from the collection.
+    """
+
+    name = "Similar apartments"
+    max_start_delay = 10.0
+
+    def __init__(
+        self,
+        apartment_repository: ApartmentRepository,
+        lease: MongoLease,
+        interval: float = INTERVAL_SECONDS,
+        rebuild_interval: float = REBUILD_INTERVAL_SECONDS,
+        k: int = NEIGHBOURS,
+        enabled: bool = ENABLED
+    ):
+        super().__init__(lease, interval, enabled)
+        self.apartment_repository = apartment_repository
+        self.rebuild_interval = rebuild_interval
+        self.k = k
+        self.index: Optional[ApartmentSimilarityIndex] = None
+        self._built_at = 0.0
+        self.rebuilds = 0
+        self.updates = 0
+        self.rails_written = 0
+        self.last_rebuild_at: Optional[datetime] = None
+        self.last_rebuild_ms = 0.0
+        self.last_update_ms = 0.0
+
+    def lease_lost(self):
+        # Another worker applies the updates now, this index would go stale
+        self.index = None
+
+    async def run_once(self, rebuild: bool = False) -> dict:
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        if rebuild or self.index is None or time.monotonic() - self._built_at > self.rebuild_interval:
+            result = await self.rebuild()
+        else:
+            result = await self.apply_updates()
+        self._record(now, started)
+        return result
+
+    async def rebuild(self) -> dict:
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        documents = [document async for document in self.apartment_repository.iter_similarity_features()]
+        index = ApartmentSimilarityIndex(self.k)
+        # All pairs, seconds for tens of thousands of apartments, so off the event loop
+        await asyncio.to_thread(index.build, documents)
+        self.index = index
+        self._built_at = time.monotonic()
+        written = await self._save(index, range(index.size), now)
+        # Rails of apartments deleted since, and queue entries the rebuild has seen
+        await self.apartment_repository.delete_similar([], updated_before=now)
+        await self.apartment_repository.ack_similarity_updates(queued_before=now)
+        self.rebuilds += 1
+        self.last_rebuild_at = now
+        self.last_rebuild_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(f"Similar apartments rebuilt for {len(index)} apartments in {self.last_rebuild_ms}ms")
+        return {"rebuilt": True, "apartments": len(index), "rails": written}
+
+    async def apply_updates(self) -> dict:
+        entries = await self.apartment_repository.get_similarity_updates()
+        if not entries:
+            return {"rebuilt": False, "updated": 0, "rails": 0}
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        apartment_ids = [entry["_id"] for entry in entries]
+        documents = {
+            str(document["_id"]): document
+            async for document in self.apartment_repository.iter_similarity_features(apartment_ids)
+        }
+        deleted = [apartment_id for apartment_id in apartment_ids if apartment_id not in documents]
+        removed = [row for row in map(self.index.remove, deleted) if row is not None]
+        changed = [self.index.upsert(document) for document in documents.values()]
+        affected = self.index.affected_rows(changed, removed)
+        self.index.compute(affected)
+        written = await self._save(self.index, affected, now)
+        await self.apartment_repository.delete_similar(deleted)
+        await self.apartment_repository.ack_similarity_updates(entries)
+        self.updates += len(entries)
+        self.last_update_ms = round((time.perf_counter() - started) * 1000, 1)
+        return {"rebuilt": False, "updated": len(entries), "rails": written}
+
+    async def _save(self, index: ApartmentSimilarityIndex, rows, now: datetime) -> int:
+        rows: List[int] = [row for row in rows if index.apartment_id(row) is not None]
+        for start in range(0, len(rows), WRITE_BATCH_SIZE):
+            batch = rows[start:start + WRITE_BATCH_SIZE]
+            await self.apartment_repository.save_similar(
+                {index.apartment_id(row): index.similar(row) for row in batch}, now
+            )
+            # Renew the lease during long writes
+            if start and not await self.lease.acquire():
+                raise RuntimeError("Similar apartments lease lost")
+        self.rails_written += len(rows)
+        return len(rows)
+
+    def stats(self) -> dict:
+        return dict(
+            super().stats(),
+            apartments=len(self.index) if self.index is not None else None,
+            rebuilds=self.rebuilds,
+            updates=self.updates,
+            rails_written=self.rails_written,
+            last_rebuild_at=self.last_rebuild_at.isoformat() if self.last_rebuild_at else None,
+            last_rebuild_ms=self.last_rebuild_ms,
+            last_update_ms=self.last_update_ms
+        )
@@ -6,11 +6,35 @@ from repositories.user_repository import UserRepository
 from fastapi import HTTPException
 from services.base import BaseService
 from utils.logging import logger
+from utils.singleflight import SingleFlight, coalesce
+from services.roommate_service import RoommateService
+from services.activity_buffer import ActivityBuffer
 
 class UserService(BaseService[User]):
-    def __init__(self, user_repository: UserRepository):
+    def __init__(
+        self,
+        user_repository: UserRepository,
+        singleflight: Optional[SingleFlight] = None,
+        roommate_service: Optional[RoommateService] = None,
+        activity_buffer: Optional[ActivityBuffer] = None
+    ):
         self.user_repository = user_repository
+        self.singleflight = singleflight or SingleFlight()
+        self.roommate_service = roommate_service
+        self.activity_buffer = activity_buffer
+
+    def _reindex(self, user: Optional[User]) -> Optional[User]:
+        # Keeps this worker's roommate matrix current without waiting for its sync
+        if self.roommate_service is not None:
+            self.roommate_service.index_user(user)
+        return user
+
+    def _unindex(self, user_id: str, deleted: bool) -> bool:
+        if deleted and self.roommate_service is not None:
+            self.roommate_service.remove_user(user_id)
+        return deleted
 
+    @coalesce
     async def get_by_id(self, entity_id: str) -> Optional[User]:
         try:
             return await self.user_repository.get_by_id(entity_id)
@@ -24,14 +48,14 @@ class UserService(BaseService[User]):
     async def update(self, entity_id: str, entity_data: dict) -> Optional[User]:
         try:
             entity_data["updatedAt"] = datetime.utcnow()
-            return await self.user_repository.update(entity_id, entity_data)
+            return self._reindex(await self.user_repository.update(entity_id, entity_data))
         except ValueError as e:
             logger.error(f"Error updating user {entity_id}: {str(e)}")
             return None
 
     async def delete(self, entity_id: str) -> bool:
         try:
-            return await self.user_repository.delete(entity_id)
+            return self._unindex(entity_id, await self.user_repository.delete(entity_id))
         except ValueError as e:
             logger.error(f"Error deleting user {entity_id}: {str(e)}")
             return False
@@ -39,11 +63,13 @@ class UserService(BaseService[User]):
     async def create(self, user: User) -> User:
         user.createdAt = datetime.utcnow()
         user.updatedAt = datetime.utcnow()
-        return await self.user_repository.create(user)
+        return self._reindex(await self.user_repository.create(user))
 
+    @coalesce
     async def get_user_by_email(self, email: str) -> Optional[User]:
         return await self.user_repository.get_by_email(email)
 
+    @coalesce
     async def get_landlords(self, skip: int = 0, limit: int = 10) -> List[User]:
         return await self.user_repository.get_landlords(skip, limit)
 
@@ -54,42 +80,48 @@ class UserService(BaseService[User]):
             logger.error(f"Error verifying landlord {user_id}: {str(e)}")
             return None
 
+    @coalesce
     async def get_users_by_university(self, university: str, skip: int = 0, limit: int = 10) -> List[User]:
         return await self.user_repository.get_by_university(university, skip, limit)
 
-    async def update_last_login(self, user_id: str) -> Optional[User]:
-        try:
-            return await self.user_repository.update_last_login(user_id)
-        except ValueError as e:
-            logger.error(f"Error updating last login for user {user_id}: {str(e)}")
-            return None
+    async def update_last_login(self, user_id: str) -> bool:
+        """Records the login; with the activity buffer it is written later and unknown ids are not detected."""
+        if not ObjectId.is_valid(user_id):
+            return False
+        if self.activity_buffer is not None:
+            self.activity_buffer.record(user_id, "last_login")
+            return True
+        return await self.user_repository.update_last_login(user_id) is not None
 
     async def create_user(self, user: User) -> User:
         user.createdAt = datetime.utcnow()
         user.updatedAt = datetime.utcnow()
-        return await self.user_repository.create(user)
+        return self._reindex(await self.user_repository.create(user))
 
     async def update_user(self, user_id: str, user_data: dict) -> Optional[User]:
         try:
             user_data["updatedAt"] = datetime.utcnow()
-            return await self.user_repository.update(user_id, user_data)
+            return self._reindex(await self.user_repository.update(user_id, user_data))
         except ValueError as e:
             logger.error(f"Error updating user {user_id}: {str(e)}")
             return None
 
     async def delete_user(self, user_id: str) -> bool:
         try:
-            return await self.user_repository.delete(user_id)
+            return self._unindex(user_id, await self.user_repository.delete(user_id))
         except ValueError as e:
             logger.error(f"Error deleting user {user_id}: {str(e)}")
             return False
 
+    @coalesce
     async def get_all_users(self, skip: int = 0, limit: int = 10) -> List[User]:
         return await self.user_repository.get_all(skip, limit)
 
+    @coalesce
     async def get_by_university(self, university: str) -> List[User]:
         return await self.user_repository.get_by_university(university)
 
+    @coalesce
     async def get_user_profile(self, user_id: str) -> User:
         user = await self.user_repository.get_by_id(user_id)
         if not user:
@@ -102,11 +134,11 @@ class UserService(BaseService[User]):
         if existing_user:
             logger.error(f"User with email {user.email} already exists")
             raise HTTPException(status_code=400, detail="User with this email already exists")
-        return await self.user_repository.create(user)
+        return self._reindex(await self.user_repository.create(user))
 
     async def update_user_profile(self, user_id: str, user_data: User) -> User:
         existing_user = await self.user_repository.get_by_id(user_id)
         if not existing_user:
             logger.error(f"User profile not found for ID {user_id}")
             raise HTTPException(status_code=404, detail="User not found")
-        return await self.user_repository.update(user_id, user_data) 
\ No newline at end of file
+        return self._reindex(await self.user_repository.update(user_id, user_data)) 
\ No newline at end of file
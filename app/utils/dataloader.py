@@ -0,0 +1,69 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional
+
+
+class DataLoader:
+    """Batches ``load(key)`` calls made in the same event loop tick.
+
+    Keys requested before the loop gets back to its scheduled callbacks are
+    collected and fetched with one ``batch_fn(keys)`` call, which returns a
+    ``{key: value}`` dict (missing keys resolve to ``None``).  Results are
+    memoized for the lifetime of the loader, so create one per request
+    (see ``dependencies.get_loaders``) to avoid serving stale data.
+
+    Batching needs the loads to be issued concurrently, e.g. with
+    ``asyncio.gather(*(loader.load(key) for key in keys))`` or ``load_many``;
+    awaiting loads one by one in a loop still costs a query per key.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]],
+                 max_batch_size: int = 1000):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self._memo: Dict[Hashable, asyncio.Future] = {}
+        self._queue: List[Hashable] = []
+        self._tasks: set = set()
+        self.loads = 0
+        self.batches = 0
+
+    def load(self, key: Hashable) -> Awaitable[Optional[Any]]:
+        self.loads += 1
+        future = self._memo.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._memo[key] = future
+            if not self._queue:
+                loop.call_soon(self._dispatch)
+            self._queue.append(key)
+        # Shielded so that one cancelled caller does not cancel the shared result
+        return asyncio.shield(future)
+
+    async def load_many(self, keys: Iterable[Hashable]) -> List[Optional[Any]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def _dispatch(self):
+        keys, self._queue = self._queue, []
+        for start in range(0, len(keys), self.max_batch_size):
+            task = asyncio.ensure_future(self._run_batch(keys[start:start + self.max_batch_size]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, keys: List[Hashable]):
+        self.batches += 1
+        try:
+            values = await self.batch_fn(keys)
+        except Exception as e:
+            for key in keys:
+                # Not memoized, a later load retries
+                future = self._memo.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key in keys:
+            future = self._memo[key]
+            if not future.done():
+                future.set_result(values.get(key))
+
+    def stats(self) -> dict:
+        return {"loads": self.loads, "batches": self.batches, "keys": len(self._memo)}
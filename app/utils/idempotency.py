@@ -0,0 +1,240 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import Header, HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from pymongo.errors import DuplicateKeyError
+
+from utils.logging import logger
+
+TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600)))
+# How long a duplicate waits for the original before giving up with 409
+WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT", "10"))
+# A pending key older than this belongs to a crashed worker and is taken over
+LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK", "60"))
+CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+# A key left pending after the write would be taken over and the write run again
+COMPLETE_ATTEMPTS = 5
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+IDEMPOTENCY_KEY = Header(
+    None,
+    alias="Idempotency-Key",
+    description="Unique per intended write, a retry with the same key returns the first response"
+)
+
+
+def fingerprint(payload: Any) -> str:
+    return hashlib.sha256(json.dumps(jsonable_encoder(payload), sort_keys=True).encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """Runs a write at most once per ``Idempotency-Key`` and replays its response.
+
+    Keys are scoped to the user and the operation.  The first request
+    inserts a pending document into ``IdempotencyKeys`` (unique ``_id``,
+    TTL index on ``expiresAt``), runs the write and stores its response;
+    2xx and 4xx responses are replayed for ``ttl_seconds``, a 5xx or an
+    exception releases the key so that a retry runs the write again.
+    Storing the response is retried, a key left pending would be taken
+    over after ``lock_seconds`` and its write run twice.
+    Completed responses are also kept in an in-memory LRU, and concurrent
+    duplicates in the same worker await the original's task, so only
+    duplicates arriving at other workers poll MongoDB.  Reusing a key for a
+    different payload is a 422.
+    """
+
+    def __init__(
+        self,
+        client,
+        ttl_seconds: float = TTL_SECONDS,
+        wait_seconds: float = WAIT_SECONDS,
+        lock_seconds: float = LOCK_SECONDS,
+        cache_size: int = CACHE_SIZE
+    ):
+        self.collection = client.get_database("diploma")["IdempotencyKeys"]
+        self.ttl_seconds = ttl_seconds
+        self.wait_seconds = wait_seconds
+        self.lock_seconds = lock_seconds
+        self.cache_size = cache_size
+        # scope -> (outcome, monotonic expiry)
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.executions = 0
+        self.memory_hits = 0
+        self.stored_hits = 0
+        self.shared = 0
+        self.timeouts = 0
+        self.incomplete = 0
+
+    async def create_indexes(self):
+        await self.collection.create_index("expiresAt", expireAfterSeconds=0)
+
+    async def run(
+        self,
+        key: Optional[str],
+        user_id: str,
+        operation: str,
+        payload: Any,
+        fn: Callable[[], Awaitable[Any]],
+        response: Response
+    ) -> Any:
+        """The result of ``fn()``, or the stored response of an earlier request with the same key."""
+        if key is None:
+            return await fn()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+
+        scope = f"{user_id}:{operation}:{key}"
+        request_fingerprint = fingerprint(payload)
+        outcome = self._cached(scope)
+        if outcome is not None:
+            self.memory_hits += 1
+            return self._respond(outcome, request_fingerprint, response, replayed=True)
+
+        task = self._in_flight.get(scope)
+        replayed = task is not None
+        if task is None:
+            task = asyncio.ensure_future(self._execute(scope, request_fingerprint, fn))
+            self._in_flight[scope] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(scope, None))
+        else:
+            self.shared += 1
+        # Shielded, a client disconnecting does not cancel the write for its duplicates
+        outcome = await asyncio.shield(task)
+        return self._respond(outcome, request_fingerprint, response, replayed=replayed or outcome["replayed"])
+
+    def _respond(self, outcome: dict, request_fingerprint: str, response: Response, replayed: bool) -> Any:
+        if outcome["fingerprint"] != request_fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+        headers = {REPLAYED_HEADER: "true"} if replayed else None
+        if outcome["status"] >= 400:
+            raise HTTPException(status_code=outcome["status"], detail=outcome["body"].get("detail"), headers=headers)
+        if replayed:
+            response.headers[REPLAYED_HEADER] = "true"
+        return outcome["body"]
+
+    async def _execute(self, scope: str, request_fingerprint: str, fn: Callable[[], Awaitable[Any]]) -> dict:
+        now = datetime.utcnow()
+        try:
+            await self.collection.insert_one({
+                "_id": scope,
+                "fingerprint": request_fingerprint,
+                "state": "pending",
+                "lockedAt": now,
+                "expiresAt": now + timedelta(seconds=self.ttl_seconds),
+            })
+        except DuplicateKeyError:
+            stored = await self._wait(scope, request_fingerprint)
+            if stored is not None:
+                self.stored_hits += 1
+                return self._remember(scope, stored, replayed=True)
+
+        self.executions += 1
+        try:
+            result = await fn()
+            status, body = 200, jsonable_encoder(result)
+        except HTTPException as e:
+            if e.status_code >= 500:
+                await self._release(scope)
+                raise
+            status, body = e.status_code, {"detail": e.detail}
+        except BaseException:
+            await self._release(scope)
+            raise
+        stored = {"fingerprint": request_fingerprint, "status": status, "body": body}
+        await self._complete(scope, stored)
+        return self._remember(scope, stored, replayed=False)
+
+    async def _complete(self, scope: str, stored: dict):
+        delay = 0.1
+        for attempt in range(1, COMPLETE_ATTEMPTS + 1):
+            try:
+                await self.collection.update_one({"_id": scope}, {"$set": dict(stored, state="completed")})
+                return
+            except Exception as e:
+                logger.error(f"Idempotency key {scope} not completed (attempt {attempt}): {str(e)}")
+            if attempt < COMPLETE_ATTEMPTS:
+                await asyncio.sleep(delay)
+                delay *= 2
+        # The write is done, so its response is still returned; only this worker's cache replays it
+        self.incomplete += 1
+
+    async def _wait(self, scope: str, request_fingerprint: str) -> Optional[dict]:
+        """The stored response of another worker's request, None once this request owns the key."""
+        deadline = time.monotonic() + self.wait_seconds
+        delay = 0.05
+        while True:
+            document = await self.collection.find_one({"_id": scope})
+            now = datetime.utcnow()
+            if document is None:
+                # Released after a failure, the retry runs the write
+                try:
+                    await self.collection.insert_one({
+                        "_id": scope,
+                        "fingerprint": request_fingerprint,
+                        "state": "pending",
+                        "lockedAt": now,
+                        "expiresAt": now + timedelta(seconds=self.ttl_seconds),
+                    })
+                    return None
+                except DuplicateKeyError:
+                    continue
+            if document["state"] == "completed":
+                return document
+            if document["fingerprint"] != request_fingerprint:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+            if document["lockedAt"] < now - timedelta(seconds=self.lock_seconds):
+                result = await self.collection.update_one(
+                    {"_id": scope, "state": "pending", "lockedAt": document["lockedAt"]},
+                    {"$set": {"lockedAt": now}}
+                )
+                if result.modified_count:
+                    return None
+            if time.monotonic() >= deadline:
+                self.timeouts += 1
+                raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+    async def _release(self, scope: str):
+        try:
+            await self.collection.delete_one({"_id": scope, "state": "pending"})
+        except Exception as e:
+            logger.error(f"Idempotency key {scope} not released: {str(e)}")
+
+    def _cached(self, scope: str) -> Optional[dict]:
+        entry = self._cache.get(scope)
+        if entry is None:
+            return None
+        if entry[1] < time.monotonic():
+            del self._cache[scope]
+            return None
+        self._cache.move_to_end(scope)
+        return entry[0]
+
+    def _remember(self, scope: str, stored: dict, replayed: bool) -> dict:
+        outcome = {"fingerprint": stored["fingerprint"], "status": stored["status"], "body": stored["body"]}
+        self._cache[scope] = (outcome, time.monotonic() + self.ttl_seconds)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return dict(outcome, replayed=replayed)
+
+    def stats(self) -> dict:
+        return {
+            "executions": self.executions,
+            "memory_hits": self.memory_hits,
+            "stored_hits": self.stored_hits,
+            "shared": self.shared,
+            "timeouts": self.timeouts,
+            "incomplete": self.incomplete,
+            "in_flight": len(self._in_flight),
+            "cached": len(self._cache),
+        }
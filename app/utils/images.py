@@ -0,0 +1,43 @@
+"""Picture processing, run in worker processes by PictureService."""
+import os
+from typing import List
+
+from PIL import Image, ImageOps
+
+FORMATS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp"}
+# Decoding bombs: a few kilobytes of PNG can expand to gigabytes
+Image.MAX_IMAGE_PIXELS = 50_000_000
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def make_thumbnails(source: str, directory: str, widths: List[int], quality: int = 82) -> dict:
+    """Writes the original and a JPEG per width (never upscaled) of ``source`` to ``directory``.
+
+    Returns the original's format and size.  Raises InvalidImage when
+    ``source`` is not a JPEG, PNG or WebP picture.
+    """
+    try:
+        with Image.open(source) as image:
+            image_format = image.format
+            if image_format not in FORMATS:
+                raise InvalidImage(f"Unsupported picture format {image_format}")
+            image.load()
+            # Phones store the rotation in EXIF, thumbnails have none
+            image = ImageOps.exif_transpose(image)
+            width, height = image.size
+            rgb = image.convert("RGB")
+            os.makedirs(directory, exist_ok=True)
+            for target in widths:
+                thumbnail = rgb.copy()
+                if width > target:
+                    thumbnail.thumbnail((target, height), Image.Resampling.LANCZOS)
+                thumbnail.save(os.path.join(directory, f"{target}.jpg"), "JPEG",
+                               quality=quality, optimize=True, progressive=True)
+    except (OSError, Image.DecompressionBombError, SyntaxError) as e:
+        raise InvalidImage(str(e))
+    extension = FORMATS[image_format]
+    os.replace(source, os.path.join(directory, f"original.{extension}"))
+    return {"format": image_format, "width": width, "height": height, "extension": extension}
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import random
+import socket
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from utils.logging import logger
+
+
+class MongoLease:
+    """A named lease in the ``Leases`` collection, held by at most one process at a time.
+
+    ``acquire`` takes the lease when it is free or expired and renews it when
+    this process already holds it, so a background job calls it before every
+    run and does the work only when it returns True.  A holder that dies
+    stops renewing and another process takes over once ``ttl_seconds`` pass.
+    """
+
+    def __init__(self, client, name: str, ttl_seconds: float):
+        self.collection = client.get_database("diploma")["Leases"]
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.held = False
+
+    async def acquire(self) -> bool:
+        now = datetime.utcnow()
+        try:
+            await self.collection.find_one_and_update(
+                {"_id": self.name, "$or": [{"owner": self.owner}, {"expiresAt": {"$lt": now}}]},
+                {"$set": {"owner": self.owner, "expiresAt": now + timedelta(seconds=self.ttl_seconds)}},
+                upsert=True
+            )
+            self.held = True
+        except DuplicateKeyError:
+            # The lease document exists and belongs to another live process
+            self.held = False
+        return self.held
+
+    async def release(self):
+        if self.held:
+            await self.collection.delete_one({"_id": self.name, "owner": self.owner})
+            self.held = False
+
+
+class LeasedJob(ABC):
+    """Background job run every ``interval`` seconds by the holder of ``lease``.
+
+    Every worker runs the loop but only the one whose ``acquire`` succeeds
+    calls ``run_once``; long runs renew the lease with ``acquire`` between
+    batches.  Subclasses implement ``run_once``, call ``_record`` when a run
+    succeeds and add their own counters to ``stats``.
+    """
+
+    name = "Job"  # prefix of the log messages
+    max_start_delay = 60.0
+
+    def __init__(self, lease: MongoLease, interval: float, enabled: bool):
+        self.lease = lease
+        self.interval = interval
+        self.enabled = enabled
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.last_run_at: Optional[datetime] = None
+        self.last_duration_ms = 0.0
+        self.last_error: Optional[str] = None
+
+    @abstractmethod
+    async def run_once(self) -> dict:
+        pass
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.lease.release()
+        except Exception as e:
+            logger.error(f"{self.name} lease release failed: {str(e)}")
+
+    async def _loop(self):
+        # Workers start together, the random delay spreads their first attempts
+        await asyncio.sleep(random.uniform(0, min(self.interval, self.max_start_delay)))
+        while True:
+            try:
+                if await self.lease.acquire():
+                    await self.run_once()
+                else:
+                    self.lease_lost()
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"{self.name} run failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def lease_lost(self):
+        """Called when another worker holds the lease, to drop state only the holder keeps."""
+
+    def _record(self, now: datetime, started: float):
+        self.runs += 1
+        self.last_run_at = now
+        self.last_duration_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.last_error = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "leader": self.lease.held,
+            "interval_seconds": self.interval,
+            "runs": self.runs,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_duration_ms": self.last_duration_ms,
+            "last_error": self.last_error,
+        }
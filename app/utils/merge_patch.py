@@ -0,0 +1,97 @@
+"""JSON Merge Patch (RFC 7396) bodies turned into MongoDB updates."""
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Annotated, Any, Dict, Iterable, List, Optional, Set, Type, Union, get_args, get_origin
+
+from fastapi import Body, HTTPException
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+MERGE_PATCH = Body(
+    ...,
+    media_type="application/merge-patch+json",
+    description="Only the fields to change; null removes an optional field, objects are merged, lists are replaced"
+)
+
+
+@dataclass
+class MergePatch:
+    set: Dict[str, Any] = field(default_factory=dict)
+    unset: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def fields(self) -> Set[str]:
+        """Top-level fields the patch changes."""
+        return {path.split(".", 1)[0] for path in list(self.set) + list(self.unset)}
+
+    @property
+    def parents(self) -> Set[str]:
+        """Sub-documents the patch changes field by field."""
+        return {path.rsplit(".", 1)[0] for path in list(self.set) + list(self.unset) if "." in path}
+
+    def update(self, **server_fields) -> dict:
+        update = {"$set": dict(self.set, **server_fields)}
+        if self.unset:
+            update["$unset"] = self.unset
+        return update
+
+
+def merge_patch(model: Type[BaseModel], patch: Dict[str, Any], read_only: Iterable[str] = ()) -> MergePatch:
+    """Validates the fields of ``patch`` against ``model`` and returns their ``$set``/``$unset``.
+
+    Only the fields present are validated, against their own type; nested
+    models are patched field by field.  ``read_only`` fields are ignored, so
+    clients may still send a complete document.  Raises a 422 listing every
+    invalid field.
+    """
+    result = MergePatch()
+    errors: List[dict] = []
+    _apply(model, patch, [], set(read_only), result, errors)
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+    return result
+
+
+def _apply(model: Type[BaseModel], patch: Dict[str, Any], path: List[str], read_only: Set[str],
+           result: MergePatch, errors: List[dict]):
+    for name, value in patch.items():
+        if name in read_only:
+            continue
+        loc = path + [name]
+        key = ".".join(loc)
+        info = model.model_fields.get(name)
+        if info is None:
+            errors.append({"loc": ["body"] + loc, "msg": "Unknown field", "type": "extra_forbidden"})
+            continue
+        if value is None:
+            if info.is_required():
+                errors.append({"loc": ["body"] + loc, "msg": "Field required", "type": "missing"})
+            else:
+                # Readers fill in the default
+                result.unset[key] = ""
+            continue
+        nested = _nested_model(info.annotation)
+        if nested is not None and isinstance(value, dict):
+            _apply(nested, value, loc, set(), result, errors)
+            continue
+        adapter = _adapter(model, name)
+        try:
+            result.set[key] = adapter.dump_python(adapter.validate_python(value))
+        except ValidationError as e:
+            errors.extend(
+                {"loc": ["body"] + loc + list(error["loc"]), "msg": error["msg"], "type": error["type"]}
+                for error in e.errors(include_url=False)
+            )
+
+
+def _nested_model(annotation: Any) -> Optional[Type[BaseModel]]:
+    if get_origin(annotation) is Union:
+        models = [arg for arg in get_args(annotation) if arg is not type(None)]
+        annotation = models[0] if len(models) == 1 else None
+    return annotation if isinstance(annotation, type) and issubclass(annotation, BaseModel) else None
+
+
+@lru_cache(maxsize=None)
+def _adapter(model: Type[BaseModel], name: str) -> TypeAdapter:
+    info = model.model_fields[name]
+    annotation = Annotated[(info.annotation, *info.metadata)] if info.metadata else info.annotation
+    return TypeAdapter(annotation)
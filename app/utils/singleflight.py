@@ -0,0 +1,85 @@
+import asyncio
+import functools
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+STALE_SECONDS = float(os.getenv("SINGLEFLIGHT_STALE_SECONDS", "0"))
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the query, callers arriving while it is
+    in flight await the same task and get the same result (or exception).
+    The task is shielded, so a disconnecting first caller does not cancel it
+    for the others.  Results are shared objects and must be treated as read-only.
+
+    With ``stale_seconds`` > 0 the last result per key is kept, and callers
+    arriving while a refresh is in flight get it immediately if it is not
+    older than ``stale_seconds`` instead of waiting.
+    """
+
+    def __init__(self, stale_seconds: float = STALE_SECONDS, max_stale_entries: int = 10_000):
+        self.stale_seconds = stale_seconds
+        self.max_stale_entries = max_stale_entries
+        self._in_flight: dict = {}
+        self._stale: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.calls = 0
+        self.executions = 0
+        self.shared = 0
+        self.stale_served = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        task = self._in_flight.get(key)
+        if task is not None:
+            if self.stale_seconds > 0:
+                entry = self._stale.get(key)
+                if entry is not None and time.monotonic() - entry[1] <= self.stale_seconds:
+                    self.stale_served += 1
+                    return entry[0]
+            self.shared += 1
+            return await asyncio.shield(task)
+
+        self.executions += 1
+        task = asyncio.ensure_future(fn())
+        self._in_flight[key] = task
+        task.add_done_callback(functools.partial(self._done, key))
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Future):
+        self._in_flight.pop(key, None)
+        if self.stale_seconds > 0 and not task.cancelled() and task.exception() is None:
+            self._stale[key] = (task.result(), time.monotonic())
+            self._stale.move_to_end(key)
+            if len(self._stale) > self.max_stale_entries:
+                self._stale.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "shared": self.shared,
+            "stale_served": self.stale_served,
+            "in_flight": len(self._in_flight),
+            "dedup_ratio": round((self.shared + self.stale_served) / self.calls, 4) if self.calls else 0.0,
+        }
+
+
+def coalesce(method):
+    """Run a service read method through the service's ``singleflight``.
+
+    The key is the method plus its arguments; calls with unhashable
+    arguments are not coalesced.
+    """
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        key = (method.__qualname__, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return await method(self, *args, **kwargs)
+        return await self.singleflight.do(key, lambda: method(self, *args, **kwargs))
+    return wrapper
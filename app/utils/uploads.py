@@ -0,0 +1,137 @@
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+from typing import List, Optional
+
+from fastapi import HTTPException, Request
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+
+@dataclass
+class UploadedFile:
+    path: str
+    sha256: str
+    size: int
+    filename: str
+
+
+class _FileParts:
+    """MultipartParser callbacks writing every file part to its own file in ``directory``."""
+
+    def __init__(self, directory: str, max_bytes: int, max_files: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.files: List[UploadedFile] = []
+        self._headers = {}
+        self._field = b""
+        self._value = b""
+        self._file = None
+        self._hash = None
+        self._current: Optional[UploadedFile] = None
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self):
+        self._headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._value += data[start:end]
+
+    def on_header_end(self):
+        self._headers[self._field.lower()] = self._value
+        self._field = b""
+        self._value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        filename = options.get(b"filename")
+        if filename is None:
+            # A plain form field, its value is ignored
+            return
+        if len(self.files) >= self.max_files:
+            raise HTTPException(status_code=400, detail=f"At most {self.max_files} files per upload")
+        path = os.path.join(self.directory, f".upload-{uuid.uuid4().hex}")
+        self._file = open(path, "wb")
+        self._hash = hashlib.sha256()
+        self._current = UploadedFile(path=path, sha256="", size=0, filename=filename.decode("utf-8", "replace"))
+        self.files.append(self._current)
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._file is None:
+            return
+        chunk = data[start:end]
+        self._current.size += len(chunk)
+        if self._current.size > self.max_bytes:
+            raise HTTPException(status_code=413, detail=f"Files must be at most {self.max_bytes} bytes")
+        self._hash.update(chunk)
+        self._file.write(chunk)
+
+    def on_part_end(self):
+        if self._file is not None:
+            self._file.close()
+            self._current.sha256 = self._hash.hexdigest()
+            self._file = None
+
+    def discard(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        for uploaded in self.files:
+            discard(uploaded)
+
+
+def discard(uploaded: UploadedFile):
+    try:
+        os.remove(uploaded.path)
+    except FileNotFoundError:
+        pass
+
+
+async def receive_files(request: Request, directory: str, max_bytes: int, max_files: int) -> List[UploadedFile]:
+    """Streams the files of a multipart/form-data request to ``directory``, hashing them as they arrive.
+
+    Only one chunk of the body is in memory at a time.  The caller owns the
+    returned files and removes them with ``discard``.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    boundary = options.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+
+    os.makedirs(directory, exist_ok=True)
+    parts = _FileParts(directory, max_bytes, max_files)
+    parser = MultipartParser(boundary, parts.callbacks())
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+        parser.finalize()
+    except HTTPException:
+        parts.discard()
+        raise
+    except Exception as e:
+        parts.discard()
+        raise HTTPException(status_code=400, detail=f"Malformed multipart upload: {str(e)}")
+    if parts._file is not None or any(not uploaded.sha256 for uploaded in parts.files):
+        parts.discard()
+        raise HTTPException(status_code=400, detail="Malformed multipart upload: truncated body")
+    if not parts.files:
+        raise HTTPException(status_code=400, detail="No file in the upload")
+    return parts.files
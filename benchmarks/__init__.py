@@ -0,0 +1,5 @@
+"""Benchmark harness for the Student Housing API.
+
+Seeds a database with a reproducible dataset and drives the ASGI app from
+``app/main.py`` with a concurrent async client.  See ``python -m benchmarks --help``.
+"""
@@ -0,0 +1,138 @@
+import argparse
+import asyncio
+import json
+import platform
+import sys
+from dataclasses import asdict
+
+from benchmarks.dataset import DatasetSize, seed
+from benchmarks.harness import (
+    Recorder,
+    compare,
+    drive,
+    format_table,
+    import_app_modules,
+    issue_tokens,
+    make_client,
+    use_client,
+)
+from benchmarks.scenarios import SCENARIOS, supported
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Seed a database and load-test the API in-process.",
+    )
+    parser.add_argument("--backend", choices=["memory", "mongo"], default="memory",
+                        help="memory uses mongomock-motor, mongo needs --mongodb-url")
+    parser.add_argument("--mongodb-url",
+                        help="throwaway MongoDB instance; its 'diploma' database is dropped and reseeded")
+    parser.add_argument("--url",
+                        help="benchmark a running server (e.g. http://127.0.0.1:8000) instead of the app in-process; "
+                             "needs --backend mongo pointing at the server's database and the server's JWT_SECRET")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed")
+    parser.add_argument("--users", type=int, default=DatasetSize.users)
+    parser.add_argument("--apartments", type=int, default=DatasetSize.apartments)
+    parser.add_argument("--bookings", type=int, default=DatasetSize.bookings)
+    parser.add_argument("--reviews", type=int, default=DatasetSize.reviews)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="JSON report of a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="allowed p95/throughput regression in percent (default: 10)")
+    args = parser.parse_args(argv)
+    if args.backend == "mongo" and not args.mongodb_url:
+        parser.error("--backend mongo requires --mongodb-url")
+    if args.url and args.backend != "mongo":
+        parser.error("--url requires --backend mongo")
+    return args
+
+
+async def measure(args, app, dataset, tokens) -> dict:
+    operations = supported(SCENARIOS[args.scenario], args.backend)
+    if args.warmup:
+        await drive(app, operations, dataset, tokens, args.concurrency, args.warmup, args.seed + 1,
+                    base_url=args.url)
+
+    recorder = Recorder()
+    duration = await drive(app, operations, dataset, tokens, args.concurrency, args.requests, args.seed,
+                           recorder, base_url=args.url)
+    return {
+        "meta": {
+            "backend": args.backend,
+            "target": args.url or "in-process",
+            "scenario": args.scenario,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "skipped": [operation.route for operation in SCENARIOS[args.scenario] if operation not in operations],
+            "dataset": asdict(dataset_size(args)),
+            "python": platform.python_version(),
+        },
+        **recorder.summary(duration),
+    }
+
+
+def dataset_size(args) -> DatasetSize:
+    return DatasetSize(users=args.users, apartments=args.apartments, bookings=args.bookings, reviews=args.reviews)
+
+
+async def run(args) -> dict:
+    import_app_modules()
+    client = make_client(args.backend, args.mongodb_url)
+
+    if args.url:
+        dataset = await seed(client, dataset_size(args), args.seed)
+        return await measure(args, None, dataset, issue_tokens(dataset.user_ids))
+
+    from main import app
+    import dependencies
+
+    use_client(client)
+    async with app.router.lifespan_context(app):
+        dataset = await seed(client, dataset_size(args), args.seed)
+        report = await measure(args, app, dataset, issue_tokens(dataset.user_ids))
+        report["singleflight"] = {
+            "apartments": dependencies.apartment_service.singleflight.stats(),
+            "reviews": dependencies.review_service.singleflight.stats(),
+            "users": dependencies.user_service.singleflight.stats(),
+        }
+    return report
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print(format_table(report, baseline))
+    for route in report["meta"]["skipped"]:
+        print(f"skipped {route}: not supported by the {args.backend} backend")
+    for name, stats in report.get("singleflight", {}).items():
+        print(f"singleflight {name}: {stats['calls']} calls, {stats['executions']} queries, "
+              f"dedup ratio {stats['dedup_ratio']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    if baseline is not None:
+        regressions = compare(report, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""Measure sustained chat message throughput of one worker over WebSockets.
+
+    python -m benchmarks.chat --pairs 50 --messages 200
+    python -m benchmarks.chat --backend mongo --mongodb-url mongodb://localhost:27017/ --output chat.json
+
+Every pair is a tenant and a landlord connected to ``/api/v1/chats/ws`` of
+the in-process app; tenants send ``--messages`` messages each, as fast as
+the acks come back, and landlords receive them.  Reports messages per
+second, delivery latency and how the messages were batched into
+``insert_many`` calls.  The exit code is 1 when a message was not delivered
+or not written to ``Messages``, or when throughput regresses by more than
+``--threshold`` percent against ``--baseline``.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from benchmarks.dataset import DatasetSize, seed
+from benchmarks.harness import import_app_modules, issue_tokens, make_client, percentile, use_client
+
+
+class AsgiWebSocket:
+    """Minimal WebSocket client speaking ASGI directly to the app, without a server or socket."""
+
+    def __init__(self, app, path: str, token: str):
+        self.app = app
+        self.path = path
+        self.token = token
+        self._to_app: asyncio.Queue = asyncio.Queue()
+        self._from_app: asyncio.Queue = asyncio.Queue()
+        self._task = None
+
+    async def connect(self):
+        scope = {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "scheme": "ws",
+            "http_version": "1.1",
+            "path": self.path,
+            "raw_path": self.path.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(b"host", b"benchmark"), (b"authorization", f"Bearer {self.token}".encode())],
+            "client": ("127.0.0.1", 50000),
+            "server": ("benchmark", 80),
+            "subprotocols": [],
+            "state": {},
+        }
+        self._task = asyncio.create_task(self.app(scope, self._to_app.get, self._from_app.put))
+        await self._to_app.put({"type": "websocket.connect"})
+        event = await self._from_app.get()
+        if event["type"] != "websocket.accept":
+            raise RuntimeError(f"WebSocket rejected: {event}")
+
+    async def send(self, data: dict):
+        await self._to_app.put({"type": "websocket.receive", "text": json.dumps(data)})
+
+    async def receive(self) -> dict:
+        event = await self._from_app.get()
+        if event["type"] != "websocket.send":
+            raise RuntimeError(f"WebSocket closed: {event}")
+        return json.loads(event["text"])
+
+    async def close(self):
+        await self._to_app.put({"type": "websocket.disconnect", "code": 1000})
+        await self._task
+
+
+async def run(args) -> dict:
+    import_app_modules()
+    from main import app
+    import dependencies
+
+    client = make_client(args.backend, args.mongodb_url)
+    if args.backend == "mongo":
+        await client.drop_database("diploma")
+    use_client(client)
+
+    async with app.router.lifespan_context(app):
+        dataset = await seed(client, DatasetSize(users=args.pairs * 2, apartments=1, bookings=0, reviews=0), args.seed)
+        users = sorted(set(dataset.user_ids))[:args.pairs * 2]
+        tokens = issue_tokens(users)
+        pairs = list(zip(users[::2], users[1::2]))
+        chat_service = dependencies.chat_service
+        chat_ids = []
+        for tenant, landlord in pairs:
+            chat = await dependencies.chat_repository.get_or_create([tenant, landlord])
+            chat_ids.append(chat.chatId)
+
+        sockets = {user_id: AsgiWebSocket(app, "/api/v1/chats/ws", tokens[user_id]) for user_id in users}
+        await asyncio.gather(*(socket.connect() for socket in sockets.values()))
+        latencies = []
+
+        async def tenant(user_id, chat_id):
+            socket = sockets[user_id]
+            for index in range(args.messages):
+                await socket.send({"type": "message", "chat_id": chat_id, "client_id": index,
+                                   "text": f"{time.perf_counter()} message {index}"})
+                # Our own copy of the message, then the ack
+                while (await socket.receive())["type"] != "ack":
+                    pass
+
+        async def landlord(user_id):
+            socket = sockets[user_id]
+            for _ in range(args.messages):
+                event = await socket.receive()
+                sent_at = float(event["message"]["text"].split(" ", 1)[0])
+                latencies.append(time.perf_counter() - sent_at)
+
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(tenant(t, chat_id) for (t, _), chat_id in zip(pairs, chat_ids)),
+            *(landlord(l) for _, l in pairs)
+        )
+        duration = time.perf_counter() - started
+        # Whatever the flusher has not written yet is written by the shutdown
+        await asyncio.gather(*(socket.close() for socket in sockets.values()))
+        await chat_service.stop()
+        stats = chat_service.stats()
+        stored = await client.get_database("diploma")["Messages"].count_documents({})
+        unread = 0
+        async for chat in client.get_database("diploma")["Chats"].find({}, {"unread": 1}):
+            unread += sum(chat.get("unread", {}).values())
+
+    total = args.pairs * args.messages
+    latencies.sort()
+    return {
+        "backend": args.backend,
+        "pairs": args.pairs,
+        "messages": total,
+        "duration_s": round(duration, 3),
+        "messages_per_s": round(total / duration, 1),
+        "delivery_p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "delivery_p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "delivery_p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "delivered": len(latencies),
+        "stored": stored,
+        "unread": unread,
+        "flushes": stats["flushes"],
+        "messages_per_flush": round(stats["persisted"] / stats["flushes"], 1) if stats["flushes"] else 0,
+        "flush_errors": stats["flush_errors"],
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.chat", description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["memory", "mongo"], default="memory",
+                        help="memory: mongomock-motor, mongo: a real server (its diploma database is dropped)")
+    parser.add_argument("--mongodb-url", default="mongodb://localhost:27017/")
+    parser.add_argument("--pairs", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=200, help="messages sent by every tenant")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="JSON report of a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="allowed throughput regression in percent (default: 10)")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    for name, value in report.items():
+        print(f"{name:<20} {value}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+    failed = False
+    if report["delivered"] != report["messages"] or report["stored"] != report["messages"] \
+            or report["unread"] != report["messages"]:
+        print("FAIL messages were lost")
+        failed = True
+    if args.baseline:
+        with open(args.baseline) as f:
+            previous = json.load(f)["messages_per_s"]
+        if (previous - report["messages_per_s"]) / previous * 100 > args.threshold:
+            print(f"REGRESSION {previous} -> {report['messages_per_s']} messages/s")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import List
+
+from bson import ObjectId
+
+DATABASE_NAME = "diploma"
+
+# Fixed anchor so that the generated documents do not depend on the wall clock
+EPOCH = datetime(2025, 6, 1)
+
+# Astana city centre, the dataset is scattered around it
+CENTER_LATITUDE = 51.1282
+CENTER_LONGITUDE = 71.4307
+
+DISTRICTS = ["Esil", "Almaty", "Saryarka", "Baikonur", "Nura"]
+UNIVERSITIES = [
+    "Astana IT University",
+    "Nazarbayev University",
+    "L.N. Gumilyov Eurasian National University",
+    "Kazakh Agrotechnical University",
+    "Astana Medical University",
+]
+RENTAL_TYPES = ["room", "apartment"]
+LANGUAGES = ["Kazakh", "Russian", "English"]
+UTILITIES = ["water", "electricity", "gas", "internet", "heating"]
+RULES = ["no smoking", "no parties", "quiet after 22:00", "no guests overnight"]
+
+
+@dataclass
+class DatasetSize:
+    users: int = 500
+    apartments: int = 1000
+    bookings: int = 2000
+    reviews: int = 2000
+    landlord_ratio: float = 0.2
+
+
+@dataclass
+class Dataset:
+    """Ids of the seeded documents, used by the scenarios to build requests."""
+    user_ids: List[str] = field(default_factory=list)
+    landlord_ids: List[str] = field(default_factory=list)
+    apartment_ids: List[str] = field(default_factory=list)
+    booking_ids: List[str] = field(default_factory=list)
+    review_ids: List[str] = field(default_factory=list)
+
+
+def _object_id(rng: random.Random) -> ObjectId:
+    return ObjectId(rng.randbytes(12))
+
+
+def _timestamp(rng: random.Random, days_back: int = 365) -> datetime:
+    return EPOCH - timedelta(seconds=rng.randint(0, days_back * 86400))
+
+
+def make_user(rng: random.Random, index: int, is_landlord: bool) -> dict:
+    created = _timestamp(rng)
+    budget_min = rng.randrange(40000, 150000, 5000)
+    return {
+        "_id": _object_id(rng),
+        "userId": None,
+        "name": f"User{index}",
+        "email": f"user{index}@example.com",
+        "admin": False,
+        "password": None,
+        "surname": f"Surname{index}",
+        "gender": rng.choice(["male", "female"]),
+        "birth_date": datetime(rng.randint(1998, 2006), rng.randint(1, 12), rng.randint(1, 28)),
+        "phone": f"+7700{rng.randint(1000000, 9999999)}",
+        "nationality": "Kazakh",
+        "country": "Kazakhstan",
+        "city": "Astana",
+        "bio": "Student looking for a place to live.",
+        "university": rng.choice(UNIVERSITIES),
+        "studentId_number": f"ID-{index:06d}",
+        "group": f"SE-{rng.randint(2101, 2304)}",
+        "roommate_preferences": rng.choice(["non-smoker", "quiet", "non-smoker, quiet", None]),
+        "language_preferences": rng.sample(LANGUAGES, rng.randint(1, len(LANGUAGES))),
+        "budget_range": {"min": budget_min, "max": budget_min + rng.randrange(10000, 80000, 5000)},
+        "avatar_url": f"https://cdn.example.com/avatars/{index}.jpg",
+        "id_document_url": None,
+        "document_verified": rng.random() < 0.5,
+        "social_links": {"telegram": f"@user{index}"},
+        "is_landlord": is_landlord,
+        "is_verified_landlord": is_landlord and rng.random() < 0.5,
+        "createdAt": created,
+        "updatedAt": created,
+        "last_login": created + timedelta(days=rng.randint(0, 30)),
+    }
+
+
+def make_apartment(rng: random.Random, index: int, owner_id: str) -> dict:
+    # ~0.1 degree is roughly 10 km, which covers the city
+    latitude = CENTER_LATITUDE + rng.uniform(-0.1, 0.1)
+    longitude = CENTER_LONGITUDE + rng.uniform(-0.15, 0.15)
+    created = _timestamp(rng)
+    rooms = rng.randint(1, 4)
+    # Same shape as ApartmentRepository.create stores (jsonable_encoder output),
+    # plus a GeoJSON point for the $geoNear query in get_nearby
+    return {
+        "_id": _object_id(rng),
+        "apartmentId": None,
+        "ownerId": owner_id,
+        "apartment_name": f"Apartment {index}",
+        "description": "Bright apartment close to public transport. " * rng.randint(1, 6),
+        "address": {
+            "street": f"Street {rng.randint(1, 200)}",
+            "house_number": str(rng.randint(1, 150)),
+            "apartment_number": str(rng.randint(1, 300)),
+            "entrance": str(rng.randint(1, 8)),
+            "has_intercom": rng.random() < 0.7,
+            "landmark": None,
+        },
+        "district_name": rng.choice(DISTRICTS),
+        "latitude": latitude,
+        "longitude": longitude,
+        "location": {"type": "Point", "coordinates": [longitude, latitude]},
+        "price_per_month": rng.randrange(50000, 400000, 5000),
+        "area": round(rng.uniform(18, 120), 1),
+        "kitchen_area": round(rng.uniform(5, 20), 1),
+        "floor": rng.randint(1, 25),
+        "number_of_rooms": rooms,
+        "max_users": rooms + rng.randint(0, 2),
+        "university_nearby": rng.choice(UNIVERSITIES),
+        "pictures": [f"https://cdn.example.com/apartments/{index}/{n}.jpg" for n in range(rng.randint(1, 10))],
+        "is_promoted": rng.random() < 0.1,
+        "is_pet_allowed": rng.random() < 0.3,
+        "rental_type": rng.choice(RENTAL_TYPES),
+        "roommate_preferences": rng.choice(["non-smoker", "students only", None]),
+        "included_utilities": rng.sample(UTILITIES, rng.randint(0, len(UTILITIES))),
+        "rules": rng.sample(RULES, rng.randint(0, len(RULES))),
+        "contact_phone": f"+7701{rng.randint(1000000, 9999999)}",
+        "contact_telegram": None,
+        "created_at": created.isoformat(),
+        "updated_at": created.isoformat(),
+        "is_active": rng.random() < 0.9,
+        "createdAt": created,
+        "updatedAt": created,
+    }
+
+
+def make_booking(rng: random.Random, apartment_id: str, user_id: str) -> dict:
+    created = _timestamp(rng)
+    check_in = EPOCH + timedelta(days=rng.randint(-180, 365))
+    return {
+        "_id": _object_id(rng),
+        "bookingId": None,
+        "apartmentId": apartment_id,
+        "userId": user_id,
+        "message": "Hello, I would like to rent this apartment.",
+        "status": rng.choices(
+            ["pending", "accepted", "rejected", "cancelled", "completed"],
+            weights=[40, 25, 15, 10, 10],
+        )[0],
+        "check_in_date": check_in,
+        "check_out_date": check_in + timedelta(days=rng.randint(30, 270)),
+        "created_at": created,
+        "updated_at": created,
+        "createdAt": created,
+        "updatedAt": created,
+    }
+
+
+def make_review(rng: random.Random, reviewer_id: str, target_id: str, review_type: str) -> dict:
+    created = _timestamp(rng)
+    return {
+        "_id": _object_id(rng),
+        "reviewId": None,
+        "reviewerId": reviewer_id,
+        "targetId": target_id,
+        "review_type": review_type,
+        "rating": rng.choices([1, 2, 3, 4, 5], weights=[5, 5, 15, 35, 40])[0],
+        "text": "Nice place, friendly landlord.",
+        "created_at": created,
+        "updated_at": created,
+        "is_verified": rng.random() < 0.3,
+        "createdAt": created,
+        "updatedAt": created,
+    }
+
+
+async def _insert(collection, documents: List[dict], chunk_size: int = 1000):
+    for start in range(0, len(documents), chunk_size):
+        await collection.insert_many(documents[start:start + chunk_size], ordered=False)
+
+
+async def seed(client, size: DatasetSize, seed_value: int = 42) -> Dataset:
+    """Drop and reseed the collections used by the repositories.
+
+    The same ``size`` and ``seed_value`` always produce the same documents.
+    """
+    rng = random.Random(seed_value)
+    db = client.get_database(DATABASE_NAME)
+    dataset = Dataset()
+
+    landlords = max(1, int(size.users * size.landlord_ratio))
+    users = [make_user(rng, i, is_landlord=i < landlords) for i in range(size.users)]
+    dataset.user_ids = [str(user["_id"]) for user in users]
+    dataset.landlord_ids = dataset.user_ids[:landlords]
+
+    apartments = [
+        make_apartment(rng, i, rng.choice(dataset.landlord_ids))
+        for i in range(size.apartments)
+    ]
+    dataset.apartment_ids = [str(apartment["_id"]) for apartment in apartments]
+
+    bookings = [
+        make_booking(rng, rng.choice(dataset.apartment_ids), rng.choice(dataset.user_ids))
+        for _ in range(size.bookings)
+    ]
+    dataset.booking_ids = [str(booking["_id"]) for booking in bookings]
+
+    # Apartments.occupancy as maintained by BookingRepository for pending/accepted bookings
+    apartments_by_id = {str(apartment["_id"]): apartment for apartment in apartments}
+    for apartment in apartments:
+        apartment["occupancy"] = []
+    for booking in sorted(bookings, key=lambda booking: booking["check_in_date"]):
+        if booking["status"] in ("pending", "accepted"):
+            apartments_by_id[booking["apartmentId"]]["occupancy"].append({
+                "bookingId": str(booking["_id"]),
+                "start": booking["check_in_date"],
+                "end": booking["check_out_date"],
+            })
+
+    reviews = []
+    for _ in range(size.reviews):
+        if rng.random() < 0.8:
+            reviews.append(make_review(rng, rng.choice(dataset.user_ids), rng.choice(dataset.apartment_ids), "apartment"))
+        else:
+            reviews.append(make_review(rng, rng.choice(dataset.user_ids), rng.choice(dataset.landlord_ids), "user"))
+    dataset.review_ids = [str(review["_id"]) for review in reviews]
+
+    for name, documents in (
+        ("User", users),
+        ("Apartments", apartments),
+        ("Bookings", bookings),
+        ("Reviews", reviews),
+    ):
+        await db.drop_collection(name)
+        await _insert(db[name], documents)
+
+    try:
+        await db["Apartments"].create_index([("location", "2dsphere")])
+    except Exception as e:
+        # The in-memory stand-in has no geo support, $geoNear is not benchmarked there
+        print(f"Skipping 2dsphere index: {e}")
+
+    return dataset
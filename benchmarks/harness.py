@@ -0,0 +1,188 @@
+import asyncio
+import math
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+
+
+def import_app_modules():
+    """Make the flat ``app/`` modules importable the same way uvicorn does."""
+    if str(APP_DIR) not in sys.path:
+        sys.path.insert(0, str(APP_DIR))
+    os.environ.setdefault("JWT_SECRET", "benchmark-secret-benchmark-secret-32b")
+    # A handful of seeded users would exhaust their buckets immediately
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    # Saturation is what the benchmarks measure, shedding would hide it
+    os.environ.setdefault("LOAD_SHED_ENABLED", "false")
+    # The dataset's timestamps are fixed in the past, the archiver would expire most listings
+    os.environ.setdefault("ARCHIVE_ENABLED", "false")
+
+
+def make_client(backend: str, mongodb_url: Optional[str] = None):
+    if backend == "memory":
+        from mongomock_motor import AsyncMongoMockClient
+        return AsyncMongoMockClient()
+    from motor.motor_asyncio import AsyncIOMotorClient
+    return AsyncIOMotorClient(mongodb_url)
+
+
+def use_client(client):
+    """Make the app lifespan build its repositories and services on ``client``."""
+    import dependencies
+    dependencies.create_client = lambda: client
+
+
+def issue_tokens(user_ids: List[str]) -> Dict[str, str]:
+    from datetime import datetime
+    import jwt
+    import dependencies
+
+    expires = datetime.utcnow() + timedelta(days=1)
+    return {
+        user_id: jwt.encode(
+            {"userId": user_id, "email": f"{user_id}@example.com", "name": user_id, "exp": expires},
+            dependencies.SECRET_KEY,
+            algorithm=dependencies.ALGORITHM,
+        )
+        for user_id in user_ids
+    }
+
+
+def run_sync(coroutine):
+    """Result of a coroutine that never suspends, driven without an event loop."""
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError("coroutine suspended")
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(q / 100 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, route: str, status: str, elapsed_ms: float):
+        self.latencies[route].append(elapsed_ms)
+        self.statuses[route][status] += 1
+
+    def summary(self, duration_s: float) -> dict:
+        routes = {}
+        total = 0
+        for route in sorted(self.latencies):
+            values = sorted(self.latencies[route])
+            statuses = dict(sorted(self.statuses[route].items()))
+            errors = sum(count for code, count in statuses.items() if not code.isdigit() or int(code) >= 500)
+            total += len(values)
+            routes[route] = {
+                "requests": len(values),
+                "errors": errors,
+                "status": statuses,
+                "throughput_rps": round(len(values) / duration_s, 2),
+                "mean_ms": round(sum(values) / len(values), 3),
+                "p50_ms": round(percentile(values, 50), 3),
+                "p95_ms": round(percentile(values, 95), 3),
+                "p99_ms": round(percentile(values, 99), 3),
+            }
+        return {
+            "total": {
+                "requests": total,
+                "duration_s": round(duration_s, 3),
+                "throughput_rps": round(total / duration_s, 2) if duration_s else 0.0,
+            },
+            "routes": routes,
+        }
+
+
+async def drive(app, operations, dataset, tokens, concurrency: int, requests: int, seed: int,
+                recorder: Optional[Recorder] = None, base_url: Optional[str] = None) -> float:
+    """Run ``requests`` weighted requests from ``concurrency`` workers.
+
+    Requests go to ``app`` in-process, or over HTTP to ``base_url`` when
+    ``app`` is None.  Each worker owns a random generator derived from
+    ``seed`` so a run always issues the same sequence of requests.
+    Returns the wall time.
+    """
+    import httpx
+
+    weights = [operation.weight for operation in operations]
+    remaining = requests
+
+    async def worker(client, rng):
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            operation = rng.choices(operations, weights=weights)[0]
+            kwargs = operation.build(dataset, tokens, rng)
+            started = time.perf_counter()
+            try:
+                response = await client.request(**kwargs)
+                status = str(response.status_code)
+            except Exception as e:
+                status = type(e).__name__
+            if recorder is not None:
+                recorder.record(operation.route, status, (time.perf_counter() - started) * 1000)
+
+    if app is not None:
+        options = {"transport": httpx.ASGITransport(app=app), "base_url": "http://benchmark"}
+    else:
+        options = {"base_url": base_url, "limits": httpx.Limits(max_connections=concurrency)}
+    async with httpx.AsyncClient(timeout=60, **options) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            worker(client, random.Random(seed * 1000 + index)) for index in range(concurrency)
+        ))
+        return time.perf_counter() - started
+
+
+def compare(current: dict, baseline: dict, threshold_pct: float) -> List[str]:
+    """Return the regressions of ``current`` against ``baseline``.
+
+    A route regresses when its p95 latency grows or its throughput drops by
+    more than ``threshold_pct`` percent.
+    """
+    regressions = []
+    for route, stats in current["routes"].items():
+        previous = baseline.get("routes", {}).get(route)
+        if previous is None:
+            continue
+        if previous["p95_ms"] and (stats["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] * 100 > threshold_pct:
+            regressions.append(f"{route}: p95 {previous['p95_ms']}ms -> {stats['p95_ms']}ms")
+        if previous["throughput_rps"] and (
+            (previous["throughput_rps"] - stats["throughput_rps"]) / previous["throughput_rps"] * 100 > threshold_pct
+        ):
+            regressions.append(
+                f"{route}: throughput {previous['throughput_rps']}rps -> {stats['throughput_rps']}rps"
+            )
+    return regressions
+
+
+def format_table(report: dict, baseline: Optional[dict] = None) -> str:
+    lines = [f"{'route':<48} {'req':>6} {'err':>5} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9}"]
+    for route, stats in report["routes"].items():
+        line = (
+            f"{route:<48} {stats['requests']:>6} {stats['errors']:>5} {stats['throughput_rps']:>9.1f} "
+            f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}"
+        )
+        previous = (baseline or {}).get("routes", {}).get(route)
+        if previous and previous["p95_ms"]:
+            line += f"  p95 {(stats['p95_ms'] - previous['p95_ms']) / previous['p95_ms'] * 100:+.1f}%"
+        lines.append(line)
+    total = report["total"]
+    lines.append(f"total: {total['requests']} requests in {total['duration_s']}s, {total['throughput_rps']} rps")
+    return "\n".join(lines)
@@ -0,0 +1,264 @@
+"""Microbenchmarks for the model conversion hot paths.
+
+    python -m benchmarks.models --output models_baseline.json
+    python -m benchmarks.models --baseline models_baseline.json --threshold 15
+
+Every case is measured for 1, 10 and 100 item pages.  ``ns/op`` is the best
+of several timed repeats divided by the page size, so it is per document.
+``allocs/op`` and ``bytes/op`` are the memory blocks and bytes tracemalloc
+sees allocated (and not yet freed) per document while the results are kept
+alive, i.e. the size of the object graph each conversion builds.
+"""
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from benchmarks.harness import import_app_modules, run_sync
+
+import_app_modules()
+
+from models.apartment import Apartment
+from models.booking import Booking
+
+PAGE_SIZES = [1, 10, 100]
+CREATED = datetime(2025, 6, 1, 12, 0, 0)
+
+
+def apartment_document(index: int) -> dict:
+    """An Apartments document as ApartmentRepository.create stores it."""
+    return {
+        "_id": ObjectId(),
+        "apartmentId": None,
+        "ownerId": str(ObjectId()),
+        "apartment_name": f"Apartment {index}",
+        "description": "Bright apartment close to public transport. " * 4,
+        "address": {
+            "street": "Kabanbay Batyr",
+            "house_number": "53",
+            "apartment_number": str(index),
+            "entrance": "2",
+            "has_intercom": True,
+            "landmark": None,
+        },
+        "district_name": "Esil",
+        "latitude": 51.09,
+        "longitude": 71.41,
+        "price_per_month": 150000,
+        "area": 54.5,
+        "kitchen_area": 11.0,
+        "floor": 7,
+        "number_of_rooms": 2,
+        "max_users": 3,
+        "university_nearby": "Astana IT University",
+        "pictures": [f"https://cdn.example.com/apartments/{index}/{n}.jpg" for n in range(6)],
+        "is_promoted": False,
+        "is_pet_allowed": True,
+        "rental_type": "apartment",
+        "roommate_preferences": "non-smoker",
+        "included_utilities": ["water", "electricity", "internet"],
+        "rules": ["no smoking", "no parties"],
+        "contact_phone": "+77001234567",
+        "contact_telegram": "@landlord",
+        "created_at": CREATED.isoformat(),
+        "updated_at": CREATED.isoformat(),
+        "is_active": True,
+        "createdAt": CREATED,
+        "updatedAt": CREATED,
+    }
+
+
+def booking_document(index: int) -> dict:
+    """A Bookings document as BookingRepository.create stores it."""
+    return {
+        "_id": ObjectId(),
+        "bookingId": None,
+        "apartmentId": str(ObjectId()),
+        "userId": str(ObjectId()),
+        "message": "Hello, I would like to rent this apartment.",
+        "status": "pending",
+        "check_in_date": CREATED + timedelta(days=index),
+        "check_out_date": CREATED + timedelta(days=index + 90),
+        "created_at": CREATED,
+        "updated_at": CREATED,
+        "createdAt": CREATED,
+        "updatedAt": CREATED,
+    }
+
+
+def _booking_from_document(document: dict) -> Booking:
+    # Mirrors the conversion repeated across BookingRepository
+    document["bookingId"] = str(document["_id"])
+    del document["_id"]
+    return Booking(**document)
+
+
+APARTMENT_LIST_FIELD = create_model_field("Response_Apartments", List[Apartment], mode="serialization")
+BOOKING_LIST_FIELD = create_model_field("Response_Bookings", List[Booking], mode="serialization")
+
+
+def case_apartment_from_mongo(size: int):
+    documents = [apartment_document(i) for i in range(size)]
+
+    def setup():
+        return [dict(document) for document in documents]
+
+    def run(batch):
+        return [Apartment.from_mongo(document) for document in batch]
+    return setup, run
+
+
+def case_apartment_jsonable_encoder(size: int):
+    apartments = [Apartment.from_mongo(apartment_document(i)) for i in range(size)]
+
+    def run(_):
+        return [jsonable_encoder(apartment) for apartment in apartments]
+    return None, run
+
+
+def case_booking_from_document(size: int):
+    documents = [booking_document(i) for i in range(size)]
+
+    def setup():
+        return [dict(document) for document in documents]
+
+    def run(batch):
+        return [_booking_from_document(document) for document in batch]
+    return setup, run
+
+
+def case_apartment_response_model(size: int):
+    apartments = [Apartment.from_mongo(apartment_document(i)) for i in range(size)]
+
+    def run(_):
+        return run_sync(serialize_response(field=APARTMENT_LIST_FIELD, response_content=apartments))
+    return None, run
+
+
+def case_booking_response_model(size: int):
+    bookings = [_booking_from_document(booking_document(i)) for i in range(size)]
+
+    def run(_):
+        return run_sync(serialize_response(field=BOOKING_LIST_FIELD, response_content=bookings))
+    return None, run
+
+
+CASES: Dict[str, Callable] = {
+    "Apartment.from_mongo": case_apartment_from_mongo,
+    "jsonable_encoder(Apartment)": case_apartment_jsonable_encoder,
+    "Booking(**document)": case_booking_from_document,
+    "response_model List[Apartment]": case_apartment_response_model,
+    "response_model List[Booking]": case_booking_response_model,
+}
+
+
+def measure(factory: Callable, size: int, repeats: int = 5, min_time: float = 0.2) -> dict:
+    setup, run = factory(size)
+    setup = setup or (lambda: None)
+
+    # Calibrate the number of calls per repeat to roughly min_time seconds
+    calls = 1
+    while True:
+        batches = [setup() for _ in range(calls)]
+        started = time.perf_counter()
+        for batch in batches:
+            run(batch)
+        if time.perf_counter() - started >= min_time / 4 or calls >= 1 << 20:
+            break
+        calls *= 2
+
+    best = None
+    for _ in range(repeats):
+        batches = [setup() for _ in range(calls)]
+        gc.disable()
+        started = time.perf_counter_ns()
+        for batch in batches:
+            run(batch)
+        elapsed = time.perf_counter_ns() - started
+        gc.enable()
+        best = elapsed if best is None else min(best, elapsed)
+
+    batches = [setup() for _ in range(calls)]
+    results = []
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for batch in batches:
+        results.append(run(batch))
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    blocks = sum(stat.count_diff for stat in stats)
+    size_bytes = sum(stat.size_diff for stat in stats)
+    del results
+
+    operations = calls * size
+    return {
+        "ns_per_op": round(best / operations, 1),
+        "allocs_per_op": round(blocks / operations, 1),
+        "bytes_per_op": round(size_bytes / operations, 1),
+    }
+
+
+def run_all(selected: List[str] = None) -> Dict[str, dict]:
+    report = {}
+    for name, factory in CASES.items():
+        if selected and name not in selected:
+            continue
+        for size in PAGE_SIZES:
+            report[f"{name} [{size}]"] = measure(factory, size)
+    return report
+
+
+def compare(current: Dict[str, dict], baseline: Dict[str, dict], threshold_pct: float) -> List[str]:
+    regressions = []
+    for name, stats in current.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric in ("ns_per_op", "allocs_per_op"):
+            if previous[metric] > 0 and (stats[metric] - previous[metric]) / previous[metric] * 100 > threshold_pct:
+                regressions.append(f"{name}: {metric} {previous[metric]} -> {stats[metric]}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.models", description=__doc__.splitlines()[0])
+    parser.add_argument("--case", action="append", choices=sorted(CASES), help="run only this case (repeatable)")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="JSON report of a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=20.0,
+                        help="allowed ns/op or allocs/op regression in percent (default: 20)")
+    args = parser.parse_args(argv)
+
+    report = run_all(args.case)
+    print(f"{'case':<40} {'ns/op':>12} {'allocs/op':>10} {'bytes/op':>10}")
+    for name, stats in report.items():
+        print(f"{name:<40} {stats['ns_per_op']:>12.1f} {stats['allocs_per_op']:>10.1f} {stats['bytes_per_op']:>10.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""Check that list endpoints issue a constant number of queries per request.
+
+    python -m benchmarks.queries
+
+Every endpoint is requested with growing page sizes against the in-memory
+backend while the reads reaching the database are counted.  The exit code is
+1 when the count grows with the page size, i.e. when related entities are
+fetched per item instead of in one batch (see ``utils.dataloader``).
+"""
+import argparse
+import asyncio
+import functools
+import sys
+from collections import Counter
+
+import httpx
+from mongomock.collection import Collection
+
+from benchmarks.dataset import DatasetSize, seed
+from benchmarks.harness import import_app_modules, make_client, use_client
+
+READ_METHODS = ["find", "find_one", "aggregate", "count_documents", "distinct"]
+
+
+class QueryCounter:
+    """Counts top-level reads per collection, mongomock implements some reads with others."""
+
+    def __init__(self):
+        self.counts = Counter()
+        self._depth = 0
+
+    def install(self):
+        for name in READ_METHODS:
+            setattr(Collection, name, self._wrap(getattr(Collection, name)))
+
+    def _wrap(self, method):
+        @functools.wraps(method)
+        def wrapper(collection, *args, **kwargs):
+            if self._depth == 0:
+                self.counts[collection.name] += 1
+            self._depth += 1
+            try:
+                return method(collection, *args, **kwargs)
+            finally:
+                self._depth -= 1
+        return wrapper
+
+    def reset(self):
+        self.counts.clear()
+
+
+def endpoints(dataset):
+    owner = max(set(dataset.user_ids), key=dataset.user_ids.count)
+    return {
+        "GET /api/v1/apartments/search?expand=owner": lambda limit: (
+            "/api/v1/apartments/search", {"expand": "owner", "limit": limit}),
+        "GET /api/v1/apartments/promoted?expand=owner": lambda limit: (
+            "/api/v1/apartments/promoted", {"expand": "owner", "limit": limit}),
+        "GET /api/v1/bookings/user/{user_id}?expand=apartment": lambda limit: (
+            f"/api/v1/bookings/user/{owner}", {"expand": "apartment", "limit": limit}),
+    }
+
+
+async def run(page_sizes) -> dict:
+    import_app_modules()
+    from main import app
+    import dependencies
+
+    client = make_client("memory", None)
+    use_client(client)
+    counter = QueryCounter()
+    report = {}
+    async with app.router.lifespan_context(app):
+        dataset = await seed(client, DatasetSize(users=20, apartments=300, bookings=3000, reviews=10), 42)
+        # Reads of the background index loads are not the endpoints' queries
+        await dependencies.roommate_service.loaded.wait()
+        await dependencies.saved_search_service.loaded.wait()
+        counter.install()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as http:
+            for name, build in endpoints(dataset).items():
+                report[name] = {}
+                for limit in page_sizes:
+                    url, params = build(limit)
+                    counter.reset()
+                    response = await http.get(url, params=params)
+                    response.raise_for_status()
+                    report[name][limit] = {"items": len(response.json()), "queries": dict(counter.counts)}
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.queries", description=__doc__.splitlines()[0])
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[1, 10, 100])
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args.page_sizes))
+    failed = False
+    for name, results in report.items():
+        totals = {limit: sum(result["queries"].values()) for limit, result in results.items()}
+        constant = len(set(totals.values())) == 1
+        failed |= not constant
+        print(f"{'ok  ' if constant else 'FAIL'} {name}")
+        for limit, result in results.items():
+            print(f"     limit={limit:<4} items={result['items']:<4} queries={result['queries']}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""Benchmark of the roommate matching engine (services.roommate_matcher).
+
+    python -m benchmarks.roommates --users 100000
+    python -m benchmarks.roommates --users 100000 --output matcher_baseline.json
+    python -m benchmarks.roommates --users 100000 --baseline matcher_baseline.json --threshold 20
+
+Builds the matrix from synthetic profiles, then reports the build time, the
+cost of an incremental upsert and the latency (p50/p95/p99) of a top-k
+query over all users.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+from benchmarks.harness import import_app_modules, percentile
+
+import_app_modules()
+
+from services.roommate_matcher import RoommateMatcher
+
+UNIVERSITIES = ["Astana IT University", "Nazarbayev University", "ENU", "KazGUU", "Astana Medical University"]
+CITIES = ["Astana", "Almaty", "Karaganda", "Shymkent"]
+LANGUAGES = ["English", "Kazakh", "Russian", "Turkish", "Chinese", "German"]
+PREFERENCES = ["non-smoker", "quiet", "early bird", "night owl", "pets ok", "no pets", "tidy", "gamer", "sporty"]
+
+
+def profile(rng: random.Random) -> dict:
+    budget_min = rng.randrange(40000, 150000, 5000)
+    return {
+        "university": rng.choice(UNIVERSITIES),
+        "city": rng.choice(CITIES),
+        "gender": rng.choice(["male", "female"]),
+        "language_preferences": rng.sample(LANGUAGES, rng.randint(1, 3)),
+        "roommate_preferences": ", ".join(rng.sample(PREFERENCES, rng.randint(0, 3))),
+        "budget_range": {"min": budget_min, "max": budget_min + rng.randrange(10000, 80000, 5000)},
+        "is_landlord": rng.random() < 0.05,
+    }
+
+
+def run(users: int, queries: int, k: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    profiles = [profile(rng) for _ in range(users)]
+
+    matcher = RoommateMatcher()
+    started = time.perf_counter()
+    for index, user in enumerate(profiles):
+        matcher.upsert(f"user{index}", user)
+    build_s = time.perf_counter() - started
+
+    upserts = []
+    for _ in range(min(queries, 1000)):
+        user_id = f"user{rng.randrange(users)}"
+        started = time.perf_counter()
+        matcher.upsert(user_id, profile(rng))
+        upserts.append(time.perf_counter() - started)
+
+    latencies = []
+    for _ in range(queries):
+        user_id = f"user{rng.randrange(users)}"
+        started = time.perf_counter()
+        matcher.top_k(user_id, k)
+        latencies.append(time.perf_counter() - started)
+
+    latencies.sort()
+    return {
+        "users": users,
+        "k": k,
+        "build_ms": round(build_s * 1000, 1),
+        "upsert_us": round(sum(upserts) / len(upserts) * 1e6, 2),
+        "top_k_p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "top_k_p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "top_k_p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.roommates", description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="JSON report of a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=20.0,
+                        help="allowed top-k p95 regression in percent (default: 20)")
+    args = parser.parse_args(argv)
+
+    report = run(args.users, args.queries, args.k, args.seed)
+    for name, value in report.items():
+        print(f"{name:<16} {value}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            previous = json.load(f)["top_k_p95_ms"]
+        if (report["top_k_p95_ms"] - previous) / previous * 100 > args.threshold:
+            print(f"REGRESSION top-k p95 {previous}ms -> {report['top_k_p95_ms']}ms")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
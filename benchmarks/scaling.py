@@ -0,0 +1,120 @@
+"""Measure throughput of the production server (app/server.py) from 1 to N workers.
+
+    python -m benchmarks.scaling --mongodb-url mongodb://localhost:27017/ --workers 1 2 4
+
+The database is seeded once, then for every worker count the server is
+started on ``--port``, loaded over HTTP with the same request sequence and
+stopped with SIGTERM.  The load generator is a single process, so make sure
+it is not the bottleneck (compare its CPU usage with the server's).
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.dataset import DatasetSize, seed
+from benchmarks.harness import APP_DIR, Recorder, drive, import_app_modules, issue_tokens, make_client
+from benchmarks.scenarios import SCENARIOS
+
+
+def start_server(workers: int, port: int, mongodb_url: str) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        WEB_CONCURRENCY=str(workers),
+        PORT=str(port),
+        HOST="127.0.0.1",
+        MONGODB_URL=mongodb_url,
+        MAX_REQUESTS="0",  # no recycling while measuring
+        RATE_LIMIT_ENABLED="false",
+        LOAD_SHED_ENABLED="false",
+        ARCHIVE_ENABLED="false",
+    )
+    return subprocess.Popen([sys.executable, "server.py"], cwd=APP_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_until_ready(url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/openapi.json", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not become ready in {timeout}s")
+
+
+def stop_server(process: subprocess.Popen):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.scaling", description=__doc__.splitlines()[0])
+    parser.add_argument("--mongodb-url", required=True,
+                        help="throwaway MongoDB instance; its 'diploma' database is dropped and reseeded")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    import_app_modules()
+    dataset = asyncio.run(seed(make_client("mongo", args.mongodb_url), DatasetSize(), args.seed))
+    tokens = issue_tokens(dataset.user_ids)
+    operations = SCENARIOS[args.scenario]
+    url = f"http://127.0.0.1:{args.port}"
+
+    results = {}
+    for workers in args.workers:
+        process = start_server(workers, args.port, args.mongodb_url)
+        try:
+            wait_until_ready(url)
+            recorder = Recorder()
+
+            async def load():
+                await drive(None, operations, dataset, tokens, args.concurrency, args.warmup, args.seed + 1,
+                            base_url=url)
+                return await drive(None, operations, dataset, tokens, args.concurrency, args.requests, args.seed,
+                                   recorder, base_url=url)
+
+            results[workers] = recorder.summary(asyncio.run(load()))
+        finally:
+            stop_server(process)
+        print(f"{workers} worker(s): {results[workers]['total']['throughput_rps']} rps")
+
+    base = results[args.workers[0]]["total"]["throughput_rps"]
+    report = {
+        "meta": {"scenario": args.scenario, "concurrency": args.concurrency, "requests": args.requests,
+                 "seed": args.seed},
+        "workers": {str(workers): summary for workers, summary in results.items()},
+        "speedup": {
+            str(workers): round(summary["total"]["throughput_rps"] / base, 2) if base else 0.0
+            for workers, summary in results.items()
+        },
+    }
+    print("speedup:", report["speedup"])
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
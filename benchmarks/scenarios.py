@@ -0,0 +1,165 @@
+import random
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable, Dict, List
+
+from benchmarks.dataset import CENTER_LATITUDE, CENTER_LONGITUDE, DISTRICTS, EPOCH, UNIVERSITIES, Dataset
+
+
+@dataclass
+class Operation:
+    """One weighted request type of a scenario.
+
+    ``route`` is the route template and is used as the key in the report,
+    ``build`` returns the keyword arguments for ``httpx.AsyncClient.request``.
+    ``requires_mongo`` operations use operators mongomock-motor does not
+    implement, so they are skipped on the memory backend.
+    """
+    route: str
+    weight: int
+    build: Callable[[Dataset, Dict[str, str], random.Random], dict]
+    requires_mongo: bool = False
+
+
+def _auth(tokens: Dict[str, str], user_id: str) -> dict:
+    return {"Authorization": f"Bearer {tokens[user_id]}"}
+
+
+def search_apartments(dataset, tokens, rng):
+    params = {"limit": rng.choice([20, 50, 100])}
+    if rng.random() < 0.7:
+        params["min_price"] = rng.randrange(50000, 150000, 10000)
+        params["max_price"] = params["min_price"] + rng.randrange(50000, 250000, 10000)
+    if rng.random() < 0.5:
+        params["location"] = rng.choice(DISTRICTS)
+    if rng.random() < 0.3:
+        params["university"] = rng.choice(UNIVERSITIES)
+    if rng.random() < 0.3:
+        params["room_type"] = rng.choice(["room", "apartment"])
+    if rng.random() < 0.3:
+        check_in = EPOCH + timedelta(days=rng.randint(0, 365))
+        params["check_in"] = check_in.isoformat()
+        params["check_out"] = (check_in + timedelta(days=rng.randint(30, 150))).isoformat()
+    return {"method": "GET", "url": "/api/v1/apartments/search", "params": params}
+
+
+def nearby_apartments(dataset, tokens, rng):
+    return {
+        "method": "GET",
+        "url": "/api/v1/apartments/nearby",
+        "params": {
+            "latitude": CENTER_LATITUDE + rng.uniform(-0.05, 0.05),
+            "longitude": CENTER_LONGITUDE + rng.uniform(-0.05, 0.05),
+            "radius_km": rng.choice([1, 3, 5]),
+            "limit": 50,
+        },
+    }
+
+
+def promoted_apartments(dataset, tokens, rng):
+    return {"method": "GET", "url": "/api/v1/apartments/promoted", "params": {"limit": 20}}
+
+
+def get_apartment(dataset, tokens, rng):
+    return {"method": "GET", "url": f"/api/v1/apartments/{rng.choice(dataset.apartment_ids)}"}
+
+
+def viral_apartment(dataset, tokens, rng):
+    # A handful of listings receiving most of the traffic
+    return {"method": "GET", "url": f"/api/v1/apartments/{rng.choice(dataset.apartment_ids[:3])}"}
+
+
+def viral_average_rating(dataset, tokens, rng):
+    return {
+        "method": "GET",
+        "url": "/api/v1/reviews/average-rating",
+        "params": {"target_id": rng.choice(dataset.apartment_ids[:3]), "review_type": "apartment"},
+    }
+
+
+def owner_apartments(dataset, tokens, rng):
+    return {"method": "GET", "url": f"/api/v1/apartments/owner/{rng.choice(dataset.landlord_ids)}"}
+
+
+def create_booking(dataset, tokens, rng):
+    user_id = rng.choice(dataset.user_ids)
+    check_in = EPOCH + timedelta(days=rng.randint(0, 365))
+    return {
+        "method": "POST",
+        "url": "/api/v1/bookings",
+        "headers": _auth(tokens, user_id),
+        "json": {
+            "apartmentId": rng.choice(dataset.apartment_ids),
+            "message": "Is it still available?",
+            "check_in_date": check_in.isoformat(),
+            "check_out_date": (check_in + timedelta(days=rng.randint(30, 180))).isoformat(),
+        },
+    }
+
+
+def user_bookings(dataset, tokens, rng):
+    return {"method": "GET", "url": f"/api/v1/bookings/user/{rng.choice(dataset.user_ids)}"}
+
+
+def user_bookings_expanded(dataset, tokens, rng):
+    return {
+        "method": "GET",
+        "url": f"/api/v1/bookings/user/{rng.choice(dataset.user_ids)}",
+        "params": {"expand": "apartment"},
+    }
+
+
+def get_profile(dataset, tokens, rng):
+    return {"method": "GET", "url": "/api/v1/profile", "headers": _auth(tokens, rng.choice(dataset.user_ids))}
+
+
+def target_reviews(dataset, tokens, rng):
+    return {
+        "method": "GET",
+        "url": f"/api/v1/reviews/target/{rng.choice(dataset.apartment_ids)}",
+        "params": {"review_type": "apartment"},
+    }
+
+
+def average_rating(dataset, tokens, rng):
+    return {
+        "method": "GET",
+        "url": "/api/v1/reviews/average-rating",
+        "params": {"target_id": rng.choice(dataset.apartment_ids), "review_type": "apartment"},
+    }
+
+
+SCENARIOS: Dict[str, List[Operation]] = {
+    # Typical traffic: mostly browsing with a few booking applications
+    "mixed": [
+        Operation("GET /api/v1/apartments/search", 30, search_apartments),
+        Operation("GET /api/v1/apartments/nearby", 15, nearby_apartments, requires_mongo=True),
+        Operation("GET /api/v1/apartments/promoted", 5, promoted_apartments),
+        Operation("GET /api/v1/apartments/{apartment_id}", 20, get_apartment),
+        Operation("GET /api/v1/apartments/owner/{owner_id}", 3, owner_apartments),
+        Operation("POST /api/v1/bookings", 10, create_booking),
+        Operation("GET /api/v1/bookings/user/{user_id}", 5, user_bookings),
+        Operation("GET /api/v1/profile", 5, get_profile),
+        Operation("GET /api/v1/reviews/target/{target_id}", 4, target_reviews),
+        Operation("GET /api/v1/reviews/average-rating", 3, average_rating),
+    ],
+    "search": [
+        Operation("GET /api/v1/apartments/search", 70, search_apartments),
+        Operation("GET /api/v1/apartments/nearby", 30, nearby_apartments, requires_mongo=True),
+    ],
+    "viral": [
+        Operation("GET /api/v1/apartments/{apartment_id}", 60, viral_apartment),
+        Operation("GET /api/v1/reviews/average-rating", 40, viral_average_rating),
+    ],
+    "booking": [
+        Operation("POST /api/v1/bookings", 60, create_booking),
+        Operation("GET /api/v1/bookings/user/{user_id}", 10, user_bookings),
+        Operation("GET /api/v1/bookings/user/{user_id}?expand=apartment", 10, user_bookings_expanded),
+        Operation("GET /api/v1/apartments/{apartment_id}", 20, get_apartment),
+    ],
+}
+
+
+def supported(operations: List[Operation], backend: str) -> List[Operation]:
+    # $geoNear and 2dsphere indexes are missing from mongomock-motor, its numbers would be meaningless
+    return [operation for operation in operations if backend == "mongo" or not operation.requires_mongo]
@@ -0,0 +1,131 @@
+"""Cold-start profile of the API.
+
+    python -m benchmarks.startup importtime          # import-time breakdown of `import main`
+    python -m benchmarks.startup ttfr --runs 5       # time to first response of app/server.py
+
+``importtime`` runs ``python -X importtime -c "import main"`` in a fresh
+interpreter and groups the self time by top-level package.  ``ttfr`` starts
+the production server with one worker, polls ``--path`` until it answers and
+reports the time from process spawn to the first successful response.
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import List
+
+import httpx
+
+from benchmarks.harness import APP_DIR
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def import_profile(top: int = 20) -> dict:
+    env = dict(os.environ, JWT_SECRET=os.getenv("JWT_SECRET", "startup-profile"))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=APP_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            modules.append((match.group(4), int(match.group(1)), int(match.group(2))))
+
+    packages = Counter()
+    for name, self_us, _ in modules:
+        packages[name.split(".")[0]] += self_us
+    cumulative = {name: cumulative_us for name, _, cumulative_us in modules}
+    return {
+        "total_ms": round(sum(self_us for _, self_us, _ in modules) / 1000, 1),
+        "main_ms": round(cumulative.get("main", 0) / 1000, 1),
+        "packages_ms": {name: round(us / 1000, 1) for name, us in packages.most_common(top)},
+        "slowest_modules_ms": {
+            name: round(us / 1000, 1)
+            for name, us in sorted(cumulative.items(), key=lambda item: item[1], reverse=True)[:top]
+        },
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_response(path: str, timeout: float = 60.0) -> float:
+    port = _free_port()
+    env = dict(
+        os.environ,
+        JWT_SECRET=os.getenv("JWT_SECRET", "startup-profile"),
+        WEB_CONCURRENCY="1",
+        HOST="127.0.0.1",
+        PORT=str(port),
+    )
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "server.py"], cwd=APP_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=timeout) as client:
+            while time.perf_counter() - started < timeout:
+                try:
+                    if client.get(path).status_code < 500:
+                        return (time.perf_counter() - started) * 1000
+                except httpx.TransportError:
+                    time.sleep(0.005)
+        raise RuntimeError(f"no response from {path} within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def ttfr_profile(path: str, runs: int) -> dict:
+    samples: List[float] = [time_to_first_response(path) for _ in range(runs)]
+    return {
+        "path": path,
+        "runs": runs,
+        "median_ms": round(statistics.median(samples), 1),
+        "min_ms": round(min(samples), 1),
+        "max_ms": round(max(samples), 1),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup", description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("importtime").add_argument("--top", type=int, default=20)
+    ttfr = sub.add_parser("ttfr")
+    ttfr.add_argument("--path", default="/openapi.json")
+    ttfr.add_argument("--runs", type=int, default=5)
+    ttfr.add_argument("--baseline", help="JSON report of a previous ttfr run to compare against")
+    ttfr.add_argument("--threshold", type=float, default=10.0,
+                      help="allowed median regression in percent (default: 10)")
+    for command in sub.choices.values():
+        command.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    report = import_profile(args.top) if args.command == "importtime" else ttfr_profile(args.path, args.runs)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+    if args.command == "ttfr" and args.baseline:
+        with open(args.baseline) as f:
+            previous = json.load(f)["median_ms"]
+        if (report["median_ms"] - previous) / previous * 100 > args.threshold:
+            print(f"REGRESSION time to first response {previous}ms -> {report['median_ms']}ms")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())